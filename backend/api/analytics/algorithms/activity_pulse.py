@@ -1,10 +1,13 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
 
-def calculate_pulse(messages_df):
+from api.analytics.group_arrays import latest, to_datetime64
+
+def calculate_pulse(messages_df, now=None):
     """
     Goal: Return a 0-100 score based on recent activity.
     10+ messages in 24h = 100 pulse.
+    Expects GroupFrame messages (UTC created_at); the frame is only read.
     """
     if messages_df is None or messages_df.empty:
         return 0.0
@@ -12,16 +15,47 @@ def calculate_pulse(messages_df):
     if 'created_at' not in messages_df.columns:
         return 0.0
 
-    # Ensure date format and convert to UTC to be safe
-    try:
-        messages_df['created_at'] = pd.to_datetime(messages_df['created_at']).dt.tz_localize(None)
-    except Exception:
+    now = now if now is not None else pd.Timestamp.now(tz='UTC')
+    cutoff = now - pd.Timedelta(hours=24)
+    recent_count = int((messages_df['created_at'] > cutoff).sum())
+    return pulse_score(recent_count)
+
+
+def calculate_pulse_array(messages, now):
+    """calculate_pulse() for GroupArrays messages."""
+    if messages is None or len(messages) == 0:
         return 0.0
-    
-    # Use a timezone-naive 'now' to match the localized column
-    cutoff = datetime.now() - timedelta(hours=24)
-    recent_count = len(messages_df[messages_df['created_at'] > cutoff])
-    
+
+    cutoff = to_datetime64(now) - np.timedelta64(24, "h")
+    return pulse_score(int((messages['created_at'] > cutoff).sum()))
+
+
+def calculate_inactivity_days(messages_df, now):
+    """
+    Goal: Whole days since the group's last message (UTC on both sides).
+    Returns: 0 when there are no messages.
+    """
+    if messages_df is None or messages_df.empty:
+        return 0
+    latest_message = messages_df['created_at'].max()
+    return (now - latest_message).days if pd.notnull(latest_message) else 0
+
+
+def calculate_inactivity_days_array(messages, now):
+    """calculate_inactivity_days() for GroupArrays messages."""
+    if messages is None or len(messages) == 0:
+        return 0
+    latest_message = latest(messages['created_at'])
+    if latest_message is None:
+        return 0
+    return int((to_datetime64(now) - latest_message) // np.timedelta64(1, "D"))
+
+
+def pulse_score(recent_count):
+    """
+    Goal: 0-100 pulse from the number of messages in the last 24h
+    (also fed straight from the hourly pulse counters, without loading messages).
+    """
     # Scale: 10 messages is the 'target' for 100%
     score = min((recent_count / 10) * 100, 100)
     return round(float(score), 1)
\ No newline at end of file
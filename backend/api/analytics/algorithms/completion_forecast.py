@@ -1,55 +1,73 @@
-import numpy as np
-import pandas as pd
 from datetime import datetime
-from sklearn.linear_model import LinearRegression
 
-def get_forecast_date(tasks_df, velocity):
+import numpy as np
+
+from api.analytics import group_arrays
+from api.analytics.group_frame import day_ordinals
+from api.analytics.algorithms.trend import cumulative_trend, cumulative_trend_counts
+
+def get_forecast_date(tasks_df, velocity, rollup=None):
     """
     Goal: Use the Velocity trend to forecast the 100% completion date.
+    rollup: current daily rollup rows of the group (optional); completions per due day are read from it.
     Returns: A formatted date string or a status message.
     """
+    total_tasks = len(tasks_df)                             # Count total tasks (including pending) for the target
+
     # 1. Get completed tasks to establish the trend. Filter by progress_percentage and use end_date.
-    completed = tasks_df[tasks_df['progress_percentage'] == 100].copy()
+    if rollup is not None:
+        return _rollup_forecast(total_tasks, rollup)
+
+    completed = tasks_df[tasks_df['progress_percentage'] == 100]
     completed = completed.dropna(subset=['end_date'])       # Safety: Remove any rows where completed_at might be missing
-    completed = completed.sort_values(by='end_date')        #Sort by date first 
-    
-    total_tasks = len(tasks_df)                             # Count total tasks (including pending) for the target
+    completed = completed.sort_values(by='end_date')        #Sort by date first
+
+    # 2. Fit the trend on int64 day ordinals (end_date is already UTC from GroupFrame)
+    # X = Days since first completion, y = Total count of tasks finished
+    return _forecast(total_tasks, len(completed), lambda: cumulative_trend(day_ordinals(completed['end_date'])))
 
+def get_forecast_date_array(tasks, velocity, rollup=None):
+    """get_forecast_date() for GroupArrays tasks (rollup: DataFrame or structured array)."""
+    total_tasks = len(tasks)
+    if rollup is not None:
+        return _rollup_forecast(total_tasks, rollup)
+
+    end_date = tasks['end_date'][(tasks['progress_percentage'] == 100) & ~np.isnat(tasks['end_date'])]
+    return _forecast(total_tasks, len(end_date), lambda: cumulative_trend(group_arrays.day_ordinals(np.sort(end_date))))
+
+def _rollup_forecast(total_tasks, rollup):
+    return _forecast(
+        total_tasks, int(rollup['tasks_done_by_due'].sum()),
+        lambda: cumulative_trend_counts(rollup['day'], rollup['tasks_done_by_due']),
+    )
+
+def _forecast(total_tasks, completed_count, fit_trend):
+    # fit_trend() -> (slope, intercept, start ordinal) of the completions, only called with enough of them
     # Need at least 3 data points for a reliable linear trend
     # Safety: If already 100% done
-    if len(completed) >= total_tasks and total_tasks > 0:
+    if completed_count >= total_tasks and total_tasks > 0:
         return "Project Completed"
-    
-    if len(completed) < 3:
-        return "Need more data" 
-
-    # 2. Convert end_date to numeric 'ordinals'
-    # Use pd.to_datetime to handle Supabase timestamp strings
-    completed['date_ordinal'] = pd.to_datetime(completed['end_date']).apply(lambda x: x.toordinal())
-    start_date = completed['date_ordinal'].min()
-    
-    # X = Days since first completion, y = Total count of tasks finished
-    X = (completed['date_ordinal'] - start_date).values.reshape(-1, 1)
-    y = np.arange(1, len(completed) + 1, dtype=float)
 
-    # 3. Fit the Model
-    model = LinearRegression().fit(X, y)
-    
-    if model.coef_[0] <= 0:
+    if completed_count < 3:
+        return "Need more data"
+
+    slope, intercept, start_date = fit_trend()
+
+    if slope <= 0:
         return "Stagnant"
-    
-    # 4. Solve for X where y = total_tasks
-    days_to_finish = (total_tasks - model.intercept_) / model.coef_[0]
-    
-    # 5. Convert back to Date
+
+    # 3. Solve for X where y = total_tasks
+    days_to_finish = (total_tasks - intercept) / slope
+
+    # 4. Convert back to Date
     finish_date_ordinal = int(start_date + days_to_finish)
-    
+
     try:
         # Prevent forecasting 100 years into the future if velocity is tiny
-        if days_to_finish > 3650: 
+        if days_to_finish > 3650:
             return "Off Track (Over 10 years)"
-            
+
         finish_date = datetime.fromordinal(finish_date_ordinal)
         return finish_date.strftime('%b %d, %Y')
     except (ValueError, OverflowError):
-        return "Calculation Error"
\ No newline at end of file
+        return "Calculation Error"
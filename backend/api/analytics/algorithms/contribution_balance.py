@@ -1,5 +1,10 @@
+import math
+
+import numpy as np
 import pandas as pd
 
+from api.analytics.id_codes import MISSING_ID
+
 def calculate_balance_score(tasks_df):
     """
     Calculates how evenly tasks are distributed among members.
@@ -8,19 +13,46 @@ def calculate_balance_score(tasks_df):
     if tasks_df.empty:
         return 100.0
 
-    # Count tasks per user
-    counts = tasks_df['user_id'].value_counts()
+    # Count tasks per user (user_id holds id codes; unassigned tasks count for nobody)
+    user_ids = tasks_df['user_id']
+    counts = user_ids[user_ids != MISSING_ID].value_counts()
     
     if len(counts) <= 1:
         # If only one person is in the group, balance is technically 100% 
         # (or 0% depending on your preference, but 100% usually looks better)
         return 100.0
 
+    return _balance_score(counts.to_numpy())
+
+def calculate_balance_score_array(tasks):
+    """calculate_balance_score() for GroupArrays tasks."""
+    if len(tasks) == 0:
+        return 100.0
+
+    user_ids = tasks['user_id']
+    _, counts = np.unique(user_ids[user_ids != MISSING_ID], return_counts=True)
+    if len(counts) <= 1:
+        return 100.0
+
+    return _balance_score(counts)
+
+def _balance_score(counts):
+    counts = np.asarray(counts, dtype=np.int64)
+    return balance_from_sums(len(counts), counts.sum(), np.dot(counts, counts))
+
+def balance_from_sums(members, total, total_squares):
+    """
+    Goal: Balance score of `members` task counts (2+) from their exact integer sums
+    (sum of counts, sum of squared counts), shared with batch_analysis so both score alike.
+    """
+    members, total, total_squares = int(members), int(total), int(total_squares)
+
     # Math: Standard Deviation / Mean (Coefficient of Variation)
-    # We use .std() and .mean() to see how far apart the users are
+    # Sample std (like pandas .std()), from integer sums so counting order can't change it
     # A high variation means low balance.
-    variation = (counts.std() / counts.mean()) * 10 
-    
+    std = math.sqrt((members * total_squares - total * total) / (members * (members - 1)))
+    variation = (std / (total / members)) * 10
+
     # Invert it so high numbers = good balance
     balance_score = max(0, round(100 - variation, 1))
     return float(balance_score)
\ No newline at end of file
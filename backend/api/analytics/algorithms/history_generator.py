@@ -1,111 +1,165 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date
 
-def generate_chart_history(tasks_df):
+from api.analytics import group_arrays
+from api.analytics.group_frame import day_ordinals
+
+# Supported chart windows (days) and bucket sizes (days per bucket)
+HISTORY_WINDOWS = (7, 30, 90, 365)
+HISTORY_BUCKETS = {"day": 1, "week": 7}
+
+# Buckets projected forward by the workload prediction
+PREDICTION_BUCKETS = 7
+
+
+def _bucket_counts(event_days, window_start, step, n_buckets, counts=None):
+    """
+    Bins event days (int ordinals) into [before window, bucket 0, ..., bucket n-1] with one bincount.
+    counts: events per day when event_days are rollup days (default: one event each).
+    Events after the window are dropped. O(events + buckets).
     """
-    Processes task data to build the time-series arrays needed for the 
+    event_days = np.asarray(event_days, dtype=np.int64)
+    offsets = event_days - window_start
+    in_range = offsets < step * n_buckets
+    bins = np.where(offsets[in_range] < 0, 0, offsets[in_range] // step + 1)
+    if counts is None:
+        return np.bincount(bins, minlength=n_buckets + 1)
+    weights = np.asarray(counts, dtype=np.int64)[in_range]
+    return np.bincount(bins, weights=weights, minlength=n_buckets + 1).astype(np.int64)
+
+
+def generate_chart_history(tasks_df, now=None, window_days=7, bucket="day", rollup=None):
+    """
+    Processes task data to build the time-series arrays needed for the
     React ApexCharts (Forecast, Velocity, and Upcoming Workload).
+    Expects GroupFrame tasks (typed UTC timestamps); the frame is only read.
+    Created/completed days are binned once, and the cumulative, per-bucket and
+    rolling series are all derived from those bins.
+    - window_days: one of HISTORY_WINDOWS; bucket: "day" or "week" (each label is the bucket's last day)
+    - rollup: current daily rollup rows of the group (optional); per-day counts are binned instead of tasks
     """
-    today = datetime.now()
-    
-    # 1. Fallback if no tasks exist
+    layout = _history_layout(now, window_days, bucket)
+
+    # 2. Fallback if no tasks exist
     if tasks_df is None or tasks_df.empty:
-        return {
-            "dates": [(today - timedelta(days=i)).strftime('%b %d') for i in range(6, -1, -1)],
-            "completed_counts": [0] * 7,
-            "total_counts": [0] * 7,
-            "velocity_trend": [0] * 7,
-            "daily_completed": [0] * 7,
-            "prediction_dates": [(today + timedelta(days=i)).strftime('%b %d') for i in range(1, 8)],
-            "backlog_prediction": [0] * 7,
-            "incoming_prediction": [0] * 7
-        }
-
-    # 2. Prepare DataFrame dates - ensure all datetime columns are properly converted
-    if 'created_at' in tasks_df.columns:
-        tasks_df['created_at'] = pd.to_datetime(tasks_df['created_at'], errors='coerce')
-    if 'completed_at' in tasks_df.columns:
-        tasks_df['completed_at'] = pd.to_datetime(tasks_df['completed_at'], errors='coerce')
-    
-    # Ensure progress_percentage is numeric
-    if 'progress_percentage' in tasks_df.columns:
-        tasks_df['progress_percentage'] = pd.to_numeric(tasks_df['progress_percentage'], errors='coerce')
-
-    dates = []
-    completed_counts = []
-    total_counts = []
-    daily_completed = []
-
-    # 3. Calculate Past 7 Days (Forecast & Velocity)
-    for i in range(6, -1, -1):
-        target_date = (today - timedelta(days=i)).date()
-        dates.append(target_date.strftime('%b %d'))
-
-        # Cumulative Total Tasks based on creation date
-        if 'created_at' in tasks_df.columns:
-            total_to_date = len(tasks_df[tasks_df['created_at'].dt.date <= target_date])
-        else:
-            total_to_date = len(tasks_df) # Fallback to flat line
-        total_counts.append(total_to_date)
-
-        # Cumulative Completed Tasks (progress_percentage == 100)
+        return _empty_history(layout)
+
+    # 3. Bin creations (cumulative total tasks by creation date)
+    # 4. Bin completions (progress_percentage == 100), by completed_at,
+    #    or by created_at when no completed task has a completed_at
+    if rollup is not None:
+        created_bins, completed_bins = _rollup_bins(rollup, layout)
+    else:
+        window_start, step, n_buckets = layout["window_start"], layout["step"], layout["n_buckets"]
+        created = tasks_df['created_at'].dropna()
+        created_bins = _bucket_counts(day_ordinals(created), window_start, step, n_buckets)
+
         completed_df = tasks_df[tasks_df['progress_percentage'] == 100]
-        
-        # Debug logging on first iteration
-        if i == 6:
-            pass
-        
-        completed_to_date = 0
-        completed_on_day = 0
-        
-        if not completed_df.empty:
-            if 'completed_at' in completed_df.columns:
-                # Use completed_at if available and not all null
-                non_null_completed = completed_df[completed_df['completed_at'].notna()]
-                if len(non_null_completed) > 0:
-                    completed_mask = non_null_completed['completed_at'].dt.date <= target_date
-                    completed_to_date = len(non_null_completed[completed_mask])
-                    
-                    completed_on_day_mask = non_null_completed['completed_at'].dt.date == target_date
-                    completed_on_day = len(non_null_completed[completed_on_day_mask])
-                else:
-                    # All completed_at are null, use created_at as fallback
-                    if 'created_at' in completed_df.columns:
-                        completed_mask = completed_df['created_at'].dt.date <= target_date
-                        completed_to_date = len(completed_df[completed_mask])
-                        
-                        completed_on_day_mask = completed_df['created_at'].dt.date == target_date
-                        completed_on_day = len(completed_df[completed_on_day_mask])
-            elif 'created_at' in completed_df.columns:
-                # Use created_at as fallback
-                completed_mask = completed_df['created_at'].dt.date <= target_date
-                completed_to_date = len(completed_df[completed_mask])
-                
-                completed_on_day_mask = completed_df['created_at'].dt.date == target_date
-                completed_on_day = len(completed_df[completed_on_day_mask])
-
-        completed_counts.append(completed_to_date)
-        daily_completed.append(completed_on_day)
-
-    # Calculate 3-day moving average for velocity trend line
-    s = pd.Series(daily_completed)
-    velocity_trend = s.rolling(window=3, min_periods=1).mean().fillna(0).tolist()
-
-    # 4. Calculate Future 7 Days (Workload Prediction)
-    prediction_dates = []
-    backlog_prediction = []
-    incoming_prediction = []
+        completed_on = completed_df['completed_at'].dropna()
+        if completed_on.empty:
+            completed_on = completed_df['created_at'].dropna()
+        completed_bins = _bucket_counts(day_ordinals(completed_on), window_start, step, n_buckets)
+
+    current_backlog = int((tasks_df['progress_percentage'] < 100).sum())
+    return _history_series(layout, created_bins, completed_bins, current_backlog)
+
+
+def generate_chart_history_array(tasks, now=None, window_days=7, bucket="day", rollup=None):
+    """generate_chart_history() for GroupArrays tasks (rollup: DataFrame or structured array)."""
+    layout = _history_layout(now, window_days, bucket)
+    if tasks is None or len(tasks) == 0:
+        return _empty_history(layout)
+
+    if rollup is not None:
+        created_bins, completed_bins = _rollup_bins(rollup, layout)
+    else:
+        window_start, step, n_buckets = layout["window_start"], layout["step"], layout["n_buckets"]
+        created = tasks['created_at'][~np.isnat(tasks['created_at'])]
+        created_bins = _bucket_counts(group_arrays.day_ordinals(created), window_start, step, n_buckets)
+
+        completed = tasks[tasks['progress_percentage'] == 100]
+        completed_on = completed['completed_at'][~np.isnat(completed['completed_at'])]
+        if len(completed_on) == 0:
+            completed_on = completed['created_at'][~np.isnat(completed['created_at'])]
+        completed_bins = _bucket_counts(group_arrays.day_ordinals(completed_on), window_start, step, n_buckets)
 
-    current_backlog = len(tasks_df[tasks_df['progress_percentage'] < 100])
+    current_backlog = int((tasks['progress_percentage'] < 100).sum())
+    return _history_series(layout, created_bins, completed_bins, current_backlog)
 
-    # Simple predictive heuristics based on past 7 days
-    avg_incoming_per_day = max(1.0, total_counts[-1] / 7.0 if total_counts[-1] > 0 else 1.0)
-    avg_completion_per_day = max(0.5, sum(velocity_trend) / 7.0 if sum(velocity_trend) > 0 else 0.5)
 
-    for i in range(1, 8):
-        future_date = today + timedelta(days=i)
-        prediction_dates.append(future_date.strftime('%b %d'))
+def _history_layout(now, window_days, bucket):
+    today = (now if now is not None else pd.Timestamp.now(tz='UTC')).date()
+    step = HISTORY_BUCKETS[bucket]
+    n_buckets = -(-window_days // step)
+
+    # 1. Bucket layout: the last bucket ends today
+    window_start = today.toordinal() - n_buckets * step + 1
+    bucket_ends = window_start + step * np.arange(1, n_buckets + 1) - 1
+    return {
+        "window_start": window_start,
+        "step": step,
+        "n_buckets": n_buckets,
+        "dates": [date.fromordinal(int(end)).strftime('%b %d') for end in bucket_ends],
+        "prediction_dates": [
+            date.fromordinal(today.toordinal() + step * i).strftime('%b %d') for i in range(1, PREDICTION_BUCKETS + 1)
+        ],
+    }
+
+
+def _empty_history(layout):
+    zeros = [0] * layout["n_buckets"]
+    return {
+        "dates": layout["dates"],
+        "completed_counts": zeros,
+        "total_counts": zeros,
+        "velocity_trend": zeros,
+        "daily_completed": zeros,
+        "prediction_dates": layout["prediction_dates"],
+        "backlog_prediction": [0] * PREDICTION_BUCKETS,
+        "incoming_prediction": [0] * PREDICTION_BUCKETS
+    }
+
+
+def _rollup_bins(rollup, layout):
+    window_start, step, n_buckets = layout["window_start"], layout["step"], layout["n_buckets"]
+    days = rollup['day']
+    created_bins = _bucket_counts(days, window_start, step, n_buckets, rollup['tasks_created'])
+    completed_per_day = rollup['tasks_completed']
+    if completed_per_day.sum() == 0:
+        completed_per_day = rollup['tasks_completed_undated']
+    completed_bins = _bucket_counts(days, window_start, step, n_buckets, completed_per_day)
+    return created_bins, completed_bins
+
+
+def _rolling_mean(values, window):
+    """Trailing mean over up to `window` values (rolling(window, min_periods=1).mean() without pandas)."""
+    sums = np.cumsum(np.concatenate(([0.0], values)))
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (sums[ends] - sums[starts]) / (ends - starts)
+
+
+def _history_series(layout, created_bins, completed_bins, current_backlog):
+    n_buckets = layout["n_buckets"]
+    total_counts = np.cumsum(created_bins)[1:]
+
+    completed_counts = np.cumsum(completed_bins)[1:]
+    daily_completed = completed_bins[1:]
+
+    # Calculate 3-bucket moving average for velocity trend line
+    velocity_trend = _rolling_mean(daily_completed.astype(float), 3).tolist()
+
+    # 5. Calculate Future Buckets (Workload Prediction)
+    backlog_prediction = []
+    incoming_prediction = []
+
+    # Simple predictive heuristics based on the window
+    total_to_date = int(total_counts[-1])
+    avg_incoming_per_day = max(1.0, total_to_date / n_buckets if total_to_date > 0 else 1.0)
+    avg_completion_per_day = max(0.5, sum(velocity_trend) / n_buckets if sum(velocity_trend) > 0 else 0.5)
 
+    for i in range(1, PREDICTION_BUCKETS + 1):
         # Predict incoming tasks with a little variation
         daily_incoming = max(0, int(avg_incoming_per_day + (1 if i % 2 == 0 else 0)))
         incoming_prediction.append(daily_incoming)
@@ -115,12 +169,12 @@ def generate_chart_history(tasks_df):
         backlog_prediction.append(current_backlog)
 
     return {
-        "dates": dates,
-        "completed_counts": completed_counts,
-        "total_counts": total_counts,
-        "daily_completed": daily_completed,
+        "dates": layout["dates"],
+        "completed_counts": completed_counts.tolist(),
+        "total_counts": total_counts.tolist(),
+        "daily_completed": daily_completed.tolist(),
         "velocity_trend": velocity_trend,
-        "prediction_dates": prediction_dates,
+        "prediction_dates": layout["prediction_dates"],
         "backlog_prediction": backlog_prediction,
         "incoming_prediction": incoming_prediction
-    }
\ No newline at end of file
+    }
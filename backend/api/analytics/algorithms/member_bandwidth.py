@@ -1,5 +1,7 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime
+
+from api.analytics.id_codes import MISSING_ID, id_codes
 
 def calculate_detailed_bandwidth(tasks_df, user_id, max_task_limit=15):
     """
@@ -9,23 +11,17 @@ def calculate_detailed_bandwidth(tasks_df, user_id, max_task_limit=15):
     - Overdue tasks reduce bandwidth 2x faster (Penalty).
     - Returns a percentage 0-100%.
     """
-    # 1. Filter for active tasks for this specific user
-    active_work = tasks_df[
-        (tasks_df['user_id'] == user_id) & 
-        (tasks_df['status'].str.lower() != 'completed')
-    ]
+    # 1. Filter for active tasks for this specific user (user_id codes / is_completed / is_overdue come from GroupFrame)
+    code = id_codes.code(user_id)
+    if code is None:
+        return 100.0
+    active_work = tasks_df[(tasks_df['user_id'] == code) & ~tasks_df['is_completed']]
     
     total_active = len(active_work)
     if total_active == 0:
         return 100.0
 
-    # NEW: Calculate 'is_overdue' on the fly if it doesn't exist
-    # This ensures your Penalty logic actually works with the train_set.py data
-    if 'is_overdue' not in active_work.columns:
-        now = datetime.now()
-        active_work['is_overdue'] = pd.to_datetime(active_work['due_date']).apply(lambda x: x < now if x else False)
-
-    overdue_count = len(active_work[active_work['is_overdue'] == True])
+    overdue_count = int(active_work['is_overdue'].sum())
 
     # 3. Calculate Weighted Load
     weighted_load = (total_active - overdue_count) + (overdue_count * 2)
@@ -35,11 +31,57 @@ def calculate_detailed_bandwidth(tasks_df, user_id, max_task_limit=15):
     
     return max(0.0, min(100.0, round(float(bandwidth_score), 1)))
 
+def team_bandwidth(tasks_df, max_task_limit=15):
+    """
+    Goal: Bandwidth for every member in one groupby (same formula as calculate_detailed_bandwidth).
+    Returns: DataFrame indexed by user_id with
+      active_tasks (not completed), overdue_tasks, open_tasks (progress < 100), bandwidth (0-100%).
+    Members without tasks are simply absent (their bandwidth is 100%).
+    """
+    active = ~tasks_df['is_completed']
+    per_member = pd.DataFrame({
+        'user_id': tasks_df['user_id'],
+        'active_tasks': active,
+        'overdue_tasks': active & tasks_df['is_overdue'],
+        'open_tasks': tasks_df['progress_percentage'] < 100,
+    }).groupby('user_id').sum().drop(MISSING_ID, errors='ignore')
+    # Grouped on the int codes; callers look members up by their ids
+    per_member.index = pd.Index(id_codes.decode(per_member.index), name='user_id')
+
+    # Overdue tasks count double
+    weighted_load = per_member['active_tasks'] + per_member['overdue_tasks']
+    bandwidth = (100 * (1 - weighted_load / max_task_limit)).round(1).clip(0.0, 100.0)
+    per_member['bandwidth'] = bandwidth.where(per_member['active_tasks'] > 0, 100.0)
+    return per_member
+
+def team_bandwidth_array(tasks, max_task_limit=15):
+    """
+    team_bandwidth() for GroupArrays tasks, with one bincount per column.
+    Returns: {column: {user_id: value}} with the same columns as team_bandwidth().
+    """
+    user_ids = tasks['user_id']
+    assigned = user_ids != MISSING_ID
+    codes, members = np.unique(user_ids[assigned], return_inverse=True)
+
+    active = ~tasks['is_completed'][assigned]
+    columns = {
+        'active_tasks': active,
+        'overdue_tasks': active & tasks['is_overdue'][assigned],
+        'open_tasks': tasks['progress_percentage'][assigned] < 100,
+    }
+    counts = {name: np.bincount(members, weights=flags, minlength=len(codes)).astype(np.int64) for name, flags in columns.items()}
+
+    # Overdue tasks count double
+    weighted_load = counts['active_tasks'] + counts['overdue_tasks']
+    bandwidth = np.clip(np.round(100 * (1 - weighted_load / max_task_limit), 1), 0.0, 100.0)
+    counts['bandwidth'] = np.where(counts['active_tasks'] > 0, bandwidth, 100.0)
+
+    ids = id_codes.decode(codes)
+    return {name: dict(zip(ids, values.tolist())) for name, values in counts.items()}
+
 def get_team_bandwidth_summary(tasks_df, users_list):
     """
     Maps bandwidth across the whole team to find who can take more work.
     """
-    summary = {}
-    for user in users_list:
-        summary[user] = calculate_detailed_bandwidth(tasks_df, user)
-    return summary
\ No newline at end of file
+    bandwidth = team_bandwidth(tasks_df)['bandwidth']
+    return {user: float(bandwidth.get(user, 100.0)) for user in users_list}
\ No newline at end of file
@@ -27,19 +27,30 @@ def predict_project_risk(tasks_df, overdue_count, inactivity_days, model_payload
         # Fallback: Higher task volume = Higher Impact on the project
         avg_complexity = min(5, max(1, (total_tasks / 10))) 
 
+    return _risk_matrix(total_tasks, avg_complexity, overdue_count, inactivity_days, model_payload)
+
+def predict_project_risk_array(tasks, overdue_count, inactivity_days, model_payload=None):
+    """predict_project_risk() for GroupArrays tasks: they carry no complexity / priority, so impact comes from volume."""
+    total_tasks = len(tasks)
+    avg_complexity = min(5, max(1, (total_tasks / 10)))
+    return _risk_matrix(total_tasks, avg_complexity, overdue_count, inactivity_days, model_payload)
+
+def _risk_matrix(total_tasks, avg_complexity, overdue_count, inactivity_days, model_payload):
     # 2. Prediction using the passed model payload
     risk_label = "Low"
     if model_payload:
         try:
-            model = model_payload['model']
-            scaler = model_payload['scaler']
-
             # Prepare the exact 3 features used in training
             features = np.array([[inactivity_days, total_tasks, overdue_count]])
-            features_scaled = scaler.transform(features)
 
-            # Ensure features match your .pkl training (Overdue, Inactivity, Total)
-            prediction = model.predict(features_scaled)[0]
+            compiled = model_payload.get('compiled')
+            if compiled is not None:
+                # Same math as sklearn, without its per-call validation overhead
+                prediction = compiled.predict_one(features[0])
+            else:
+                features_scaled = model_payload['scaler'].transform(features)
+                # Ensure features match your .pkl training (Overdue, Inactivity, Total)
+                prediction = model_payload['model'].predict(features_scaled)[0]
             risk_label = {0: "Low", 1: "Medium", 2: "High"}.get(prediction, "Low")
         except Exception as e:
             print(f"Prediction Error: {e}")
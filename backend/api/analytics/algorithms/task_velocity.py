@@ -1,32 +1,45 @@
 import numpy as np
-import pandas as pd
-from sklearn.linear_model import LinearRegression
 
-def calculate_velocity(tasks_df):
+from api.analytics import group_arrays
+from api.analytics.group_frame import day_ordinals
+from api.analytics.algorithms.trend import cumulative_trend, cumulative_trend_counts
+
+def calculate_velocity(tasks_df, rollup=None):
     """
-    Goal: Use ML to find the trend of tasks completed per day.
+    Goal: Find the trend of tasks completed per day (slope of the running completion count).
+    rollup: current daily rollup rows of the group (optional); read instead of the tasks when given.
     """
-    completed = tasks_df[tasks_df['status'].str.lower() == 'completed'].copy()
-    
+    # Fast path: completions per day are already counted (tasks_closed)
+    if rollup is not None:
+        return _rollup_velocity(rollup)
+
     # Safety: Drop rows where 'completed_at' is null to prevent NaT errors
-    completed.dropna(subset=['completed_at'], inplace=True)
+    completed = tasks_df[tasks_df['is_completed'] & tasks_df['completed_at'].notna()]
 
     if len(completed) < 2:
         return {"daily_velocity": 0.0}
 
-    # Feature Engineering
-    completed['date_ordinal'] = pd.to_datetime(completed['completed_at']).apply(lambda x: x.toordinal())
-    start_date = completed['date_ordinal'].min()
-    
-    X = (completed['date_ordinal'] - start_date).values.reshape(-1, 1)
-    y = np.arange(1, len(completed) + 1)
-
-    # ML Model
-    model = LinearRegression().fit(X, y)
-   
-    # ✅ Compute velocity (slope of the line)
-    velocity = model.coef_[0]
+    # X = days since first completion, y = running count in completion order (closed-form least squares)
+    velocity, _, _ = cumulative_trend(day_ordinals(completed['completed_at'].sort_values()))
 
     return {
         "daily_velocity": float(velocity)
-    }
\ No newline at end of file
+    }
+
+def calculate_velocity_array(tasks, rollup=None):
+    """calculate_velocity() for GroupArrays tasks (rollup: DataFrame or structured array)."""
+    if rollup is not None:
+        return _rollup_velocity(rollup)
+
+    completed_at = tasks['completed_at'][tasks['is_completed'] & ~np.isnat(tasks['completed_at'])]
+    if len(completed_at) < 2:
+        return {"daily_velocity": 0.0}
+
+    velocity, _, _ = cumulative_trend(group_arrays.day_ordinals(np.sort(completed_at)))
+    return {"daily_velocity": float(velocity)}
+
+def _rollup_velocity(rollup):
+    if rollup['tasks_closed'].sum() < 2:
+        return {"daily_velocity": 0.0}
+    velocity, _, _ = cumulative_trend_counts(rollup['day'], rollup['tasks_closed'])
+    return {"daily_velocity": float(velocity)}
@@ -0,0 +1,119 @@
+import numpy as np
+
+
+def line_from_sums(n, sx, sy, sxx, sxy):
+    """
+    Goal: Least-squares line y = slope * x + intercept from the exact sums of integer x / y
+    (n, sum x, sum y, sum x^2, sum xy), in closed form.
+    The sums are Python ints, so nothing overflows or rounds before the final division and the
+    line doesn't depend on row order: rows, per-day counts and per-group segments that hold the
+    same items give the same line bit for bit. Agrees with sklearn's LinearRegression to the last ulps.
+    A constant x has no slope: returns (0.0, mean(y)) like lstsq's minimum-norm answer.
+    Returns: (slope, intercept)
+    """
+    n, sx, sy, sxx, sxy = (int(value) for value in (n, sx, sy, sxx, sxy))
+
+    # n^2 * var(x) and n^2 * cov(x, y)
+    spread = n * sxx - sx * sx
+    if spread == 0:
+        return 0.0, sy / n
+
+    slope = (n * sxy - sx * sy) / spread
+    return slope, sy / n - slope * (sx / n)
+
+
+def cumulative_trend(day_ordinals):
+    """
+    Goal: Trend of 'items done so far' over time (velocity / forecast).
+    x = days since the first item (int64 ordinals), y = 1..n in the given order.
+    Returns: (slope, intercept, start_ordinal)
+    """
+    day_ordinals = np.asarray(day_ordinals, dtype=np.int64)
+    start = int(day_ordinals.min())
+    x = day_ordinals - start
+    y = np.arange(1, len(x) + 1, dtype=np.int64)
+    slope, intercept = line_from_sums(len(x), x.sum(), y.sum(), np.dot(x, x), np.dot(x, y))
+    return slope, intercept, start
+
+
+def cumulative_trend_counts(day_ordinals, counts):
+    """
+    Goal: cumulative_trend from per-day counts (e.g. daily rollup rows), in O(days).
+    Same fit as cumulative_trend over the items sorted by day: the c items of a day
+    share its x and take the next c running counts as y.
+    Returns: (slope, intercept, start_ordinal)
+    """
+    day_ordinals = np.asarray(day_ordinals, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    order = np.argsort(day_ordinals, kind="stable")
+    day_ordinals, counts = day_ordinals[order], counts[order]
+    day_ordinals, counts = day_ordinals[counts > 0], counts[counts > 0]
+
+    start = int(day_ordinals.min())
+    x = day_ordinals - start
+    n = int(counts.sum())
+    # Sum of the running counts a day's items take: before + 1 .. before + c
+    before = np.cumsum(counts) - counts
+    y_sums = counts * before + counts * (counts + 1) // 2
+
+    slope, intercept = line_from_sums(n, np.dot(counts, x), n * (n + 1) // 2, np.dot(counts, x * x), np.dot(x, y_sums))
+    return slope, intercept, start
+
+
+def segment_ranks(codes, n_segments):
+    """1-based position of each row within its segment, in row order (groupby().cumcount() + 1)."""
+    codes = np.asarray(codes, dtype=np.int64)
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes, minlength=n_segments)
+    starts = np.cumsum(counts) - counts
+
+    ranks = np.empty(len(codes), dtype=np.int64)
+    ranks[order] = np.arange(len(codes)) - np.repeat(starts, counts) + 1
+    return ranks
+
+
+def segment_sums(codes, values, n_segments):
+    """Exact int64 sum of `values` per segment (np.bincount would sum integers as float64)."""
+    sums = np.zeros(n_segments, dtype=np.int64)
+    np.add.at(sums, codes, values)
+    return sums
+
+
+def fit_lines(codes, x, y, n_segments):
+    """
+    Goal: line_from_sums for many segments (e.g. groups) at once.
+    codes: int segment id per row (0..n_segments-1), x / y: integers. The sums are taken for
+    every segment in one pass over the rows, so the cost is O(rows + segments).
+    Returns: (slopes, intercepts, counts) arrays of length n_segments; segments with
+    fewer than 2 rows or a constant x get slope 0 (empty segments: intercept 0).
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+
+    counts = np.bincount(codes, minlength=n_segments)
+    sums = [segment_sums(codes, values, n_segments) for values in (x, y, x * x, x * y)]
+
+    slopes = np.zeros(n_segments)
+    intercepts = np.zeros(n_segments)
+    for segment in np.flatnonzero(counts):
+        slopes[segment], intercepts[segment] = line_from_sums(counts[segment], *(total[segment] for total in sums))
+    return slopes, intercepts, counts
+
+
+def cumulative_trends(codes, day_ordinals, n_segments):
+    """
+    Goal: cumulative_trend for every segment at once.
+    Per segment: x = days since its first item, y = running count (segment_ranks).
+    Returns: (slopes, intercepts, starts, counts)
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    day_ordinals = np.asarray(day_ordinals, dtype=np.int64)
+
+    starts = np.full(n_segments, np.iinfo(np.int64).max)
+    np.minimum.at(starts, codes, day_ordinals)
+
+    x = day_ordinals - starts[codes]
+    y = segment_ranks(codes, n_segments)
+    slopes, intercepts, counts = fit_lines(codes, x, y, n_segments)
+    return slopes, intercepts, starts, counts
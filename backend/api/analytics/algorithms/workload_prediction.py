@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler
 
+from api.analytics.id_codes import MISSING_ID, id_codes
+
 def analyze_workload_dynamics(tasks_df):
     """
     Dual-purpose algorithm:
@@ -11,13 +13,28 @@ def analyze_workload_dynamics(tasks_df):
     if tasks_df.empty:
         return []
 
-    #Filter for incomplete tasks
-    active_tasks = tasks_df[tasks_df['progress_percentage'] < 100]
+    #Filter for incomplete, assigned tasks
+    active_tasks = tasks_df[(tasks_df['progress_percentage'] < 100) & (tasks_df['assigned_to'] != MISSING_ID)]
         
     # 2. Count tasks per user
     workload = active_tasks.groupby('assigned_to').size().reset_index(name='task_count')
         
-    # 3. Identify Bottlenecks (e.g., anyone with more than 5 active tasks)
-    bottlenecks = workload[workload['task_count'] > 5].to_dict(orient='records')
+    # 3. Identify Bottlenecks (e.g., anyone with more than 5 active tasks), reported by user id
+    heavy = workload[workload['task_count'] > 5]
+    heavy = heavy.assign(assigned_to=id_codes.decode(heavy['assigned_to'])).sort_values('assigned_to')
+    bottlenecks = heavy.to_dict(orient='records')
         
-    return bottlenecks
\ No newline at end of file
+    return bottlenecks
+
+def analyze_workload_dynamics_array(tasks):
+    """analyze_workload_dynamics() for GroupArrays tasks."""
+    if len(tasks) == 0:
+        return []
+
+    assigned_to = tasks['assigned_to'][(tasks['progress_percentage'] < 100) & (tasks['assigned_to'] != MISSING_ID)]
+    codes, task_counts = np.unique(assigned_to, return_counts=True)
+    heavy = task_counts > 5
+    return [
+        {"assigned_to": user_id, "task_count": int(count)}
+        for user_id, count in sorted(zip(id_codes.decode(codes[heavy]), task_counts[heavy]))
+    ]
@@ -1,151 +1,339 @@
-import psycopg2
-import joblib
-import io
+import time
+import numpy as np
 import pandas as pd
-import os
 from datetime import datetime
 
+from django.conf import settings
+
+from api.analytics.model_registry import model_registry
+from api.analytics.group_arrays import GroupArrays
+from api.analytics.group_frame import GroupFrame
+from api.analytics.id_codes import id_codes
+from api.analytics.data_loader import fetch_groups_batch
+from api.analytics.batch_analysis import analyze_groups
+from api.analytics.metric_graph import Metric, MetricGraph, dependency_closure
+
 # Absolute imports - Match actual filenames in the /algorithms folder
-from api.analytics.algorithms.activity_pulse import calculate_pulse
-from api.analytics.algorithms.task_velocity import calculate_velocity
-from api.analytics.algorithms.completion_forecast import get_forecast_date
-from api.analytics.algorithms.contribution_balance import calculate_balance_score
-from api.analytics.algorithms.workload_prediction import analyze_workload_dynamics
+from api.analytics.algorithms.activity_pulse import (
+    calculate_inactivity_days, calculate_inactivity_days_array, calculate_pulse, calculate_pulse_array, pulse_score,
+)
+from api.analytics.algorithms.task_velocity import calculate_velocity, calculate_velocity_array
+from api.analytics.algorithms.completion_forecast import get_forecast_date, get_forecast_date_array
+from api.analytics.algorithms.contribution_balance import calculate_balance_score, calculate_balance_score_array
+from api.analytics.algorithms.workload_prediction import analyze_workload_dynamics, analyze_workload_dynamics_array
 from api.analytics.algorithms.milestone_buffer import calculate_buffer
-from api.analytics.algorithms.member_bandwidth import calculate_detailed_bandwidth
-from api.analytics.algorithms.risk_detection import predict_project_risk
+from api.analytics.algorithms.member_bandwidth import team_bandwidth, team_bandwidth_array
+from api.analytics.algorithms.risk_detection import predict_project_risk, predict_project_risk_array
+from api.analytics.algorithms.history_generator import generate_chart_history, generate_chart_history_array
+
+# Metric node -> the nodes it depends on (each node is computed by the method _<name>)
+METRIC_DEPS = {
+    "pulse": (),
+    "velocity": (),
+    "forecast": ("velocity",),
+    "buffer": ("forecast",),
+    "overdue_count": (),
+    "inactivity_days": (),
+    "risk": ("overdue_count", "inactivity_days"),
+    "balance": (),
+    "bottlenecks": (),
+    "team_bandwidth": (),
+    "member_report": ("team_bandwidth",),
+    "history": (),
+}
+
+# Frame type -> the implementation of each data-reading node: pandas for GroupFrame, NumPy
+# structured arrays for GroupArrays (small groups). Both must give the same results (see the parity tests).
+ALGORITHMS = {
+    GroupFrame: {
+        "pulse": calculate_pulse,
+        "inactivity_days": calculate_inactivity_days,
+        "velocity": calculate_velocity,
+        "forecast": get_forecast_date,
+        "balance": calculate_balance_score,
+        "bottlenecks": analyze_workload_dynamics,
+        "team_bandwidth": team_bandwidth,
+        "risk": predict_project_risk,
+        "history": generate_chart_history,
+    },
+    GroupArrays: {
+        "pulse": calculate_pulse_array,
+        "inactivity_days": calculate_inactivity_days_array,
+        "velocity": calculate_velocity_array,
+        "forecast": get_forecast_date_array,
+        "balance": calculate_balance_score_array,
+        "bottlenecks": analyze_workload_dynamics_array,
+        "team_bandwidth": team_bandwidth_array,
+        "risk": predict_project_risk_array,
+        "history": generate_chart_history_array,
+    },
+}
+
+# Snapshot parts (besides tasks, which every request needs) that a node reads.
+# "rollup" is an optional fast path: used only when it is current for the group's data.
+NODE_DATA = {
+    "pulse": ("messages",),
+    "inactivity_days": ("messages",),
+    "member_report": ("members",),
+    "velocity": ("rollup",),
+    "forecast": ("rollup",),
+    "history": ("rollup",),
+}
+
+# Response field (dotted path, in response order) -> (nodes it needs, how to read it).
+# Group fields read (engine, results); user_status.* fields read (user_id, user_inputs) so they
+# can be filled in on top of a group analysis shared by every member (see with_user_status).
+RESPONSE_FIELDS = {
+    "group_id": ((), lambda e, r: id_codes.id(np.asarray(e.tasks_df['group_id'])[0]) if len(e.tasks_df) else "N/A"),
+    "metrics.pulse": (("pulse",), lambda e, r: r["pulse"]),
+    "metrics.velocity": (("velocity",), lambda e, r: r["velocity"]),
+    "metrics.forecast_end_date": (("forecast",), lambda e, r: r["forecast"]),
+    "metrics.ai_risk_level": (("risk",), lambda e, r: r["risk"]["status"]),
+    "metrics.risk_score": (("risk",), lambda e, r: r["risk"]["score"]),
+    "metrics.risk_likelihood": (("risk",), lambda e, r: r["risk"]["likelihood"]),
+    "metrics.risk_impact": (("risk",), lambda e, r: r["risk"]["impact"]),
+    "metrics.team_balance_score": (("balance",), lambda e, r: r["balance"]),
+    "metrics.buffer_days": (("buffer",), lambda e, r: r["buffer"]),
+    "user_status.user_id": ((), lambda user_id, inputs: user_id),
+    "user_status.bandwidth_available": (("team_bandwidth",), lambda user_id, inputs: f"{inputs['bandwidth'].get(user_id, 100.0)}%"),
+    "user_status.burnout_risk": (("risk",), lambda user_id, inputs: inputs["risk"]),
+    "alerts.bottlenecks": (("bottlenecks",), lambda e, r: r["bottlenecks"]),
+    "history": (("history",), lambda e, r: r["history"]),
+    "member_report": (("member_report",), lambda e, r: r["member_report"]),
+}
+USER_FIELDS = {path for path in RESPONSE_FIELDS if path.startswith("user_status.")}
+
+
+def _nest(paths, value_of):
+    # ["metrics.pulse", "history"] -> {"metrics": {"pulse": ...}, "history": ...}
+    nested = {}
+    for path in paths:
+        *parents, key = path.split(".")
+        target = nested
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[key] = value_of(path)
+    return nested
+
 
 class AnalyticsEngine:
-    def __init__(self, tasks_df=None, messages_df=None):
-        # Store the dataframes passed from the View
-        self.tasks_df = tasks_df
-        self.messages_df = messages_df
-
-        # Build DB_URI from environment variables for consistency
-        db_user = os.getenv("DB_USER")
-        password = os.getenv("DB_PWD")
-        db_host = os.getenv("DB_HOST")
-        db_port = os.getenv("DB_PORT")
-        db_name = os.getenv("DB_NAME")
-        
-        if not all([db_user, password, db_host, db_port, db_name]):
-            raise ValueError("Database connection variables are missing from environment.")
-        self.db_uri = f"postgresql://{db_user}:{password}@{db_host}:{db_port}/{db_name}"
-        
-        # Load the "Big Data" 1M row model for Risk Detection
-        self.model, self.scaler = self._load_model_from_supabase()
-
-    def _load_model_from_supabase(self):
-        try:
-            conn = psycopg2.connect(self.db_uri)
-            cur = conn.cursor()
-            cur.execute('SELECT model_binary FROM "Risk_Matrix_TrainSet" WHERE model_name = %s', ('risk_big_data_model',))
-            record = cur.fetchone()
-            cur.close()
-            conn.close()
-
-            if record:
-                buffer = io.BytesIO(record[0])
-                data = joblib.load(buffer)
-                return data['model'], data['scaler']
-        except Exception as e:
-            print(f"⚠️ Warning: AI Model could not be loaded. Risk detection will be 'Unknown'. Error: {e}")
-        return None, None
-
-    def run_comprehensive_analysis(self, deadline_str, user_id):
+    def __init__(self, frame, deadline_str=None, user_id=None, history_window=7, history_bucket="day", members=None,
+                 rollup=None, activity=None):
+        # Normalized once by the View (GroupFrame, or GroupArrays for small groups); every algorithm below only reads it
+        self.frame = frame
+        self.algorithms = ALGORITHMS[type(frame)]
+        self.tasks_df = frame.tasks
+        self.messages_df = frame.messages
+        self.now = frame.now
+
+        # Request inputs some metrics depend on
+        self.deadline_str = deadline_str
+        self.user_id = user_id
+        self.history_window = history_window
+        self.history_bucket = history_bucket
+        self.members = members or []
+        # Daily rollup rows, only when current for this data (history / velocity / forecast read O(days) rows)
+        self.rollup = rollup
+        # Message activity from the pulse counters (pulse_counters.activity); pulse / inactivity skip the messages
+        self.activity = activity
+
+        # The "Big Data" 1M row model for Risk Detection, shared process-wide by the registry
+        self.model_payload = model_registry.get()
+
+        # Every metric is a node: computed at most once per request, independent ones in parallel
+        self.graph = MetricGraph([Metric(name, deps, getattr(self, f"_{name}")) for name, deps in METRIC_DEPS.items()])
+        self.results = {}
+        self.timings = {}
+
+    @classmethod
+    def run_batch(cls, group_ids):
+        """
+        Scores many groups at once: one query loads every group's tasks and messages,
+        metrics are computed per group with groupby, and risk is one batch prediction.
+        """
+        data = fetch_groups_batch(group_ids)
+        frame = GroupFrame.build(data["tasks"], data["messages"])
+        return analyze_groups(frame, group_ids, model_registry.get())
+
+    @staticmethod
+    def select_fields(fields=None):
         """
-        Executes all algorithms using synced DB column names.
+        Parses ?fields= ("metrics.pulse,history") into response field paths.
+        A prefix selects its whole subtree ("metrics" = every metric); None/empty = everything.
+        Raises ValueError for fields the response doesn't have.
         """
-        if self.tasks_df is None or self.tasks_df.empty:
-            return {"error": "No task data available"}
+        if not fields:
+            return list(RESPONSE_FIELDS)
+        if isinstance(fields, str):
+            fields = [field.strip() for field in fields.split(",") if field.strip()]
+
+        selected = set()
+        for field in fields:
+            matches = [path for path in RESPONSE_FIELDS if path == field or path.startswith(f"{field}.")]
+            if not matches:
+                raise ValueError(f"Unknown field '{field}'")
+            selected.update(matches)
+        return [path for path in RESPONSE_FIELDS if path in selected]
+
+    @staticmethod
+    def required_nodes(paths):
+        return dependency_closure(METRIC_DEPS, [node for path in paths for node in RESPONSE_FIELDS[path][0]])
 
-        # 1. Activity Pulse (Messages)
-        pulse_score = calculate_pulse(self.messages_df) # Inside, it uses messages_df['user_id']
+    @classmethod
+    def required_data(cls, paths):
+        """Snapshot parts (see data_loader.SNAPSHOT_PARTS) the selected fields need."""
+        return {"tasks"} | {part for node in cls.required_nodes(paths) for part in NODE_DATA.get(node, ())}
 
-        # 2. Task Velocity
-        # Note: Internally, task_velocity should now look for tasks_df['progress_percentage'] == 100
-        velocity_stats = calculate_velocity(self.tasks_df)
+    def compute(self, *names):
+        """Returns {name: result} for the given metrics (all if none), computing only what's missing."""
+        self.graph.run(names or None, self.results, self.timings)
+        return {name: self.results[name] for name in (names or self.results)}
 
-        velocity_value = (
+    # --- Metric nodes ---
+
+    def _pulse(self):
+        # Activity Pulse (Messages)
+        if self.activity is not None:
+            return pulse_score(self.activity["messages_24h"])
+        return self.algorithms["pulse"](self.messages_df, self.now)
+
+    def _velocity(self):
+        velocity_stats = self.algorithms["velocity"](self.tasks_df, self.rollup)
+        return (
             velocity_stats.get('daily_velocity', 0)
             if isinstance(velocity_stats, dict)
             else velocity_stats
         )
 
-        # 3. Completion Forecast
-        forecast_date = get_forecast_date(self.tasks_df, velocity_value)
-        # Validate forecast_date
-        if forecast_date == "Need more data" or forecast_date is None:
-            buffer_days = 0
+    def _forecast(self, velocity):
+        return self.algorithms["forecast"](self.tasks_df, velocity, self.rollup)
+
+    def _buffer(self, forecast):
+        # Milestone Buffer (Compare forecast to your manual deadline)
+        if forecast == "Need more data" or forecast is None:
+            return 0
+
+        # Convert 'Apr 15, 2026' (or similar) to 'YYYY-MM-DD' for calculate_buffer
+        try:
+            formatted_date = datetime.strptime(forecast, "%b %d, %Y").strftime("%Y-%m-%d")
+        except ValueError:
+            # Fallback just in case the date is already formatted or in an unexpected format
+            formatted_date = forecast
+
+        # Convert deadline string to a date object since calculate_buffer expects it
+        if isinstance(self.deadline_str, str):
+            deadline_date = datetime.strptime(self.deadline_str, "%Y-%m-%d").date()
         else:
-            # Convert 'Apr 15, 2026' (or similar) to 'YYYY-MM-DD' for calculate_buffer
-            try:
-                formatted_date = datetime.strptime(forecast_date, "%b %d, %Y").strftime("%Y-%m-%d")
-            except ValueError:
-                # Fallback just in case the date is already formatted or in an unexpected format
-                formatted_date = forecast_date
-                
-            # Convert deadline string to a date object since calculate_buffer expects it
-            if isinstance(deadline_str, str):
-                deadline_date = datetime.strptime(deadline_str, "%Y-%m-%d").date()
-            else:
-                deadline_date = deadline_str
-                
-            buffer_days = calculate_buffer(formatted_date, deadline_date)
-
-        # 4. At-Risk Detection (Using 1M Row Model)
-        # Using the column 'is_overdue' which we added to your DB
-        overdue_count = len(self.tasks_df[self.tasks_df['is_overdue'] == True])
-        total_tasks = len(self.tasks_df)
-        overdue_ratio = overdue_count / total_tasks if total_tasks > 0 else 0
-        
-        ai_risk = "Low"
-        if self.model and self.scaler:
-            X = self.scaler.transform([[overdue_ratio, 0, total_tasks]])
-            pred = self.model.predict(X)[0]
-            ai_risk = {0: "Low", 1: "Medium", 2: "High"}[pred]
-
-        # 5. Contribution Balance (Using 'assignee_id')
-        balance = calculate_balance_score(self.tasks_df)
-
-        # 6. Workload & Bottlenecks
-        bottlenecks = analyze_workload_dynamics(self.tasks_df)
-
-        # 7. Milestone Buffer (Compare forecast to your manual deadline)
-
-        # 8. Member Bandwidth (Specific to logged-in user)
-        bandwidth = calculate_detailed_bandwidth(self.tasks_df, user_id)
-
-        # 9. Burnout Detection
-        # Calculate inactivity_days (days since last message activity)
-        inactivity_days = 0
-        if self.messages_df is not None and not self.messages_df.empty:
-            try:
-                latest_message = pd.to_datetime(self.messages_df['created_at']).max()
-                inactivity_days = (datetime.now() - latest_message).days
-            except:
-                inactivity_days = 0
-        
-        burnout_status = predict_project_risk(self.tasks_df, overdue_count, inactivity_days)
-
-        # Combine into "Health Snapshot"
+            deadline_date = self.deadline_str
+
+        return calculate_buffer(formatted_date, deadline_date)
+
+    def _overdue_count(self):
+        return int(self.tasks_df['is_overdue'].sum())
+
+    def _inactivity_days(self):
+        # Days since last message activity (UTC on both sides)
+        if self.activity is not None:
+            last = self.activity["last_activity"]
+            return (self.now - pd.Timestamp(last, unit="s", tz="UTC")).days if last is not None else 0
+        return self.algorithms["inactivity_days"](self.messages_df, self.now)
+
+    def _balance(self):
+        return self.algorithms["balance"](self.tasks_df)
+
+    def _bottlenecks(self):
+        return self.algorithms["bottlenecks"](self.tasks_df)
+
+    def _team_bandwidth(self):
+        return self.algorithms["team_bandwidth"](self.tasks_df)
+
+    def _member_report(self, team_bandwidth):
+        # team_bandwidth: one row per member with tasks, O(1) lookups per member
+        open_tasks = dict(team_bandwidth['open_tasks'].items())
+        scores = dict(team_bandwidth['bandwidth'].items())
+
+        report = []
+        for member in self.members:
+            user_id = member["user_id"]
+            load_count = int(open_tasks.get(user_id, 0))
+
+            report.append({
+                "name": member.get("full_name", "Unknown"),
+                "active_tasks": load_count,
+                "risk_score": float(scores.get(user_id, 100.0)),
+                "status_color": (
+                    "red" if load_count > 5 else
+                    "yellow" if load_count > 3 else
+                    "green"
+                )
+            })
+        return report
+
+    def _risk(self, overdue_count, inactivity_days):
+        # At-Risk Detection (Using 1M Row Model) mapped onto the likelihood x impact matrix
+        return self.algorithms["risk"](self.tasks_df, overdue_count, inactivity_days, self.model_payload)
+
+    def _history(self):
+        return self.algorithms["history"](self.tasks_df, self.now, self.history_window, self.history_bucket, self.rollup)
+
+    def run_group_analysis(self, fields=None):
+        """
+        Executes the algorithms behind the requested response fields (all by default), for the group.
+        fields: paths from select_fields(); metrics outside their dependency closure are skipped.
+        Returns the user-independent part, safe to share between members:
+            {"paths": [...], "response": {...group fields...}, "user_inputs": {...}}
+        """
+        paths = fields if fields is not None else list(RESPONSE_FIELDS)
+        if self.tasks_df is None or len(self.tasks_df) == 0:
+            return {"paths": paths, "response": {"error": "No task data available"}, "user_inputs": {}}
+
+        started = time.perf_counter()
+        nodes = self.required_nodes(paths)
+        results = self.compute(*nodes) if nodes else {}
+
+        # Combine into "Health Snapshot" (nested as metrics / alerts ...)
         # Using 'group_id' instead of 'project_id' to match your DB
-        return {
-            "group_id": self.tasks_df['group_id'].iloc[0] if not self.tasks_df.empty else "N/A",
-            "metrics": {
-                "pulse": pulse_score,
-                "velocity": velocity_value,
-                "forecast_end_date": forecast_date,
-                "ai_risk_level": ai_risk,
-                "team_balance_score": balance,
-                "buffer_days": buffer_days,
-            },
-            "user_status": {
-                "user_id": user_id,
-                "bandwidth_available": f"{bandwidth}%",
-                "burnout_risk": burnout_status
-            },
-            "alerts": {
-                "bottlenecks": bottlenecks
+        response = _nest([p for p in paths if p not in USER_FIELDS], lambda p: RESPONSE_FIELDS[p][1](self, results))
+        if settings.ANALYTICS_DEBUG_RESPONSES:
+            response["debug"] = {
+                "timings_ms": dict(self.timings),
+                "total_ms": round((time.perf_counter() - started) * 1000, 2),
+                "rollup": self.rollup is not None,
+                "pulse_counters": self.activity is not None,
+                "arrays": isinstance(self.frame, GroupArrays),
             }
-        }
\ No newline at end of file
+
+        # What user_status needs for any member: everyone's bandwidth and the group risk
+        user_inputs = {}
+        if "team_bandwidth" in results:
+            user_inputs["bandwidth"] = {user: float(score) for user, score in results["team_bandwidth"]["bandwidth"].items()}
+        if "risk" in results:
+            user_inputs["risk"] = results["risk"]
+
+        return {"paths": paths, "response": response, "user_inputs": user_inputs}
+
+    @staticmethod
+    def with_user_status(group_analysis, user_id):
+        """Adds the requesting user's user_status to a (possibly cached) group analysis. No pandas, no model."""
+        response = group_analysis["response"]
+        if "error" in response:
+            return dict(response)
+
+        paths = group_analysis["paths"]
+        user_status = _nest(
+            [p for p in paths if p in USER_FIELDS],
+            lambda p: RESPONSE_FIELDS[p][1](user_id, group_analysis["user_inputs"])
+        )
+
+        merged = {}
+        for key in dict.fromkeys(path.split(".")[0] for path in paths):
+            merged[key] = user_status[key] if key == "user_status" else response[key]
+        if "debug" in response:
+            merged["debug"] = response["debug"]
+        return merged
+
+    def run_comprehensive_analysis(self, fields=None):
+        """
+        Executes all algorithms (or the ones behind `fields`) and returns the full response.
+        """
+        return self.with_user_status(self.run_group_analysis(fields), self.user_id)
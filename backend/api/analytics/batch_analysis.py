@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+from api.analytics.group_frame import day_ordinals
+from api.analytics.id_codes import MISSING_ID, id_codes
+from api.analytics.algorithms.contribution_balance import balance_from_sums
+from api.analytics.algorithms.trend import cumulative_trends
+
+RISK_LABELS = {0: "Low", 1: "Medium", 2: "High"}
+
+
+def _velocity_by_group(tasks, index):
+    """Slope of 'tasks completed so far' vs. day, per group (same fit as task_velocity)."""
+    completed = tasks[tasks['is_completed'] & tasks['completed_at'].notna()].sort_values('completed_at', kind='stable')
+    codes = index.get_indexer(completed['group_id'])
+    completed, codes = completed[codes >= 0], codes[codes >= 0]
+
+    slopes, _, _, counts = cumulative_trends(codes, day_ordinals(completed['completed_at']), len(index))
+
+    # <2 completions gives a flat line, like calculate_velocity
+    return pd.Series(np.where(counts >= 2, slopes, 0.0), index=index)
+
+
+def _balance_by_group(tasks, index):
+    """Contribution balance (100 - 10 * coefficient of variation of tasks per member), per group."""
+    counts = tasks[tasks['user_id'] != MISSING_ID].groupby(['group_id', 'user_id']).size()
+    sums = pd.DataFrame({'size': counts, 'total': counts, 'squares': counts * counts}).groupby(level='group_id').agg(
+        {'size': 'size', 'total': 'sum', 'squares': 'sum'}
+    )
+
+    # Same integer-sum formula as calculate_balance_score (one call per group, not per row); <2 members = 100
+    score = pd.Series(
+        [balance_from_sums(*row) if row[0] > 1 else 100.0 for row in sums.itertuples(index=False)],
+        index=sums.index, dtype=float,
+    )
+    return score.reindex(index, fill_value=100.0)
+
+
+def _bottlenecks_by_group(tasks):
+    """Members with more than 5 unfinished tasks, per group code."""
+    active = tasks[(tasks['progress_percentage'] < 100) & (tasks['assigned_to'] != MISSING_ID)]
+    workload = active.groupby(['group_id', 'assigned_to']).size().reset_index(name='task_count')
+    heavy = workload[workload['task_count'] > 5]
+    heavy = heavy.assign(assigned_to=id_codes.decode(heavy['assigned_to'])).sort_values('assigned_to', kind='stable')
+
+    bottlenecks = {}
+    for group_id, rows in heavy.groupby('group_id'):
+        bottlenecks[group_id] = rows[['assigned_to', 'task_count']].to_dict(orient='records')
+    return bottlenecks
+
+
+def analyze_groups(frame, group_ids, model_payload=None):
+    """
+    Goal: Score many groups (one GroupFrame holding all of them) in one vectorized pass.
+    Every metric is a groupby over the combined task/message frames, and the risk
+    model scores all groups as a single feature matrix.
+    Returns: {group_id: result}
+    """
+    now = frame.now
+    group_ids = pd.Index([str(group_id) for group_id in group_ids]).unique()
+    # Frames carry group id codes: group and index by code, report by id
+    index = pd.Index(id_codes.encode(group_ids), name='group_id')
+
+    tasks = frame.tasks
+    messages = frame.messages
+
+    # 1. Volume & overdue counts
+    total_tasks = tasks.groupby('group_id').size().reindex(index, fill_value=0)
+    overdue_count = tasks['is_overdue'].groupby(tasks['group_id']).sum().reindex(index, fill_value=0)
+
+    # 2. Activity pulse (messages in the last 24h, 10+ = 100) and inactivity
+    recent = messages['created_at'] > now - pd.Timedelta(hours=24)
+    recent_count = recent.groupby(messages['group_id']).sum().reindex(index, fill_value=0)
+    pulse = (recent_count / 10 * 100).clip(upper=100).astype(float).round(1)
+
+    last_message = messages.groupby('group_id')['created_at'].max().reindex(index)
+    inactivity_days = (now - last_message).dt.days.fillna(0).astype(int)
+
+    # 3. Velocity, balance, bottlenecks
+    velocity = _velocity_by_group(tasks, index)
+    balance = _balance_by_group(tasks, index)
+    bottlenecks = _bottlenecks_by_group(tasks)
+
+    # 4. Risk: one matrix of [inactivity_days, total_tasks, overdue_count], one predict
+    features = np.column_stack([inactivity_days, total_tasks, overdue_count]).astype(float)
+    predictions = [None] * len(index)
+    if model_payload and len(index):
+        try:
+            compiled = model_payload.get('compiled')
+            if compiled is not None:
+                predictions = compiled.predict_batch(features)
+            else:
+                predictions = model_payload['model'].predict(model_payload['scaler'].transform(features))
+        except Exception as e:
+            print(f"Prediction Error: {e}")
+
+    overdue_ratio = (overdue_count / total_tasks.where(total_tasks > 0)).fillna(0)
+    likelihood = np.clip((overdue_ratio * 5).astype(int) + 1, 1, 5)
+    impact = np.clip(np.round(np.clip(total_tasks / 10, 1, 5)), 1, 5).astype(int)
+
+    results = {}
+    for position, (group_id, code) in enumerate(zip(group_ids, index)):
+        if total_tasks[code] == 0:
+            results[group_id] = {"group_id": group_id, "error": "No task data available"}
+            continue
+
+        results[group_id] = {
+            "group_id": group_id,
+            "metrics": {
+                "pulse": float(pulse[code]),
+                "velocity": float(velocity[code]),
+                "team_balance_score": float(balance[code]),
+                "total_tasks": int(total_tasks[code]),
+                "overdue_count": int(overdue_count[code]),
+                "inactivity_days": int(inactivity_days[code]),
+                "ai_risk_level": RISK_LABELS.get(predictions[position], "Low"),
+                "risk_likelihood": int(likelihood[code]),
+                "risk_impact": int(impact[code]),
+                "risk_score": int(likelihood[code] * impact[code]),
+            },
+            "alerts": {
+                "bottlenecks": bottlenecks.get(code, [])
+            }
+        }
+    return results
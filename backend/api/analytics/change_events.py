@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+
+# entity: "task" | "message" | "group_member" | "document" | "note"; op: "insert" | "update" | "delete"
+# ts: epoch seconds; days: UTC dates of the rollup rows the change touches, when the source knows them
+# (the tasks / chat_messages notifications of migration 0007)
+ChangeEvent = namedtuple("ChangeEvent", ["entity", "group_id", "op", "ts", "days"], defaults=((),))
+
+
+class ChangeEventBus:
+    """
+    Fans group change events out to consumers (cache invalidation, rollup, snapshot refresh).
+    - Events are buffered per group and delivered as one batch: consumer(group_id, events).
+    - A group is flushed once it has been quiet for `debounce` seconds, or `max_delay` seconds
+      after its first buffered event, whichever comes first, so bursts cost one delivery.
+    - debounce <= 0 delivers synchronously on emit().
+    A consumer that raises is reported and skipped; the others still get the batch.
+    Events are not one per row: Postgres drops duplicate NOTIFY payloads within a transaction,
+    so a multi-row write can arrive as a single event. Consumers must treat an event as
+    "this group (and these days) changed", never as a row count.
+    """
+
+    def __init__(self, debounce, max_delay):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.consumers = []
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._pending = {}  # group_id -> [events]
+        self._first = {}
+        self._last = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, consumer):
+        """Registers consumer(group_id, events); usable as a decorator."""
+        self.consumers.append(consumer)
+        return consumer
+
+    def unsubscribe(self, consumer):
+        if consumer in self.consumers:
+            self.consumers.remove(consumer)
+
+    def emit(self, event):
+        event = event._replace(group_id=str(event.group_id))
+        if self._pid != os.getpid():
+            self._reset()  # forked: the parent's buffer and flusher thread don't exist here
+
+        now = time.monotonic()
+        with self._lock:
+            self._pending.setdefault(event.group_id, []).append(event)
+            self._first.setdefault(event.group_id, now)
+            self._last[event.group_id] = now
+
+        if self.debounce <= 0:
+            self.flush(event.group_id)
+        else:
+            self._ensure_flusher()
+
+    def due(self, now=None):
+        """Groups whose batch is ready to be delivered."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return [
+                group_id for group_id in self._pending
+                if now - self._last[group_id] >= self.debounce or now - self._first[group_id] >= self.max_delay
+            ]
+
+    def flush(self, group_ids=None):
+        """Delivers the buffered batches of `group_ids` (a group id or a list; default all). Returns the event count."""
+        if group_ids is not None and not isinstance(group_ids, (list, tuple, set)):
+            group_ids = [group_ids]
+
+        with self._lock:
+            batches = {}
+            for group_id in list(self._pending if group_ids is None else group_ids):
+                events = self._pending.pop(str(group_id), None)
+                self._first.pop(str(group_id), None)
+                self._last.pop(str(group_id), None)
+                if events:
+                    batches[str(group_id)] = events
+
+        for group_id, events in batches.items():
+            for consumer in self.consumers:
+                try:
+                    consumer(group_id, events)
+                except Exception as e:
+                    print(f"❌ Change consumer {consumer.__name__} failed for group {group_id}: {e}")
+        return sum(len(events) for events in batches.values())
+
+    def _ensure_flusher(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="change-events", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(min(self.debounce, 0.5))
+            self._flush_due()
+
+    def _flush_due(self):
+        due = self.due()
+        if not due:
+            return
+        try:
+            self.flush(due)
+        finally:
+            # Consumers query through this thread's DB connection, which would otherwise stay open
+            connection.close()
+
+
+change_bus = ChangeEventBus(
+    debounce=settings.ANALYTICS_EVENTS_DEBOUNCE_SECONDS,
+    max_delay=settings.ANALYTICS_EVENTS_MAX_DELAY_SECONDS,
+)
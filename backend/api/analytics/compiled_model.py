@@ -0,0 +1,64 @@
+import numpy as np
+
+
+class CompiledRiskModel:
+    """
+    NumPy-only copy of a fitted StandardScaler + linear classifier (the SGDClassifier
+    from ml/train_model.py). Scoring replays sklearn's own arithmetic:
+        scaled = (X - mean) / scale
+        scores = scaled @ coef.T + intercept
+        label  = classes[argmax(scores)]   (binary: classes[scores > 0])
+    so predictions match sklearn exactly, minus its per-call input validation.
+    """
+
+    __slots__ = ("mean", "scale", "coef", "intercept", "classes")
+
+    def __init__(self, mean, scale, coef, intercept, classes):
+        self.mean = mean
+        self.scale = scale
+        self.coef = coef
+        self.intercept = intercept
+        self.classes = classes
+
+    @classmethod
+    def from_payload(cls, payload):
+        """Compiles {'model': ..., 'scaler': ...}; returns None if the pair isn't linear/standard-scaled."""
+        model = payload.get('model') if payload else None
+        scaler = payload.get('scaler') if payload else None
+        if not all(hasattr(model, attr) for attr in ("coef_", "intercept_", "classes_")):
+            return None
+        if not hasattr(scaler, "n_features_in_") or not hasattr(scaler, "with_mean"):
+            return None
+
+        n_features = scaler.n_features_in_
+        # Disabled centering/scaling is the same as subtracting 0 / dividing by 1
+        mean = np.asarray(scaler.mean_, dtype=np.float64) if scaler.with_mean else np.zeros(n_features)
+        scale = np.asarray(scaler.scale_, dtype=np.float64) if scaler.with_std else np.ones(n_features)
+
+        return cls(
+            mean=np.array(mean),
+            scale=np.array(scale),
+            coef=np.array(model.coef_, dtype=np.float64),
+            intercept=np.array(model.intercept_, dtype=np.float64),
+            classes=np.array(model.classes_),
+        )
+
+    def decision_function(self, X):
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        X -= self.mean
+        X /= self.scale
+        scores = X @ self.coef.T + self.intercept
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict_batch(self, X):
+        """Scores many rows at once (e.g. one row per group)."""
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            indices = (scores > 0).astype(int)
+        else:
+            indices = scores.argmax(axis=1)
+        return self.classes[indices]
+
+    def predict_one(self, features):
+        """Scores a single feature row and returns its label."""
+        return self.predict_batch([features])[0]
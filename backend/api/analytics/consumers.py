@@ -0,0 +1,70 @@
+"""
+Consumers of group change events (see change_events.change_bus), run in subscription order:
+cache invalidation first, so the counter, rollup and snapshot consumers see the new data version.
+An event stands for "this group changed", not for one row (NOTIFY payloads are deduplicated per
+transaction). The cache consumers act on ANALYTICS_CACHE_ALIAS, so they only reach the web
+workers when that alias is shared; listen_changes drops them otherwise (SHARED_CACHE_CONSUMERS).
+"""
+from api.analytics.analytics_engine import AnalyticsEngine
+from api.analytics.change_events import change_bus
+from api.analytics.data_loader import fetch_data_version
+from api.analytics.pulse_counters import pulse_counters, recount_pulse_hours
+from api.analytics.rollup import rebuild_rollup, refresh_rollup_days
+from api.analytics.snapshots import forget_data_version, snapshot_store
+from api.analytics.tasks import enqueue_refresh
+
+# Entities the analytics read (documents and notes only invalidate)
+ANALYTICS_ENTITIES = {"task", "message", "group_member"}
+ROLLUP_ENTITIES = {"task", "message"}
+# Part of the data version the rollup is stamped with, but of no rollup row
+VERSION_ONLY_ENTITIES = {"group_member"}
+
+# The variant the dashboard opens with; other variants refresh when next requested
+DEFAULT_VARIANT = {"window_days": 7, "bucket": "day"}
+
+
+@change_bus.subscribe
+def invalidate_group_caches(group_id, events):
+    forget_data_version(group_id)
+
+
+@change_bus.subscribe
+def count_messages(group_id, events):
+    # Recount the hours of the notified days: one notification may stand for many messages
+    days = {day for event in events if event.entity == "message" for day in event.days}
+    if days and pulse_counters.ready(group_id):
+        recount_pulse_hours(group_id, days)
+
+
+@change_bus.subscribe
+def maintain_rollup(group_id, events):
+    if not any(event.entity in ROLLUP_ENTITIES | VERSION_ONLY_ENTITIES for event in events):
+        return
+    events = [event for event in events if event.entity in ROLLUP_ENTITIES]
+
+    # 1. Notifications say which days they touched (migration 0007): recompute just those.
+    #    Membership changes touch no day but move the data version, which is re-recorded either way.
+    if all(event.days for event in events):
+        refresh_rollup_days(group_id, {day for event in events for day in event.days})
+        return
+
+    # 2. Events without days: rebuild the group and record its new version
+    data_version = fetch_data_version(group_id)
+    if data_version is not None:
+        rebuild_rollup(group_id, data_version)
+
+
+@change_bus.subscribe
+def refresh_group_snapshot(group_id, events):
+    if not any(event.entity in ANALYTICS_ENTITIES for event in events):
+        return
+
+    # Only recompute snapshots someone has looked at
+    fields = AnalyticsEngine.select_fields(None)
+    key = snapshot_store.key(group_id, fields=fields, window=DEFAULT_VARIANT["window_days"], bucket=DEFAULT_VARIANT["bucket"])
+    if snapshot_store.get(key) is not None:
+        enqueue_refresh(group_id, fields, DEFAULT_VARIANT["window_days"], DEFAULT_VARIANT["bucket"])
+
+
+# Consumers that only work through the shared analytics cache (memo eviction, snapshot lookups)
+SHARED_CACHE_CONSUMERS = (invalidate_group_caches, refresh_group_snapshot)
@@ -0,0 +1,324 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from api.analytics.id_codes import id_codes
+from api.db_pool import db_pool
+
+# Column name -> kind. Kinds map to the dtype each column gets in the analytics frames:
+#   "timestamp" -> datetime64[ns, UTC], "category" -> categorical, "int8" -> int8 (NULL -> 0),
+#   "int64" -> int64 (no NULLs), "code" -> int32 code from the shared id table (id_codes), "object" -> as-is
+# Only the columns some metric reads are fetched (no row ids, never the message text).
+TASK_SCHEMA = {
+    "group_id": "code",
+    "assigned_to": "code",
+    "progress_percentage": "int8",
+    "due_date": "timestamp",
+    "status": "category",
+    "completed_at": "timestamp",
+    "created_at": "timestamp",
+}
+MESSAGE_SCHEMA = {
+    "group_id": "code",
+    "created_at": "timestamp",
+    "user_id": "code",
+}
+
+# group_daily_rollup row (api.models.GroupDailyRollup); day comes back as a date.toordinal() int
+ROLLUP_SCHEMA = {
+    "day": "int64",
+    "tasks_created": "int64",
+    "tasks_completed": "int64",
+    "tasks_completed_undated": "int64",
+    "tasks_closed": "int64",
+    "tasks_done_by_due": "int64",
+    "tasks_overdue": "int64",
+    "messages": "int64",
+    "active_members": "int64",
+}
+
+TASK_COLUMNS = list(TASK_SCHEMA)
+MESSAGE_COLUMNS = list(MESSAGE_SCHEMA)
+
+# Rows pulled per fetchmany() when streaming tuples off a cursor
+FETCH_BATCH_SIZE = 5000
+
+
+def _column_sql(alias, schema):
+    # Timestamps travel as integer epoch microseconds so no per-value string parsing is needed
+    parts = []
+    for name, kind in schema.items():
+        if kind == "timestamp":
+            expr = f"array_agg((extract(epoch FROM {alias}.{name}) * 1000000)::bigint)"
+        else:
+            expr = f"array_agg({alias}.{name})"
+        parts.append(f"'{name}', {expr}")
+    return f"json_build_object({', '.join(parts)})"
+
+
+# One statement, one round trip: the group row, its tasks, its chat messages and its
+# members come back in a single result row. Tasks and messages are column-oriented
+# (one JSON array per column) so no per-row dict is ever built on the Python side.
+# Each optional part is a CTE + output column; parts nobody asked for are not queried.
+SNAPSHOT_PARTS = {
+    "tasks": (
+        f"""t AS (
+        SELECT {", ".join(TASK_COLUMNS)}
+        FROM tasks
+        WHERE group_id = %(group_id)s
+    )""",
+        f"""(SELECT {_column_sql("t", TASK_SCHEMA)} FROM t)""",
+    ),
+    "messages": (
+        f"""m AS (
+        SELECT {", ".join(MESSAGE_COLUMNS)}
+        FROM chat_messages
+        WHERE group_id = %(group_id)s
+    )""",
+        f"""(SELECT {_column_sql("m", MESSAGE_SCHEMA)} FROM m)""",
+    ),
+    "rollup": (
+        f"""r AS (
+        SELECT (day - DATE '0001-01-01') + 1 AS day, {", ".join(list(ROLLUP_SCHEMA)[1:])}
+        FROM group_daily_rollup
+        WHERE group_id = %(group_id)s
+        ORDER BY day
+    )""",
+        f"""(SELECT json_build_object(
+            'data_version', (SELECT data_version FROM group_rollup_state WHERE group_id = %(group_id)s),
+            'columns', (SELECT {_column_sql("r", ROLLUP_SCHEMA)} FROM r)
+        ))""",
+    ),
+    "members": (
+        """mem AS (
+        SELECT u.user_id, u.full_name
+        FROM users u
+        JOIN group_members gm ON u.user_id = gm.user_id
+        WHERE gm.group_id = %(group_id)s
+    )""",
+        """(SELECT coalesce(json_agg(mem), '[]'::json) FROM mem)""",
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def _snapshot_sql(parts):
+    ctes = ["g AS (\n        SELECT * FROM groups WHERE group_id = %(group_id)s\n    )"]
+    columns = ['(SELECT row_to_json(g) FROM g) AS "group"']
+    for name, (cte, column) in SNAPSHOT_PARTS.items():
+        if name in parts:
+            ctes.append(cte)
+            columns.append(f"{column} AS {name}")
+        else:
+            columns.append(f"NULL AS {name}")
+    ctes = ",\n    ".join(ctes)
+    columns = ",\n        ".join(columns)
+    return f"""
+    WITH {ctes}
+    SELECT
+        {columns}
+"""
+
+
+GROUP_SNAPSHOT_SQL = _snapshot_sql(frozenset(SNAPSHOT_PARTS))
+
+
+def fetch_group_snapshot(group_id, parts=None, array_max_tasks=0):
+    """
+    Goal: Load everything the analytics dashboard needs for one group in a single query.
+    parts: subset of SNAPSHOT_PARTS to load (default all); skipped parts come back empty.
+    array_max_tasks: groups with fewer tasks get tasks / messages / rollup as NumPy structured
+                     arrays (records_from_columns) instead of DataFrames; 0 = always DataFrames.
+    Returns: {"group": dict or None, "tasks": DataFrame, "messages": DataFrame, "members": list of dicts,
+              "rollup": DataFrame or None, "rollup_version": data version the rollup rows are current for}
+             (tasks / messages / rollup as structured arrays for groups under array_max_tasks)
+    """
+    parts = frozenset(SNAPSHOT_PARTS if parts is None else parts)
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(_snapshot_sql(parts), {"group_id": str(group_id)})
+            group, tasks, messages, rollup, members = cur.fetchone()
+
+    # psycopg2 already decoded the json columns into {column: [values]} dicts
+    rollup = rollup or {}
+    if len((tasks or {}).get("group_id") or []) < array_max_tasks:
+        build = lambda columns, schema: records_from_columns(columns, schema)
+    else:
+        build = lambda columns, schema: frame_from_columns(columns, schema, epoch_timestamps=True)
+    return {
+        "group": group,
+        "tasks": build(tasks, TASK_SCHEMA),
+        "messages": build(messages, MESSAGE_SCHEMA),
+        "members": members or [],
+        "rollup": build(rollup["columns"], ROLLUP_SCHEMA) if rollup.get("data_version") else None,
+        "rollup_version": rollup.get("data_version"),
+    }
+
+
+# Task columns as time-zone independent text (epoch timestamps), for hashing
+_TASK_ROW = ", ".join(
+    f"extract(epoch FROM {name})" if kind == "timestamp" else name for name, kind in TASK_SCHEMA.items()
+)
+
+# Cheap fingerprint of everything the dashboard reads for a group: row counts catch
+# inserts/deletes, a sum of per-row hashes of the task columns the analytics read catches task
+# edits (nothing keeps tasks.updated_at current), max(created_at) catches new messages.
+# {group} is the group id expression, so the same fingerprint can be taken for one group or for
+# every group at once, from any connection.
+DATA_VERSION_EXPR = f"""md5(concat_ws(':',
+        (SELECT count(*) || '/' || coalesce(sum(hashtext(ROW({_TASK_ROW})::text))::text, '')
+         FROM tasks WHERE group_id = {{group}}),
+        (SELECT count(*) || '/' || coalesce(extract(epoch FROM max(created_at))::text, '')
+         FROM chat_messages WHERE group_id = {{group}}),
+        (SELECT count(*) FROM group_members WHERE group_id = {{group}})
+    ))"""
+
+# No row for unknown groups
+DATA_VERSION_SQL = f"""
+    SELECT {DATA_VERSION_EXPR.format(group="%(group_id)s")}
+    FROM groups
+    WHERE group_id = %(group_id)s
+"""
+
+
+def fetch_data_version(group_id):
+    """
+    Goal: Tell whether a group's analytics inputs changed, without loading them.
+    Returns: a short hash string, or None if the group doesn't exist.
+    """
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(DATA_VERSION_SQL, {"group_id": str(group_id)})
+            record = cur.fetchone()
+    return record[0] if record else None
+
+
+def _select_list(schema):
+    # Plain columns in schema order; timestamps as integer epoch microseconds, as in _column_sql
+    return ", ".join(
+        f"(extract(epoch FROM {name}) * 1000000)::bigint" if kind == "timestamp" else name
+        for name, kind in schema.items()
+    )
+
+
+# Tasks / messages of many groups at once (group_ids is a tuple -> IN (...) literals), as plain rows:
+# a batch can be far larger than one group, too large to aggregate into a single JSON value
+GROUPS_BATCH_TASKS_SQL = f"""
+    SELECT {_select_list(TASK_SCHEMA)}
+    FROM tasks
+    WHERE group_id IN %(group_ids)s
+"""
+GROUPS_BATCH_MESSAGES_SQL = f"""
+    SELECT {_select_list(MESSAGE_SCHEMA)}
+    FROM chat_messages
+    WHERE group_id IN %(group_ids)s
+"""
+
+
+def fetch_groups_batch(group_ids):
+    """
+    Goal: Load tasks and messages of many groups in a single query (for batch scoring).
+    Returns: {"tasks": DataFrame, "messages": DataFrame}, both carrying a group_id column.
+    """
+    group_ids = tuple(str(group_id) for group_id in group_ids)
+    if not group_ids:
+        return {
+            "tasks": frame_from_columns(None, TASK_SCHEMA),
+            "messages": frame_from_columns(None, MESSAGE_SCHEMA),
+        }
+
+    params = {"group_ids": group_ids}
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            return {
+                "tasks": load_frame(cur, GROUPS_BATCH_TASKS_SQL, params, TASK_SCHEMA),
+                "messages": load_frame(cur, GROUPS_BATCH_MESSAGES_SQL, params, MESSAGE_SCHEMA),
+            }
+
+
+def load_frame(cur, query, params, schema):
+    """
+    Goal: Run a query and build a typed DataFrame straight from the cursor's tuples.
+    The SELECT list must be _select_list(schema) (schema order, timestamps as epoch microseconds).
+    Rows are read FETCH_BATCH_SIZE at a time and transposed into columns, with no dict per row
+    and no JSON value per column.
+    """
+    columns = {name: [] for name in schema}
+    cur.execute(query, params)
+    while True:
+        rows = cur.fetchmany(FETCH_BATCH_SIZE)
+        if not rows:
+            break
+        for name, values in zip(schema, zip(*rows)):
+            columns[name].extend(values)
+
+    return frame_from_columns(columns, schema, epoch_timestamps=True)
+
+
+def frame_from_columns(columns, schema, epoch_timestamps=False):
+    """Builds a DataFrame from {column: values}, converting each column once to its schema dtype."""
+    columns = columns or {}
+    data = {}
+    for name, kind in schema.items():
+        values = columns.get(name) or []
+        data[name] = _typed_column(values, kind, epoch_timestamps)
+    return pd.DataFrame(data, columns=list(schema))
+
+
+def _typed_column(values, kind, epoch_timestamps):
+    if kind == "timestamp":
+        if epoch_timestamps:
+            # float64 holds epoch microseconds exactly and turns NULLs into NaN -> NaT
+            micros = np.array(values, dtype="float64")
+            return pd.to_datetime(micros, unit="us", utc=True).as_unit("ns")
+        return pd.to_datetime(pd.Series(values, dtype="object"), utc=True, errors="coerce").dt.as_unit("ns").array
+    if kind == "category":
+        return pd.Categorical(values)
+    if kind == "int8":
+        return pd.Series(values, dtype="float64").fillna(0).astype("int8").to_numpy()
+    if kind == "int64":
+        return np.array(values, dtype=np.int64)
+    if kind == "code":
+        return id_codes.encode(values)
+    return np.array(values, dtype="object")
+
+
+# Field dtype of each kind in a structured record array (timestamps: naive UTC, NULL -> NaT)
+RECORD_DTYPES = {
+    "timestamp": "M8[us]",
+    "category": object,
+    "int8": np.int8,
+    "int64": np.int64,
+    "code": np.int32,
+    "object": object,
+}
+
+
+def records_from_columns(columns, schema):
+    """
+    Builds a NumPy structured array from {column: values}, one field per schema column.
+    The pandas-free twin of frame_from_columns(..., epoch_timestamps=True): timestamps are epoch microseconds.
+    """
+    columns = columns or {}
+    length = len(next(iter(columns.values()), None) or [])
+    records = np.empty(length, dtype=[(name, RECORD_DTYPES[kind]) for name, kind in schema.items()])
+    for name, kind in schema.items():
+        records[name] = _record_column(columns.get(name) or [None] * length, kind)
+    return records
+
+
+def _record_column(values, kind):
+    if kind == "timestamp":
+        micros = np.array(values, dtype="float64")
+        stamps = np.full(len(micros), np.datetime64("NaT"), dtype="M8[us]")
+        present = ~np.isnan(micros)
+        stamps[present] = micros[present].astype(np.int64)
+        return stamps
+    if kind == "int8":
+        return np.nan_to_num(np.array(values, dtype="float64")).astype(np.int8)
+    if kind == "int64":
+        return np.array(values, dtype=np.int64)
+    if kind == "code":
+        return id_codes.encode(values)
+    return np.array(values, dtype="object")
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from api.analytics.group_frame import EPOCH_ORDINAL
+
+# Normalized layouts (the GroupFrame columns the algorithms read); timestamps are naive UTC, NULL -> NaT
+TASK_DTYPE = np.dtype([
+    ("group_id", np.int32),
+    ("assigned_to", np.int32),
+    ("user_id", np.int32),
+    ("progress_percentage", np.int8),
+    ("end_date", "M8[us]"),
+    ("completed_at", "M8[us]"),
+    ("created_at", "M8[us]"),
+    ("is_completed", np.bool_),
+    ("is_overdue", np.bool_),
+])
+MESSAGE_DTYPE = np.dtype([
+    ("group_id", np.int32),
+    ("user_id", np.int32),
+    ("created_at", "M8[us]"),
+])
+
+
+def to_datetime64(now):
+    """`now` (a UTC pd.Timestamp, as GroupFrame / GroupArrays carry it) as a naive datetime64[ns]."""
+    return np.datetime64(now.value, "ns")
+
+
+def day_ordinals(timestamps):
+    """day_ordinals() for a datetime64 field (NaT must be dropped first)."""
+    return timestamps.astype("datetime64[D]").astype(np.int64) + EPOCH_ORDINAL
+
+
+def latest(timestamps):
+    """Latest non-NaT value of a datetime64 field, or None."""
+    timestamps = timestamps[~np.isnat(timestamps)]
+    return timestamps.max() if len(timestamps) else None
+
+
+def normalize_tasks(records, now):
+    """
+    Goal: normalize_tasks() for the loader's task records (data_loader.records_from_columns):
+    same columns and flags, as a TASK_DTYPE structured array. Status is only read for is_completed.
+    """
+    # Lower-case each distinct status once, like the categorical path
+    completed_status = {status: isinstance(status, str) and status.lower() == "completed" for status in set(records["status"])}
+    is_completed = np.fromiter((completed_status[status] for status in records["status"]), dtype=np.bool_, count=len(records))
+
+    tasks = np.empty(len(records), dtype=TASK_DTYPE)
+    tasks["group_id"] = records["group_id"]
+    tasks["assigned_to"] = records["assigned_to"]
+    tasks["user_id"] = records["assigned_to"]
+    tasks["progress_percentage"] = records["progress_percentage"]
+    tasks["end_date"] = records["due_date"]
+    tasks["completed_at"] = records["completed_at"]
+    tasks["created_at"] = records["created_at"]
+    tasks["is_completed"] = is_completed
+    tasks["is_overdue"] = ~is_completed & (records["due_date"] < to_datetime64(now))
+    return tasks
+
+
+def normalize_messages(records):
+    """Goal: Message records as a MESSAGE_DTYPE structured array."""
+    messages = np.empty(len(records), dtype=MESSAGE_DTYPE)
+    for name in MESSAGE_DTYPE.names:
+        messages[name] = records[name]
+    return messages
+
+
+class GroupArrays:
+    """
+    GroupFrame for small groups: the same normalized data as read-only NumPy structured arrays
+    (TASK_DTYPE / MESSAGE_DTYPE), read by the *_array twin of each algorithm. Below a few hundred
+    rows, building and indexing DataFrames costs more than the math; arrays skip pandas entirely.
+    `now` is fixed at build time, as in GroupFrame.
+    """
+
+    __slots__ = ("_tasks", "_messages", "now")
+
+    def __init__(self, tasks, messages, now):
+        tasks.flags.writeable = False
+        messages.flags.writeable = False
+        object.__setattr__(self, "_tasks", tasks)
+        object.__setattr__(self, "_messages", messages)
+        object.__setattr__(self, "now", now)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GroupArrays is read-only")
+
+    @classmethod
+    def build(cls, task_records, message_records, now=None):
+        now = now if now is not None else pd.Timestamp.now(tz="UTC")
+        return cls(normalize_tasks(task_records, now), normalize_messages(message_records), now)
+
+    @property
+    def tasks(self):
+        return self._tasks
+
+    @property
+    def messages(self):
+        return self._messages
+
+    def latest_due(self):
+        """Date of the latest task end_date, or None."""
+        value = latest(self._tasks["end_date"])
+        return value.astype("M8[D]").item() if value is not None else None
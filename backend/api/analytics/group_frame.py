@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from api.analytics.id_codes import to_codes
+
+# date(1970, 1, 1).toordinal(): shifts "days since the epoch" onto the proleptic ordinal scale
+EPOCH_ORDINAL = 719163
+
+
+def to_utc(values):
+    """Returns values as datetime64[ns, UTC]; already-typed columns (the data loader's) pass through untouched."""
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        return values if str(values.dt.tz) == "UTC" else values.dt.tz_convert("UTC")
+    return pd.to_datetime(values, utc=True, errors="coerce")
+
+
+def day_ordinals(timestamps):
+    """Vectorized Timestamp.toordinal() for a UTC datetime column (NaT must be dropped first)."""
+    days = timestamps.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]").astype(np.int64)
+    return days + EPOCH_ORDINAL
+
+
+def _normalized_status(status):
+    # .str on a categorical lower-cases each category once, not every row
+    return status.astype("category").str.lower().astype("category")
+
+
+def normalize_tasks(tasks_df, now):
+    """
+    Goal: Give tasks the one column layout every algorithm reads.
+    group_id and user_id/assigned_to as int32 id codes (see id_codes), end_date (from due_date),
+    UTC timestamps, lower-cased categorical status, int8 progress, plus the derived
+    is_completed / is_overdue flags. Columns no metric reads are dropped.
+    """
+    due_column = "due_date" if "due_date" in tasks_df.columns else "end_date"
+    status = _normalized_status(tasks_df["status"])
+    is_completed = (status == "completed").to_numpy(dtype=bool, na_value=False)
+    end_date = to_utc(tasks_df[due_column])
+    user_id = to_codes(tasks_df["assigned_to"])
+
+    return pd.DataFrame({
+        "group_id": to_codes(tasks_df["group_id"]),
+        "assigned_to": user_id,
+        "user_id": user_id,
+        "progress_percentage": tasks_df["progress_percentage"].fillna(0).astype("int8"),
+        "status": status,
+        "end_date": end_date,
+        "completed_at": to_utc(tasks_df["completed_at"]),
+        "created_at": to_utc(tasks_df["created_at"]),
+        "is_completed": is_completed,
+        "is_overdue": ~is_completed & (end_date < now).to_numpy(dtype=bool, na_value=False),
+    }, index=tasks_df.index)
+
+
+def normalize_messages(messages_df):
+    """Goal: Messages as group_id / user_id id codes and a UTC created_at (text and row ids are dropped)."""
+    return pd.DataFrame({
+        "group_id": to_codes(messages_df["group_id"]),
+        "user_id": to_codes(messages_df["user_id"]),
+        "created_at": to_utc(messages_df["created_at"]),
+    }, index=messages_df.index)
+
+
+class GroupFrame:
+    """
+    Normalize-once view of one request's data (see normalize_tasks / normalize_messages).
+    Built once per request and shared read-only by every algorithm, so columns are
+    parsed, typed and lower-cased exactly once. `now` is fixed at build time so every
+    metric in the response is computed against the same instant.
+    .tasks / .messages hand out copy-on-write views: a consumer that assigns to them
+    changes only its own copy, never the shared frame.
+    """
+
+    __slots__ = ("_tasks", "_messages", "now")
+
+    def __init__(self, tasks, messages, now):
+        object.__setattr__(self, "_tasks", tasks)
+        object.__setattr__(self, "_messages", messages)
+        object.__setattr__(self, "now", now)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GroupFrame is read-only")
+
+    @classmethod
+    def build(cls, tasks_df, messages_df, now=None):
+        now = now if now is not None else pd.Timestamp.now(tz="UTC")
+        return cls(normalize_tasks(tasks_df, now), normalize_messages(messages_df), now)
+
+    @property
+    def tasks(self):
+        return self._tasks.copy(deep=False)
+
+    @property
+    def messages(self):
+        return self._messages.copy(deep=False)
+
+    def latest_due(self):
+        """Date of the latest task end_date, or None."""
+        value = self._tasks["end_date"].max()
+        return value.date() if pd.notnull(value) else None
@@ -0,0 +1,64 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Code of a NULL id (unassigned task, message without author)
+MISSING_ID = -1
+
+
+class IdCodes:
+    """
+    Shared code table: user / group ids (UUID strings) <-> dense int32 codes.
+    The analytics frames hold codes instead of one Python str per row (4 bytes a row,
+    integer groupbys and comparisons); ids are decoded only where they reach a response.
+    - One table per process, shared by every frame, so codes agree across groups and requests.
+    - Append-only: a code never changes meaning. Ids are keyed by str(), so 5 and "5" share a code.
+    """
+
+    def __init__(self):
+        self._codes = {}
+        self._ids = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def encode(self, values):
+        """Returns an int32 array of codes for `values`, adding unseen ids; NULL -> MISSING_ID."""
+        # Factorize first so each distinct id is hashed into the table once, not once per row
+        inverse, uniques = pd.factorize(np.asarray(values, dtype=object))
+        ids = [str(value) for value in uniques]
+
+        unseen = [value for value in ids if value not in self._codes]
+        if unseen:
+            with self._lock:
+                for value in unseen:
+                    if value not in self._codes:
+                        self._codes[value] = len(self._ids)
+                        self._ids.append(value)
+
+        # inverse is -1 for NULLs: the extra last slot maps them to MISSING_ID
+        table = np.fromiter((self._codes[value] for value in ids), dtype=np.int32, count=len(ids))
+        return np.append(table, np.int32(MISSING_ID))[inverse]
+
+    def code(self, value):
+        """Code of one id, or None if it is NULL or was never encoded (so it matches no row)."""
+        return None if value is None else self._codes.get(str(value))
+
+    def decode(self, codes):
+        """Ids for `codes` (a list; MISSING_ID -> None)."""
+        return [self._ids[code] if code >= 0 else None for code in codes]
+
+    def id(self, code):
+        return self._ids[code] if code >= 0 else None
+
+
+id_codes = IdCodes()
+
+
+def to_codes(values):
+    """Returns values as int32 id codes; already-encoded columns (the data loader's) pass through untouched."""
+    if getattr(values, "dtype", None) == np.int32:
+        return values
+    return id_codes.encode(values)
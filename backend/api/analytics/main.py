@@ -2,6 +2,7 @@ import os
 import pandas as pd
 import psycopg2
 from api.analytics.analytics_engine import AnalyticsEngine
+from api.analytics.group_frame import GroupFrame
 
 def analyze_specific_group(group_id, user_id):
     # 1. Database Connection
@@ -34,16 +35,15 @@ def analyze_specific_group(group_id, user_id):
 
         # 3. INITIALIZE ENGINE
         # This calls your analytics_engine.py and all the /algorithms scripts
-        engine = AnalyticsEngine()
-        
-        # 4. RUN ANALYSIS
-        # We pass the dataframes we just filtered by group_id
-        report = engine.run_comprehensive_analysis(
-            tasks_df=tasks_df,
-            messages_df=msg_df,
+        # We pass the dataframes we just filtered by group_id, normalized once
+        engine = AnalyticsEngine(
+            GroupFrame.build(tasks_df, msg_df),
             deadline_str="2026-05-01", # Set your project deadline here
             user_id=user_id
         )
+        
+        # 4. RUN ANALYSIS
+        report = engine.run_comprehensive_analysis()
 
         # 5. DISPLAY RESULTS
         print("\n--- AI PROJECT REPORT ---")
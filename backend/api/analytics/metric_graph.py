@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+# name: result key, deps: names whose results are passed to func as keyword arguments
+Metric = namedtuple("Metric", ["name", "deps", "func"])
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def metric_pool():
+    """
+    Returns the process-wide metric thread pool (ANALYTICS_METRIC_WORKERS threads), shared by
+    every request instead of starting threads per request. Rebuilt after a fork (threads don't survive it).
+    """
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ThreadPoolExecutor(
+                    max_workers=max(settings.ANALYTICS_METRIC_WORKERS, 1), thread_name_prefix="metric",
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def dependency_closure(deps, names):
+    """The requested nodes plus everything they depend on ({name: deps} mapping)."""
+    needed, stack = set(), list(names)
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.add(name)
+            stack.extend(deps[name])
+    return needed
+
+
+class MetricGraph:
+    """
+    Dependency graph of analytics metrics (e.g. velocity -> forecast -> buffer).
+    - run() computes each requested node and its dependencies exactly once.
+    - Nodes whose dependencies are done run concurrently on the shared metric_pool() (or `pool`)
+      (NumPy/pandas release the GIL for most of the heavy lifting). Nodes never submit work
+      themselves, so requests sharing the pool can't deadlock it; they just queue.
+    - Wall time per node is recorded in `timings` (milliseconds).
+    """
+
+    def __init__(self, metrics, pool=None):
+        self.metrics = {metric.name: metric for metric in metrics}
+        self.pool = pool
+        for metric in metrics:
+            missing = [dep for dep in metric.deps if dep not in self.metrics]
+            if missing:
+                raise ValueError(f"Metric '{metric.name}' depends on unknown metrics {missing}")
+
+    def closure(self, names):
+        return dependency_closure({name: metric.deps for name, metric in self.metrics.items()}, names)
+
+    def run(self, names=None, results=None, timings=None):
+        """
+        Computes `names` (default: every node). Nodes already present in `results`
+        are reused, so repeated calls on the same dicts never recompute anything.
+        Returns: (results, timings)
+        """
+        results = {} if results is None else results
+        timings = {} if timings is None else timings
+        pending = self.closure(names if names is not None else self.metrics) - set(results)
+        if not pending:
+            return results, timings
+
+        pool = self.pool or metric_pool()
+        running = {}
+        try:
+            while pending or running:
+                # 1. Start every node whose dependencies are all done
+                for name in [n for n in pending if all(dep in results for dep in self.metrics[n].deps)]:
+                    pending.discard(name)
+                    running[pool.submit(self._timed, self.metrics[name], results)] = name
+
+                if not running:
+                    raise ValueError(f"Metric dependency cycle between {sorted(pending)}")
+
+                # 2. Collect whatever finished; its dependents become ready on the next pass
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name], timings[name] = future.result()
+        finally:
+            # A failed node stops the run: drop what hasn't started rather than leave it queued on the shared pool
+            for future in running:
+                future.cancel()
+
+        return results, timings
+
+    @staticmethod
+    def _timed(metric, results):
+        started = time.perf_counter()
+        value = metric.func(**{dep: results[dep] for dep in metric.deps})
+        return value, round((time.perf_counter() - started) * 1000, 2)
@@ -1,4 +1,5 @@
 import psycopg2
+import hashlib
 import joblib
 import io
 import os
@@ -69,6 +70,8 @@ def train_and_sync_model():
     buffer = io.BytesIO()
     joblib.dump({'model': model, 'scaler': scaler}, buffer)
     binary_data = buffer.getvalue()
+    # Stored next to the blob so the API polls this string instead of hashing the blob
+    model_version = hashlib.md5(binary_data).hexdigest()
 
     # --- PART 3: UPLOAD & DATA INJECTION ---
     cur = conn.cursor()
@@ -79,11 +82,11 @@ def train_and_sync_model():
 
         # 1. Update the AI Model
         cur.execute("""
-            INSERT INTO "Risk_Matrix_TrainSet" (model_name, model_binary) 
-            VALUES ('risk_big_data_model', %s) 
+            INSERT INTO "Risk_Matrix_TrainSet" (model_name, model_binary, model_version) 
+            VALUES ('risk_big_data_model', %s, %s) 
             ON CONFLICT (model_name) 
-            DO UPDATE SET model_binary = EXCLUDED.model_binary;
-        """, (psycopg2.Binary(binary_data), ))
+            DO UPDATE SET model_binary = EXCLUDED.model_binary, model_version = EXCLUDED.model_version;
+        """, (psycopg2.Binary(binary_data), model_version))
 
         # 2. Setup Variables
         print("🔍 Fetching valid group and users from the database...")
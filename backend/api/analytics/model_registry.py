@@ -0,0 +1,152 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import namedtuple
+
+import joblib
+from django.conf import settings
+
+from api.analytics.compiled_model import CompiledRiskModel
+from api.db_pool import db_pool
+
+LoadedModel = namedtuple("LoadedModel", ["version", "payload", "loaded_at"])
+
+# Cheap metadata probe: model_version is the md5 of the blob, stored once per upload
+# (ml/train_model.py + migration 0006), so polling never hashes the BYTEA. The md5()
+# fallback only runs for a row whose model_version is still NULL.
+# The content hash doubles as the model version, so every retrain (upsert) is picked up.
+MODEL_VERSION_SQL = """
+    SELECT coalesce(model_version, md5(model_binary))
+    FROM "Risk_Matrix_TrainSet"
+    WHERE model_name = %s
+"""
+MODEL_BINARY_SQL = """
+    SELECT coalesce(model_version, md5(model_binary)), model_binary
+    FROM "Risk_Matrix_TrainSet"
+    WHERE model_name = %s
+"""
+
+
+class ModelRegistry:
+    """
+    Process-wide holder of the trained risk model ({'model': ..., 'scaler': ..., 'compiled': ...}).
+    'compiled' is the NumPy-only CompiledRiskModel built once per load (None if not compilable).
+    - get() returns the in-memory payload; at most every poll_interval seconds it runs a
+      tiny version query and reloads the blob only when that version changed.
+    - The loaded model is swapped in as one object, so readers never see a half-updated model.
+    - Blobs are persisted under cache_dir by name + content hash and loaded memory-mapped, so
+      forked workers share the same pages and a cold start skips the BYTEA download when the
+      hash is already on disk.
+    """
+
+    def __init__(self, model_name, poll_interval, cache_dir=None):
+        self.model_name = model_name
+        self.poll_interval = poll_interval
+        self.cache_dir = cache_dir
+        self._current = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Returns the current model payload or None if no model could be loaded."""
+        if time.monotonic() - self._last_check >= self.poll_interval:
+            # Nobody has a model yet: wait for the first load. Otherwise one thread checks, the rest move on.
+            if self._lock.acquire(blocking=self._current is None):
+                try:
+                    if time.monotonic() - self._last_check >= self.poll_interval:
+                        self._check_for_update()
+                finally:
+                    self._lock.release()
+
+        current = self._current
+        return current.payload if current else None
+
+    def version(self):
+        current = self._current
+        return current.version if current else None
+
+    def refresh(self):
+        """Forces a version check now (e.g. right after retraining)."""
+        with self._lock:
+            self._check_for_update()
+
+    def _check_for_update(self):
+        self._last_check = time.monotonic()
+        try:
+            with db_pool.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(MODEL_VERSION_SQL, (self.model_name,))
+                    record = cur.fetchone()
+
+            if record is None:
+                return
+
+            version = record[0]
+            current = self._current
+            if current is not None and current.version == version:
+                return
+
+            loaded = self._load(version)
+            payload = dict(loaded.payload, compiled=CompiledRiskModel.from_payload(loaded.payload))
+            self._current = loaded._replace(payload=payload)
+            print(f"🤖 AI Model {self._current.version} loaded successfully.")
+        except Exception as e:
+            # Keep serving the previous model (if any) rather than failing requests
+            print(f"⚠️ Warning: AI Model could not be loaded. Risk detection will be 'Unknown'. Error: {e}")
+
+    def _artifact_path(self, version):
+        return os.path.join(self.cache_dir, f"{self.model_name}-{version}.joblib")
+
+    def _load(self, version):
+        if self.cache_dir:
+            path = self._artifact_path(version)
+            if os.path.exists(path):
+                # Same hash already on disk (earlier run or a sibling worker): no download needed
+                return LoadedModel(version, joblib.load(path, mmap_mode='r'), time.time())
+
+        with db_pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(MODEL_BINARY_SQL, (self.model_name,))
+                version, binary_blob = cur.fetchone()
+
+        # Convert memoryview to bytes if necessary (standard for psycopg2)
+        if isinstance(binary_blob, memoryview):
+            binary_blob = binary_blob.tobytes()
+
+        if not self.cache_dir:
+            return LoadedModel(version, joblib.load(io.BytesIO(binary_blob)), time.time())
+
+        path = self._store_artifact(version, binary_blob)
+        return LoadedModel(version, joblib.load(path, mmap_mode='r'), time.time())
+
+    def _store_artifact(self, version, binary_blob):
+        if hashlib.md5(binary_blob).hexdigest() != version:
+            raise ValueError(f"Model blob does not match its hash {version}")
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._artifact_path(version)
+
+        # Write under a temp name, then rename: other workers only ever see complete files
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(binary_blob)
+        os.replace(tmp_path, path)
+
+        # Drop artifacts of older versions of this model
+        for name in os.listdir(self.cache_dir):
+            stale = os.path.join(self.cache_dir, name)
+            if name.startswith(f"{self.model_name}-") and name.endswith(".joblib") and stale != path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+        return path
+
+
+model_registry = ModelRegistry(
+    model_name=settings.ANALYTICS_MODEL_NAME,
+    poll_interval=settings.ANALYTICS_MODEL_POLL_SECONDS,
+    cache_dir=settings.ANALYTICS_MODEL_CACHE_DIR,
+)
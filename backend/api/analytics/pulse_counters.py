@@ -0,0 +1,240 @@
+import threading
+import time
+from datetime import date
+
+import redis
+from django.conf import settings
+
+from api.db_pool import db_pool
+
+# Hour slots kept per group: 7 days
+RING_HOURS = 7 * 24
+HOUR = 3600
+
+# Overwrite hour slots of a group's ring (fields "s<slot>" = "<hour>:<count>") with recounted totals
+# (ARGV: last ts or '', then field / hour / count triples). A slot still holding an older hour is
+# recycled; one already holding a newer hour is kept. The recount is authoritative for "last" too.
+_STORE_LUA = """
+for i = 2, #ARGV, 3 do
+    local field, hour = ARGV[i], tonumber(ARGV[i + 1])
+    local current = redis.call('HGET', KEYS[1], field)
+    if not current or tonumber(string.match(current, '(%d+):')) <= hour then
+        redis.call('HSET', KEYS[1], field, hour .. ':' .. ARGV[i + 2])
+    end
+end
+if ARGV[1] == '' then
+    redis.call('HDEL', KEYS[1], 'last')
+else
+    redis.call('HSET', KEYS[1], 'last', ARGV[1])
+end
+return 1
+"""
+
+
+class PulseCounters:
+    """
+    Per-group, per-hour message counters in a ring of RING_HOURS slots, plus the last activity time.
+    - load(): backfill (rebuild_pulse_counters); store(): overwrites hour slots with recounted totals
+      (recount_pulse_hours, fed by the chat_messages notifications in `listen_changes`).
+    - activity(): 24h / 7d counts and last activity in O(ring size), independent of message count.
+    - Windows have hour granularity: "last 24h" = the current hour plus the 23 before it.
+    A group's counters are only trusted once load() has backfilled them and while whoever keeps
+    them current (listen_changes) has called keep_alive() within `live_seconds` (see ready()):
+    a stopped listener must not leave frozen counts behind. live_seconds <= 0 never expires.
+    The web workers only use the counters with ANALYTICS_PULSE_REDIS_URL set and `listen_changes`
+    running: without a URL they live in process memory, where only the process that loads and
+    keeps them alive (tests, a single-process setup) sees them; everyone else scans messages.
+    """
+
+    KEY_PREFIX = "analytics:pulse:"
+    LIVE_KEY = "analytics:pulse-live"
+
+    def __init__(self, redis_url=None, live_seconds=0):
+        self.redis_url = redis_url
+        self.live_seconds = live_seconds
+        self._client = None
+        self._store = None
+        self._local = {}
+        self._live_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self.redis_url and self._client is None:
+            self._client = redis.Redis.from_url(self.redis_url)
+            self._store = self._client.register_script(_STORE_LUA)
+        return self._client
+
+    def keep_alive(self):
+        """Vouches for the counters for another `live_seconds` (called by the feeder's loop)."""
+        if self.live_seconds <= 0:
+            return
+        if self.client is not None:
+            self.client.set(self.LIVE_KEY, "1", ex=max(int(self.live_seconds), 1))
+        else:
+            self._live_until = time.monotonic() + self.live_seconds
+
+    def _key(self, group_id):
+        return self.KEY_PREFIX + str(group_id)
+
+    def store(self, group_id, hour_counts, last_ts):
+        """Overwrites the given hour slots ({epoch hour: count}) and the last activity with recounted values."""
+        slots = {f"s{hour % RING_HOURS}": (hour, count) for hour, count in sorted(hour_counts.items())}
+        if self.client is not None:
+            args = ["" if last_ts is None else repr(float(last_ts))]
+            for field, (hour, count) in slots.items():
+                args += [field, hour, count]
+            self._store(keys=[self._key(group_id)], args=args)
+            return
+
+        with self._lock:
+            entry = self._local.setdefault(str(group_id), {"slots": {}, "last": None, "ready": False})
+            for field, (hour, count) in slots.items():
+                if entry["slots"].get(field, (hour, 0))[0] <= hour:
+                    entry["slots"][field] = (hour, count)
+            entry["last"] = last_ts
+
+    def load(self, group_id, hour_counts, last_ts):
+        """Replaces a group's counters with a backfill ({epoch hour: count}) and marks them ready."""
+        slots = {f"s{hour % RING_HOURS}": (hour, count) for hour, count in sorted(hour_counts.items())}
+        if self.client is not None:
+            mapping = {field: f"{hour}:{count}" for field, (hour, count) in slots.items()}
+            mapping["ready"] = "1"
+            if last_ts is not None:
+                mapping["last"] = repr(float(last_ts))
+            pipe = self.client.pipeline()
+            pipe.delete(self._key(group_id))
+            pipe.hset(self._key(group_id), mapping=mapping)
+            pipe.execute()
+            return
+
+        with self._lock:
+            self._local[str(group_id)] = {"slots": slots, "last": last_ts, "ready": True}
+
+    def _read(self, group_id):
+        # -> (slots {field: (hour, count)}, last ts or None, ready = backfilled and kept alive)
+        if self.client is not None:
+            pipe = self.client.pipeline()
+            pipe.hgetall(self._key(group_id))
+            pipe.exists(self.LIVE_KEY)
+            stored, live = pipe.execute()
+            raw = {k.decode(): v.decode() for k, v in stored.items()}
+            slots = {}
+            for field, value in raw.items():
+                if field.startswith("s"):
+                    hour, count = value.split(":")
+                    slots[field] = (int(hour), int(count))
+            last = float(raw["last"]) if "last" in raw else None
+            return slots, last, raw.get("ready") == "1" and (self.live_seconds <= 0 or bool(live))
+
+        with self._lock:
+            entry = self._local.get(str(group_id))
+            if entry is None:
+                return {}, None, False
+            live = self.live_seconds <= 0 or time.monotonic() < self._live_until
+            return dict(entry["slots"]), entry["last"], entry["ready"] and live
+
+    def ready(self, group_id):
+        return self._read(group_id)[2]
+
+    def activity(self, group_id, now=None):
+        """
+        Returns {"messages_24h", "messages_7d", "last_activity" (epoch seconds or None)},
+        or None if the group's counters were never backfilled or nobody keeps them alive.
+        """
+        slots, last, ready = self._read(group_id)
+        if not ready:
+            return None
+
+        current_hour = int((time.time() if now is None else now) // HOUR)
+        counts = {hours: 0 for hours in (24, RING_HOURS)}
+        for hour, count in slots.values():
+            age = current_hour - hour
+            for hours in counts:
+                if 0 <= age < hours:
+                    counts[hours] += count
+        return {"messages_24h": counts[24], "messages_7d": counts[RING_HOURS], "last_activity": last}
+
+
+pulse_counters = PulseCounters(
+    redis_url=settings.ANALYTICS_PULSE_REDIS_URL or None,
+    live_seconds=settings.ANALYTICS_PULSE_LIVE_SECONDS,
+)
+
+
+# Last RING_HOURS of messages per group, by epoch hour, plus every group's last message (for the backfill)
+PULSE_BACKFILL_SQL = f"""
+    SELECT g.group_id::text,
+        (SELECT extract(epoch FROM max(m.created_at)) FROM chat_messages m WHERE m.group_id = g.group_id),
+        (SELECT json_object_agg(h.hour, h.count) FROM (
+            SELECT floor(extract(epoch FROM m.created_at) / {HOUR})::bigint AS hour, count(*) AS count
+            FROM chat_messages m
+            WHERE m.group_id = g.group_id AND m.created_at > now() - interval '{RING_HOURS} hours'
+            GROUP BY 1
+        ) h)
+    FROM groups g
+    WHERE %(group_ids)s::text[] IS NULL OR g.group_id::text = ANY(%(group_ids)s::text[])
+"""
+
+
+def rebuild_pulse_counters(group_ids=None):
+    """
+    Goal: Backfill the pulse counters from chat_messages (every group, or just `group_ids`).
+    Messages written while this runs may be missed; run it again or let the next one fix them.
+    Returns: number of groups loaded.
+    """
+    params = {"group_ids": [str(group_id) for group_id in group_ids] if group_ids else None}
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(PULSE_BACKFILL_SQL, params)
+            rows = cur.fetchall()
+
+    for group_id, last_ts, hour_counts in rows:
+        hour_counts = {int(hour): int(count) for hour, count in (hour_counts or {}).items()}
+        pulse_counters.load(group_id, hour_counts, float(last_ts) if last_ts is not None else None)
+    return len(rows)
+
+
+# One group's messages per epoch hour in [start, end), and its last message
+PULSE_RECOUNT_SQL = f"""
+    SELECT
+        (SELECT extract(epoch FROM max(created_at)) FROM chat_messages WHERE group_id = %(group_id)s),
+        (SELECT json_object_agg(h.hour, h.count) FROM (
+            SELECT floor(extract(epoch FROM created_at) / {HOUR})::bigint AS hour, count(*) AS count
+            FROM chat_messages
+            WHERE group_id = %(group_id)s
+              AND created_at >= to_timestamp(%(start)s) AND created_at < to_timestamp(%(end)s)
+            GROUP BY 1
+        ) h)
+"""
+
+
+def recount_pulse_hours(group_id, days, now=None):
+    """
+    Goal: Bring one group's counters up to date for the given UTC days by recounting their hours
+    from chat_messages. Change notifications are per transaction, not per message, so counting
+    them would miss multi-row inserts; a recount is exact and also covers deletes and edits.
+    Only hours inside the ring and not in the future are touched.
+    """
+    now = time.time() if now is None else now
+    current_hour = int(now // HOUR)
+    epoch = date(1970, 1, 1)
+    hours = [
+        hour
+        for day in days
+        for hour in range((day - epoch).days * 24, (day - epoch).days * 24 + 24)
+        if current_hour - RING_HOURS < hour <= current_hour
+    ]
+    if not hours:
+        return
+
+    params = {"group_id": str(group_id), "start": min(hours) * HOUR, "end": (max(hours) + 1) * HOUR}
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(PULSE_RECOUNT_SQL, params)
+            last_ts, hour_counts = cur.fetchone()
+
+    hour_counts = {int(hour): int(count) for hour, count in (hour_counts or {}).items()}
+    pulse_counters.store(
+        group_id, {hour: hour_counts.get(hour, 0) for hour in hours}, float(last_ts) if last_ts is not None else None,
+    )
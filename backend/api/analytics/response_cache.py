@@ -0,0 +1,62 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class AnalyticsResponseCache:
+    """
+    Caches the group-level part of the analytics response (AnalyticsEngine.run_group_analysis).
+    Key = (group_id, data_version, model_version, request variant, time bucket):
+    - data_version changes whenever a task, message or membership of the group changes,
+      model_version whenever a retrained risk model is loaded, so stale entries are never read.
+    - The variant covers ?fields= / window / bucket.
+    - Pulse, overdue and inactivity also move with the clock, so the key rolls over every
+      `seconds` (which is also the entry's TTL).
+    The per-user user_status is not part of the entry, so members of a group share it.
+    """
+
+    KEY_PREFIX = "analytics:group:v2:"
+
+    def __init__(self, cache_alias, seconds):
+        self.cache_alias = cache_alias
+        self.seconds = seconds
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return bool(self.cache_alias) and self.seconds > 0
+
+    def key(self, group_id, data_version, model_version, **variant):
+        time_bucket = int(time.time() // self.seconds) if self.seconds > 0 else 0
+        raw = json.dumps([str(group_id), data_version, model_version, variant, time_bucket], sort_keys=True, default=str)
+        return self.KEY_PREFIX + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def etag(key, user_id):
+        # The body also carries user_status, so the validator is per user
+        return '"' + hashlib.sha1(f"{key}:{user_id}".encode("utf-8")).hexdigest() + '"'
+
+    def get(self, key):
+        entry = caches[self.cache_alias].get(key) if self.enabled else None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, key, group_analysis):
+        if self.enabled:
+            caches[self.cache_alias].set(key, group_analysis, timeout=self.seconds)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+analytics_cache = AnalyticsResponseCache(
+    cache_alias=settings.ANALYTICS_CACHE_ALIAS,
+    seconds=settings.ANALYTICS_CACHE_SECONDS,
+)
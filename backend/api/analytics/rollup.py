@@ -0,0 +1,144 @@
+from django.db import connection, transaction
+
+from api.analytics.data_loader import DATA_VERSION_EXPR
+
+
+def _utc_day(column):
+    # Same day as group_frame.day_ordinals: the UTC date, whether the column is a date or a timestamp
+    return f"(to_timestamp(extract(epoch FROM {column})) AT TIME ZONE 'UTC')::date"
+
+
+# Every (day, kind, member) event of one group's source rows; each rollup column counts one kind.
+# Mirrors the raw-data algorithms: "completed" = progress 100 (history / forecast),
+# "closed" = status 'completed' (velocity / is_completed).
+_ROLLUP_EVENTS = f"""
+    td AS (
+        SELECT
+            {_utc_day("created_at")} AS created_day,
+            {_utc_day("completed_at")} AS completed_day,
+            {_utc_day("due_date")} AS due_day,
+            coalesce(progress_percentage, 0) = 100 AS done,
+            coalesce(lower(status) = 'completed', false) AS closed,
+            assigned_to::text AS member
+        FROM tasks
+        WHERE group_id = %(group_id)s
+    ),
+    events(day, kind, member) AS (
+        SELECT created_day, 'created', NULL FROM td WHERE created_day IS NOT NULL
+        UNION ALL SELECT completed_day, 'completed', NULL FROM td WHERE done AND completed_day IS NOT NULL
+        UNION ALL SELECT created_day, 'completed_undated', NULL FROM td WHERE done AND completed_day IS NULL AND created_day IS NOT NULL
+        UNION ALL SELECT completed_day, 'closed', member FROM td WHERE closed AND completed_day IS NOT NULL
+        UNION ALL SELECT due_day, 'done_by_due', NULL FROM td WHERE done AND due_day IS NOT NULL
+        UNION ALL SELECT due_day, 'overdue', NULL FROM td WHERE NOT closed AND due_day IS NOT NULL
+        UNION ALL SELECT {_utc_day("created_at")}, 'message', user_id::text
+            FROM chat_messages WHERE group_id = %(group_id)s AND created_at IS NOT NULL
+    )"""
+
+# Recomputes the rollup rows of one group: every day (%(days)s IS NULL) or just the given ones
+ROLLUP_REFRESH_SQL = f"""
+    WITH {_ROLLUP_EVENTS}
+    INSERT INTO group_daily_rollup (
+        group_id, day, tasks_created, tasks_completed, tasks_completed_undated,
+        tasks_closed, tasks_done_by_due, tasks_overdue, messages, active_members
+    )
+    SELECT
+        %(group_id)s, day,
+        count(*) FILTER (WHERE kind = 'created'),
+        count(*) FILTER (WHERE kind = 'completed'),
+        count(*) FILTER (WHERE kind = 'completed_undated'),
+        count(*) FILTER (WHERE kind = 'closed'),
+        count(*) FILTER (WHERE kind = 'done_by_due'),
+        count(*) FILTER (WHERE kind = 'overdue'),
+        count(*) FILTER (WHERE kind = 'message'),
+        count(DISTINCT member) FILTER (WHERE kind IN ('closed', 'message'))
+    FROM events
+    WHERE %(days)s::date[] IS NULL OR day = ANY(%(days)s::date[])
+    GROUP BY day
+"""
+
+ROLLUP_CLEAR_SQL = """
+    DELETE FROM group_daily_rollup
+    WHERE group_id = %(group_id)s AND (%(days)s::date[] IS NULL OR day = ANY(%(days)s::date[]))
+"""
+
+ROLLUP_STATE_SQL = """
+    INSERT INTO group_rollup_state (group_id, data_version, updated_at)
+    VALUES (%(group_id)s, %(data_version)s, now())
+    ON CONFLICT (group_id) DO UPDATE SET data_version = EXCLUDED.data_version, updated_at = EXCLUDED.updated_at
+"""
+
+# Serializes refreshes of one group; no row = never rolled up
+ROLLUP_STATE_LOCK_SQL = """
+    SELECT data_version FROM group_rollup_state WHERE group_id = %(group_id)s FOR UPDATE
+"""
+
+# ROLLUP_STATE_SQL with the group's current data version (taken in the refreshing transaction)
+ROLLUP_STATE_CURRENT_SQL = f"""
+    INSERT INTO group_rollup_state (group_id, data_version, updated_at)
+    VALUES (%(group_id)s, {DATA_VERSION_EXPR.format(group="%(group_id)s")}, now())
+    ON CONFLICT (group_id) DO UPDATE SET data_version = EXCLUDED.data_version, updated_at = EXCLUDED.updated_at
+"""
+
+# Groups whose data changed since their rollup was last rebuilt (or that were never rolled up)
+STALE_ROLLUPS_SQL = f"""
+    SELECT v.group_id, v.data_version
+    FROM (
+        SELECT g.group_id::text AS group_id, {DATA_VERSION_EXPR.format(group="g.group_id")} AS data_version
+        FROM groups g
+    ) v
+    LEFT JOIN group_rollup_state s ON s.group_id = v.group_id
+    WHERE s.data_version IS DISTINCT FROM v.data_version
+"""
+
+
+def refresh_rollup_days(group_id, days):
+    """
+    Goal: Recompute the rollup rows of the given UTC days for one group from the source tables,
+    then record the group's current data version so the analytics keep reading the rollup.
+    Only sound when `days` cover every change since the recorded version: the change listener
+    passes the days of each notification and reconciles on (re)connect.
+    No days (e.g. only members changed) just records the new version.
+    A group that was never rolled up gets every day built instead of a partial rollup.
+    O(rows of the group) to scan, O(days) rows written.
+    """
+    params = {"group_id": str(group_id), "days": sorted(set(days))}
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(ROLLUP_STATE_LOCK_SQL, params)
+        if cur.fetchone() is None:
+            params["days"] = None
+        if params["days"] != []:
+            cur.execute(ROLLUP_CLEAR_SQL, params)
+            cur.execute(ROLLUP_REFRESH_SQL, params)
+        cur.execute(ROLLUP_STATE_CURRENT_SQL, params)
+
+
+def rebuild_rollup(group_id, data_version):
+    """
+    Goal: Rebuild every rollup row of one group and record the data version they match,
+    which is what lets the analytics read them instead of the raw rows.
+    """
+    params = {"group_id": str(group_id), "days": None, "data_version": data_version}
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(ROLLUP_CLEAR_SQL, params)
+        cur.execute(ROLLUP_REFRESH_SQL, params)
+        cur.execute(ROLLUP_STATE_SQL, params)
+
+
+def reconcile_rollups(limit=None):
+    """
+    Goal: Catch up with rows written while no change listener was running.
+    Rebuilds the rollup of every group whose data version moved since its last rebuild.
+    Returns: the group ids that were rebuilt.
+    """
+    with connection.cursor() as cur:
+        cur.execute(STALE_ROLLUPS_SQL + (" LIMIT %(limit)s" if limit else ""), {"limit": limit})
+        stale = cur.fetchall()
+
+    rebuilt = []
+    for group_id, data_version in stale:
+        try:
+            rebuild_rollup(group_id, data_version)
+            rebuilt.append(group_id)
+        except Exception as e:
+            print(f"❌ Rollup rebuild failed for group {group_id}: {e}")
+    return rebuilt
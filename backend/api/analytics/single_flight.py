@@ -0,0 +1,123 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from api.shared_cache import is_shared_cache
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    In-process request coalescing: while fn() runs for a key, other threads asking for
+    the same key wait for that result instead of running fn() again.
+    do() returns (result, shared) where shared is False only for the thread that ran fn().
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            # Leader stuck or gone for too long: stop waiting and compute ourselves
+            if not call.done.wait(self.timeout):
+                return fn(), False
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+class CacheLockSingleFlight:
+    """
+    Cross-worker request coalescing through a shared Django cache.
+    The first worker to cache.add() the lock key computes; the others poll lookup()
+    (e.g. the response cache the leader writes into) until the result appears.
+    If the lock disappears without a result (leader crashed) a waiter takes over, and
+    after `timeout` seconds waiters give up and compute themselves.
+    The lock only coalesces across workers in a shared cache; a process-local alias (LocMem)
+    is ignored with a warning, leaving the in-process SingleFlight as the only coalescing.
+    """
+
+    LOCK_PREFIX = "flight:lock:"
+
+    def __init__(self, cache_alias, timeout, poll_interval=0.05):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._warned = False
+
+    def enabled(self):
+        if not self.cache_alias:
+            return False
+        if is_shared_cache(self.cache_alias):
+            return True
+        if not self._warned:
+            self._warned = True
+            print(f"⚠️ Warning: flight lock cache '{self.cache_alias}' is process-local, so computations are only coalesced within each worker")
+        return False
+
+    def do(self, key, fn, lookup):
+        """fn() must make its result visible to lookup() before returning. Returns (result, shared)."""
+        if not self.enabled():
+            return fn(), False
+
+        cache = caches[self.cache_alias]
+        lock_key = self.LOCK_PREFIX + key
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.timeout
+
+        while time.monotonic() < deadline:
+            # 1. Become the leader if nobody is computing this key
+            if cache.add(lock_key, token, timeout=int(self.timeout) + 1):
+                try:
+                    return fn(), False
+                finally:
+                    if cache.get(lock_key) == token:
+                        cache.delete(lock_key)
+
+            # 2. Someone else is: wait for their result to land
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                result = lookup()
+                if result is not None:
+                    return result, True
+                if cache.get(lock_key) is None:
+                    break  # leader finished without a result (or died): try to take over
+
+        return fn(), False
+
+
+local_flight = SingleFlight(timeout=settings.ANALYTICS_FLIGHT_TIMEOUT)
+shared_flight = CacheLockSingleFlight(
+    cache_alias=settings.ANALYTICS_FLIGHT_LOCK_ALIAS,
+    timeout=settings.ANALYTICS_FLIGHT_TIMEOUT,
+)
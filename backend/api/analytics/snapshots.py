@@ -0,0 +1,200 @@
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import caches
+
+from api.analytics.analytics_engine import AnalyticsEngine
+from api.analytics.data_loader import fetch_data_version, fetch_group_snapshot
+from api.analytics.group_arrays import GroupArrays
+from api.analytics.group_frame import GroupFrame
+from api.analytics.model_registry import model_registry
+from api.analytics.pulse_counters import pulse_counters
+from api.analytics.response_cache import analytics_cache
+from api.analytics.single_flight import local_flight, shared_flight
+
+
+class AnalyticsSnapshotStore:
+    """
+    Last computed group analysis per (group, request variant), kept across data changes so it
+    can be served immediately while a newer one is computed in the background.
+    - Entries carry the data / model version they were computed from and when.
+    - An entry is stale once either version moved or it is older than `max_age`; stale entries
+      are still served (and a refresh enqueued) until they are `max_stale` seconds old.
+    """
+
+    KEY_PREFIX = "analytics:snapshot:"
+
+    def __init__(self, cache_alias, max_age, max_stale, ttl):
+        self.cache_alias = cache_alias
+        self.max_age = max_age
+        self.max_stale = max_stale
+        self.ttl = ttl
+
+    @property
+    def enabled(self):
+        return bool(self.cache_alias) and self.ttl > 0
+
+    def key(self, group_id, **variant):
+        raw = json.dumps([str(group_id), variant], sort_keys=True, default=str)
+        return self.KEY_PREFIX + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        return caches[self.cache_alias].get(key) if self.enabled else None
+
+    def put(self, key, group_analysis):
+        if self.enabled:
+            caches[self.cache_alias].set(key, group_analysis, timeout=self.ttl)
+
+    def freshness(self, group_analysis, data_version, model_version):
+        age = max(time.time() - group_analysis["computed_at"], 0.0)
+        return {
+            "computed_at": datetime.fromtimestamp(group_analysis["computed_at"], timezone.utc).isoformat(),
+            "age_seconds": round(age, 1),
+            "stale": (
+                group_analysis["data_version"] != data_version
+                or group_analysis["model_version"] != model_version
+                or age > self.max_age
+            ),
+        }
+
+    def servable(self, group_analysis):
+        return group_analysis is not None and time.time() - group_analysis["computed_at"] <= self.max_stale
+
+
+snapshot_store = AnalyticsSnapshotStore(
+    cache_alias=settings.ANALYTICS_CACHE_ALIAS,
+    max_age=settings.ANALYTICS_SNAPSHOT_MAX_AGE,
+    max_stale=settings.ANALYTICS_SNAPSHOT_MAX_STALE,
+    ttl=settings.ANALYTICS_SNAPSHOT_TTL,
+)
+
+
+DATA_VERSION_PREFIX = "analytics:data-version:"
+
+
+def group_data_version(group_id):
+    """
+    fetch_data_version, remembered for ANALYTICS_VERSION_MEMO_SECONDS when that is enabled.
+    Change events evict the memo (forget_data_version), so it only skips probes while nothing changed.
+    """
+    seconds = settings.ANALYTICS_VERSION_MEMO_SECONDS
+    if seconds <= 0 or not settings.ANALYTICS_CACHE_ALIAS:
+        return fetch_data_version(group_id)
+
+    cache = caches[settings.ANALYTICS_CACHE_ALIAS]
+    key = DATA_VERSION_PREFIX + str(group_id)
+    data_version = cache.get(key)
+    if data_version is None:
+        data_version = fetch_data_version(group_id)
+        if data_version is not None:
+            cache.set(key, data_version, timeout=seconds)
+    return data_version
+
+
+def forget_data_version(group_id):
+    if settings.ANALYTICS_CACHE_ALIAS:
+        caches[settings.ANALYTICS_CACHE_ALIAS].delete(DATA_VERSION_PREFIX + str(group_id))
+
+
+def current_versions(group_id, fields, window_days, bucket):
+    """
+    Cheap version probe. Returns (data_version, model_version, cache_key), or None if the group doesn't exist.
+    """
+    data_version = group_data_version(group_id)
+    if data_version is None:
+        return None
+
+    model_registry.get()  # polls for a retrained model at most every poll interval
+    model_version = model_registry.version()
+    cache_key = analytics_cache.key(
+        group_id, data_version, model_version,
+        fields=fields, window=window_days, bucket=bucket,
+    )
+    return data_version, model_version, cache_key
+
+
+def compute_group_analysis(group_id, fields, window_days, bucket, data_version=None):
+    """
+    Loads the group and runs the engine for `fields`. Returns the group analysis, or None if the group doesn't exist.
+    data_version: the group's current version; the daily rollup is only used when it was built for it.
+    """
+    now = pd.Timestamp.now(tz="UTC")
+    parts = AnalyticsEngine.required_data(fields)
+
+    # 1. Messages only feed pulse / inactivity: answer those from the pulse counters when they're backfilled
+    activity = pulse_counters.activity(group_id, now.timestamp()) if "messages" in parts else None
+    if activity is not None:
+        parts = parts - {"messages"}
+
+    # 2. Load & validate group plus the data those fields need (tasks/messages/members/rollup) in one round trip
+    snapshot = fetch_group_snapshot(group_id, parts, array_max_tasks=settings.ANALYTICS_ARRAY_MAX_TASKS)
+
+    group = snapshot["group"]
+    if not group:
+        return None
+
+    # 3. Normalize once: typed UTC dates, lower-cased status, user_id, is_overdue / is_completed
+    #    (small groups come back as structured arrays and skip pandas)
+    frame_type = GroupArrays if isinstance(snapshot["tasks"], np.ndarray) else GroupFrame
+    frame = frame_type.build(snapshot["tasks"], snapshot["messages"], now=now)
+
+    if "messages" in parts and len(frame.messages) == 0:
+        print("⚠️ No messages found for this group")
+
+    rollup = snapshot["rollup"] if data_version is not None and snapshot["rollup_version"] == data_version else None
+
+    # 4. Prepare inputs
+    latest_due = frame.latest_due()
+    deadline_str = latest_due.strftime("%Y-%m-%d") if latest_due is not None else "2026-12-31"
+
+    # 5. Run analytics engine (metrics, risk matrix, history, member report; each computed once)
+    engine = AnalyticsEngine(
+        frame,
+        deadline_str=deadline_str,
+        history_window=window_days,
+        history_bucket=bucket,
+        members=snapshot["members"],
+        rollup=rollup,
+        activity=activity,
+    )
+    return engine.run_group_analysis(fields)
+
+
+def build_snapshot(group_id, fields, window_days, bucket, versions):
+    """
+    Computes the group analysis for `versions` (from current_versions) and stores it in the response
+    cache and the snapshot store. Concurrent callers for the same key wait for one computation
+    (this process, then other workers).
+    Returns (group_analysis or None, shared) where shared means another caller computed it.
+    """
+    data_version, model_version, cache_key = versions
+
+    def compute_and_store():
+        analysis = compute_group_analysis(group_id, fields, window_days, bucket, data_version)
+        if analysis is not None:
+            analysis.update(computed_at=time.time(), data_version=data_version, model_version=model_version, cache_key=cache_key)
+            snapshot_store.put(snapshot_store.key(group_id, fields=fields, window=window_days, bucket=bucket), analysis)
+            analytics_cache.set(cache_key, analysis)
+        return analysis
+
+    (group_analysis, shared_by_worker), shared_in_process = local_flight.do(
+        cache_key,
+        lambda: shared_flight.do(cache_key, compute_and_store, lambda: analytics_cache.get(cache_key))
+    )
+    return group_analysis, shared_by_worker or shared_in_process
+
+
+def refresh_snapshot(group_id, fields, window_days, bucket):
+    """Recomputes the snapshot if the stored one isn't current. Returns the current group analysis, or None."""
+    versions = current_versions(group_id, fields, window_days, bucket)
+    if versions is None:
+        return None
+    group_analysis = analytics_cache.get(versions[2])
+    if group_analysis is None:
+        group_analysis, _ = build_snapshot(group_id, fields, window_days, bucket, versions)
+    return group_analysis
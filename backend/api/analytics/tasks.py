@@ -0,0 +1,109 @@
+import time
+import uuid
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import caches
+
+from api.analytics.pulse_counters import rebuild_pulse_counters
+from api.analytics.rollup import reconcile_rollups
+from api.analytics.snapshots import refresh_snapshot, snapshot_store
+from api.shared_cache import is_shared_cache
+
+JOB_PREFIX = "analytics:job:"
+PENDING_PREFIX = "analytics:refresh:"
+
+
+def _jobs():
+    return caches[settings.ANALYTICS_CACHE_ALIAS or "default"]
+
+
+def jobs_available():
+    """
+    Background refreshes only work through a cache shared with the Celery workers: their job
+    records and snapshots would be invisible to web workers in a process-local one.
+    """
+    return is_shared_cache(settings.ANALYTICS_CACHE_ALIAS)
+
+
+def get_job(job_id):
+    return _jobs().get(JOB_PREFIX + job_id)
+
+
+def _save_job(job_id, **fields):
+    job = dict(get_job(job_id) or {}, job_id=job_id, updated_at=time.time(), **fields)
+    _jobs().set(JOB_PREFIX + job_id, job, timeout=settings.ANALYTICS_SNAPSHOT_TTL)
+    return job
+
+
+def enqueue_refresh(group_id, fields, window_days, bucket):
+    """
+    Queues a background refresh of the group's snapshot for this request variant.
+    A refresh already queued or running for the same snapshot is reused.
+    Returns the job record, or None if the broker is unreachable or jobs_available() is False.
+    """
+    if not jobs_available():
+        return None
+
+    snapshot_key = snapshot_store.key(group_id, fields=fields, window=window_days, bucket=bucket)
+    job_id = uuid.uuid4().hex
+
+    # 1. One pending refresh per snapshot (a refresh pending for longer than max_age is presumed lost)
+    pending_key, pending_seconds = PENDING_PREFIX + snapshot_key, max(int(snapshot_store.max_age), 1)
+    if not _jobs().add(pending_key, job_id, timeout=pending_seconds):
+        pending = _jobs().get(pending_key)
+        job = get_job(pending) if pending else None
+        if job is not None and job["status"] in ("queued", "running"):
+            return job
+        _jobs().set(pending_key, job_id, timeout=pending_seconds)
+
+    # 2. Enqueue; the record lets clients poll the job without a Celery result backend
+    job = _save_job(job_id, group_id=group_id, status="queued")
+    try:
+        refresh_group_analytics.apply_async(
+            args=(group_id, fields, window_days, bucket, snapshot_key), task_id=job_id
+        )
+    except Exception as e:
+        print(f"⚠️ Could not enqueue analytics refresh for group {group_id}: {e}")
+        _jobs().delete(pending_key)
+        _save_job(job_id, status="failed", error="Refresh queue unavailable")
+        return None
+    return job
+
+
+@shared_task(bind=True)
+def refresh_group_analytics(self, group_id, fields, window_days, bucket, snapshot_key=None):
+    job_id = self.request.id
+    _save_job(job_id, group_id=group_id, status="running")
+    try:
+        group_analysis = refresh_snapshot(group_id, fields, window_days, bucket)
+        if group_analysis is None:
+            _save_job(job_id, status="failed", error="Group not found")
+        else:
+            _save_job(job_id, status="done", data_version=group_analysis["data_version"])
+    except Exception as e:
+        print(f"❌ Analytics refresh failed for group {group_id}: {e}")
+        _save_job(job_id, status="failed", error=str(e))
+        raise
+    finally:
+        if snapshot_key:
+            _jobs().delete(PENDING_PREFIX + snapshot_key)
+
+
+@shared_task
+def reconcile_group_rollups(limit=None):
+    """
+    Rebuilds the daily rollup of groups changed outside Django (direct Supabase writes).
+    Schedule it with django_celery_beat (e.g. every few minutes); see also `manage.py reconcile_rollups`.
+    """
+    rebuilt = reconcile_rollups(limit)
+    print(f"📊 Rollups rebuilt for {len(rebuilt)} group(s)")
+    return rebuilt
+
+
+@shared_task
+def rebuild_group_pulse_counters():
+    """Backfills every group's pulse counters; schedule it daily to correct deleted or edited messages."""
+    loaded = rebuild_pulse_counters()
+    print(f"📈 Pulse counters rebuilt for {loaded} group(s)")
+    return loaded
@@ -6,4 +6,6 @@ class ApiConfig(AppConfig):
     name = 'api'
 
     def ready(self):
-        import api.reports.tasks  # ✅ register Celery tasks
\ No newline at end of file
+        import api.reports.tasks  # ✅ register Celery tasks
+        import api.signals  # ✅ emit group change events on model writes
+        import api.analytics.consumers  # ✅ subscribe cache / rollup / snapshot consumers to them
\ No newline at end of file
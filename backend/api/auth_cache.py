@@ -0,0 +1,119 @@
+import hashlib
+import threading
+import time
+
+from cachetools import TLRUCache, TTLCache
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+
+User = get_user_model()
+
+
+class PrincipalCache:
+    """
+    Remembers which Django user a verified bearer token belongs to.
+    Keys are the SHA-256 of the token (the raw token is never stored), values hold
+    the user id and claims. Entries die at the token's 'exp' or after max_ttl seconds,
+    whichever comes first. An optional shared Django cache lets workers reuse each other's
+    verifications. Separately, this process keeps each user's column values (for max_ttl),
+    so a hit needs no query yet every request gets its own User instance.
+    """
+
+    KEY_PREFIX = "auth:principal:"
+
+    def __init__(self, maxsize, max_ttl, cache_alias=None):
+        self.max_ttl = max_ttl
+        self.cache_alias = cache_alias
+        self._local = TLRUCache(maxsize=maxsize, ttu=self._expires_at, timer=time.time)
+        self._users = TTLCache(maxsize=maxsize, ttl=max_ttl, timer=time.time)  # user pk -> {attname: value}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expires_at(self, key, entry, now):
+        return min(entry['exp'], now + self.max_ttl)
+
+    @staticmethod
+    def token_key(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token):
+        key = self.token_key(token)
+        now = time.time()
+
+        with self._lock:
+            entry = self._local.get(key)
+
+        if entry is None and self.cache_alias:
+            entry = caches[self.cache_alias].get(self.KEY_PREFIX + key)
+            if entry is not None and entry['exp'] > now:
+                with self._lock:
+                    self._local[key] = entry
+
+        # The shared backend only has whole-second timeouts, so re-check 'exp' here
+        hit = entry is not None and entry['exp'] > now
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry if hit else None
+
+    def set(self, token, user, claims):
+        now = time.time()
+        entry = {
+            'user_id': user.pk,
+            'claims': claims,
+            'exp': float(claims.get('exp') or now + self.max_ttl),
+        }
+        if entry['exp'] <= now:
+            return
+
+        key = self.token_key(token)
+        with self._lock:
+            self._local[key] = entry
+        self.remember_user(user)
+
+        if self.cache_alias:
+            # Other workers load the User once on their first hit
+            timeout = max(1, int(self._expires_at(key, entry, now) - now))
+            caches[self.cache_alias].set(self.KEY_PREFIX + key, entry, timeout)
+
+    def remember_user(self, user):
+        """Keeps a copy of `user`'s column values so later hits can build it without a query."""
+        fields = {field.attname: getattr(user, field.attname) for field in User._meta.concrete_fields}
+        with self._lock:
+            self._users[user.pk] = fields
+
+    def user(self, user_id):
+        """A new User built from the remembered values (None if this process doesn't have them)."""
+        with self._lock:
+            fields = self._users.get(user_id)
+        if fields is None:
+            return None
+        # Never the same instance twice: a view mutating request.user can't leak into other requests
+        return User.from_db(None, list(fields), list(fields.values()))
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+            self._users.clear()
+
+    def stats(self):
+        with self._lock:
+            hits, misses, size = self.hits, self.misses, len(self._local)
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "size": size,
+        }
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.SUPABASE_AUTH_CACHE_SIZE,
+    max_ttl=settings.SUPABASE_AUTH_CACHE_MAX_SECONDS,
+    cache_alias=settings.SUPABASE_AUTH_CACHE_ALIAS,
+)
@@ -1,12 +1,150 @@
-import requests
+import threading
+import time
+
+import httpx
+import jwt
 import logging
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from rest_framework import authentication, exceptions
 
+from .auth_cache import principal_cache
+from .http_client import supabase_request
+from .user_sync import user_sync
+
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+
+class LocalVerificationUnavailable(Exception):
+    """Raised when a token cannot be checked in-process (no secret / unknown signing key)."""
+
+
+class SupabaseJWKS:
+    """
+    Holds the project's JSON Web Key Set for ES256/RS256 tokens.
+    The set is fetched once on first use and then refreshed by a daemon thread,
+    so verifying a token never waits on the network in the steady state.
+    """
+
+    # Minimum gap between on-demand refreshes triggered by an unknown 'kid'
+    MIN_FORCED_REFRESH_SECONDS = 30
+
+    def __init__(self, path, refresh_seconds):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_refresh = 0.0
+
+    def refresh(self):
+        response = supabase_request("GET", self.path)
+        response.raise_for_status()
+        jwk_set = jwt.PyJWKSet.from_dict(response.json())
+        # Swap the whole dict at once so readers never see a half-built key set
+        self._keys = {key.key_id: key for key in jwk_set.keys}
+        self._last_refresh = time.monotonic()
+
+    def _refresh_forever(self):
+        while True:
+            time.sleep(self.refresh_seconds)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"DEBUG: JWKS background refresh failed: {str(e)}")
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            # Started lazily so each forked worker owns its own refresher thread
+            if self._thread is None:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"DEBUG: Initial JWKS fetch failed: {str(e)}")
+                self._thread = threading.Thread(target=self._refresh_forever, name="supabase-jwks", daemon=True)
+                self._thread.start()
+
+    def get_key(self, kid):
+        self._ensure_started()
+        key = self._keys.get(kid)
+
+        # An unknown kid usually means Supabase rotated its keys: refresh once, rate limited
+        if key is None and time.monotonic() - self._last_refresh > self.MIN_FORCED_REFRESH_SECONDS:
+            with self._lock:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"DEBUG: JWKS refresh failed: {str(e)}")
+            key = self._keys.get(kid)
+
+        if key is None:
+            raise LocalVerificationUnavailable(f"No signing key found for kid={kid}")
+        return key.key
+
+
+_jwks = SupabaseJWKS(
+    "/auth/v1/.well-known/jwks.json",
+    settings.SUPABASE_JWKS_REFRESH_SECONDS,
+)
+
+
+def verify_token_locally(token):
+    """
+    Goal: Validate a Supabase access token without leaving the process.
+    HS256 tokens are checked against SUPABASE_JWT_SECRET, ES256/RS256 against the JWKS.
+    Returns the decoded claims or raises jwt.InvalidTokenError.
+    """
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get('alg')
+
+    if algorithm == 'HS256':
+        if not settings.SUPABASE_JWT_SECRET:
+            raise LocalVerificationUnavailable("SUPABASE_JWT_SECRET is not configured")
+        key = settings.SUPABASE_JWT_SECRET
+    elif algorithm in ('ES256', 'RS256'):
+        key = _jwks.get_key(header.get('kid'))
+    else:
+        raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm: {algorithm}")
+
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=settings.SUPABASE_JWT_AUDIENCE,
+        options={"require": ["exp", "sub"]},
+    )
+
+
+def verify_token_remotely(token):
+    """
+    Goal: Ask the Supabase Auth server who owns the token (one network round trip).
+    Returns the user payload reshaped like local claims, or None if Supabase rejects it.
+    """
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "apikey": settings.SUPABASE_ANON_KEY
+    }
+    response = supabase_request("GET", "/auth/v1/user", headers=headers)
+
+    if response.status_code != 200:
+        print(f"DEBUG: Supabase rejected token. Status Code: {response.status_code}")
+        return None
+
+    user_data = response.json()
+    # Supabase just vouched for the token, so reading its 'exp' unverified is safe here
+    expires_at = jwt.decode(token, options={"verify_signature": False}).get('exp')
+    return {
+        'sub': user_data.get('id'),  # This is the unique 'sub'
+        'email': user_data.get('email'),
+        'user_metadata': user_data.get('user_metadata') or {},
+        'app_metadata': user_data.get('app_metadata') or {},
+        'exp': expires_at,
+    }
+
+
 class SupabaseJWTAuthentication(authentication.BaseAuthentication):
     def authenticate(self, request):
         # 1. Extract the token from the Authorization header
@@ -16,58 +154,64 @@ class SupabaseJWTAuthentication(authentication.BaseAuthentication):
 
         token = auth_header.split(' ')[1]
 
-        # 2. Verify the token with Supabase (Algorithm-agnostic)
-        # This handles HS256 and ES256 automatically
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "apikey": settings.SUPABASE_ANON_KEY
-        }
-        
         try:
-            # We call the Supabase Auth server directly to validate the user
-            response = requests.get(
-                f"{settings.SUPABASE_URL}/auth/v1/user", 
-                headers=headers,
-                timeout=5
-            )
-
-            if response.status_code != 200:
-                print(f"DEBUG: Supabase rejected token. Status Code: {response.status_code}")
+            # 2. Reuse an earlier verification of this exact token (no network, no query)
+            principal = principal_cache.get(token)
+            if principal is not None:
+                # A new instance from this process's cached values (loaded once if another worker verified it)
+                user = user_sync.get_user(principal['user_id'])
+                if user is not None and user.is_active:
+                    user_sync.maybe_flush()
+                    return (user, None)
+
+            # 3. Verify the token (locally when possible, Supabase Auth as the fallback)
+            claims = self.verify(token)
+            if claims is None:
                 return None
 
-            user_data = response.json()
-            supabase_uid = user_data.get('id') # This is the unique 'sub'
-            email = user_data.get('email')
-
-            # Get metadata if it exists (where full_name usually lives in Supabase Auth)
-            user_metadata = user_data.get('user_metadata', {})
-            app_metadata = user_data.get('app_metadata', {})
-            full_name = user_metadata.get('full_name', email) # Fallback to email if name is missing
-            supabase_role = (
-                app_metadata.get('role') or 
-                user_metadata.get('role') or 
-                'student'
-            ).lower() # Ensure it's lowercase to match ROLE_CHOICES
-
-            # 3. Sync with your Django User model
-            # We use update_or_create to ensure is_active is always True
-            user, created = User.objects.update_or_create(
-                supabase_id=supabase_uid, 
-                defaults={
-                    'username': email, # Django requires a unique username
-                    'first_name': full_name, # Map Supabase full_name here
-                    'email': email,
-                    'is_active': True,
-                    'role': supabase_role # Use the real role from Supabase
-                }
-            )
+            # 4. Sync with your Django User model
+            user = self.sync_user(claims)
+            principal_cache.set(token, user, claims)
 
             print(f"DEBUG: Successfully authenticated {user.email} (Active: {user.is_active})")
             return (user, None)
 
-        except requests.exceptions.RequestException as e:
+        except jwt.InvalidTokenError as e:
+            print(f"DEBUG: Rejected token: {str(e)}")
+            return None
+        except httpx.HTTPError as e:
             print(f"DEBUG: Connection to Supabase failed: {str(e)}")
             return None
         except Exception as e:
             print(f"DEBUG: Unexpected error in authentication: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+    def verify(self, token):
+        if settings.SUPABASE_AUTH_MODE == 'remote':
+            return verify_token_remotely(token)
+
+        try:
+            return verify_token_locally(token)
+        except LocalVerificationUnavailable as e:
+            # Invalid/expired tokens are rejected above; only "can't check here" falls through
+            if not settings.SUPABASE_AUTH_REMOTE_FALLBACK:
+                raise jwt.InvalidTokenError(str(e))
+            print(f"DEBUG: Local verification unavailable ({str(e)}), asking Supabase Auth")
+            return verify_token_remotely(token)
+
+    def sync_user(self, claims):
+        supabase_uid = claims.get('sub')
+        email = claims.get('email')
+
+        # Get metadata if it exists (where full_name usually lives in Supabase Auth)
+        user_metadata = claims.get('user_metadata') or {}
+        app_metadata = claims.get('app_metadata') or {}
+        full_name = user_metadata.get('full_name', email) # Fallback to email if name is missing
+        supabase_role = (
+            app_metadata.get('role') or
+            user_metadata.get('role') or
+            'student'
+        ).lower() # Ensure it's lowercase to match ROLE_CHOICES
+
+        # Only writes when email/full_name/role changed, batched with other changed users
+        return user_sync.sync(supabase_uid, email, full_name, supabase_role)
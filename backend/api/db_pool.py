@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from django.conf import settings
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the checkout timeout."""
+
+
+class SupabaseConnectionPool:
+    """
+    Process-wide, thread-safe pool of raw psycopg2 connections to the Supabase Postgres.
+    - At most max_size connections exist at once; callers wait (up to checkout_timeout) for a free one.
+    - Connections older than max_lifetime are retired so the pooler can rebalance.
+    - Connections idle longer than health_check_after are pinged with SELECT 1 before reuse.
+    Connections run in autocommit mode: every caller here only reads.
+    """
+
+    def __init__(self, min_size, max_size, max_lifetime, health_check_after, checkout_timeout):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.checkout_timeout = checkout_timeout
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = deque()  # (conn, created_at, last_used_at)
+        self._lock = threading.Lock()
+        self._warm_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._warmed = False
+        self._stats = {
+            "checkouts": 0,
+            "connections_opened": 0,
+            "connections_retired": 0,
+            "timeouts": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+
+    def _connect(self):
+        params = {
+            "dbname": os.getenv("DB_NAME"),
+            "user": os.getenv("DB_USER"),
+            "password": os.getenv("DB_PWD"),
+            "host": os.getenv("DB_HOST"),
+            "port": os.getenv("DB_PORT"),
+        }
+        if not all(params.values()):
+            raise ValueError("Database connection variables are missing from environment.")
+
+        conn = psycopg2.connect(**params)
+        conn.autocommit = True
+        with self._lock:
+            self._stats["connections_opened"] += 1
+        return conn, time.monotonic()
+
+    def _retire(self, conn):
+        with self._lock:
+            self._stats["connections_retired"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, conn, created_at, last_used_at):
+        now = time.monotonic()
+        if conn.closed or now - created_at > self.max_lifetime:
+            return False
+        if now - last_used_at > self.health_check_after:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _warm_up(self):
+        # Open min_size connections up front so the first dashboard loads don't pay for them
+        with self._warm_lock:
+            if self._warmed:
+                return
+            self._warmed = True
+            for _ in range(self.min_size):
+                try:
+                    conn, created_at = self._connect()
+                except Exception as e:
+                    print(f"⚠️ Warning: DB pool warm-up failed: {e}")
+                    return
+                with self._lock:
+                    self._idle.append((conn, created_at, time.monotonic()))
+
+    def _checkout(self):
+        if not self._warmed:
+            self._warm_up()
+
+        while True:
+            with self._lock:
+                entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                return self._connect()
+            conn, created_at, last_used_at = entry
+            if self._is_usable(conn, created_at, last_used_at):
+                return conn, created_at
+            self._retire(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection:  with db_pool.connection() as conn: ...
+        It goes back to the pool afterwards unless it broke while in use.
+        """
+        if self._pid != os.getpid():
+            # Forked worker: never reuse the parent's sockets
+            self._reset()
+
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise PoolTimeout(f"No database connection available after {self.checkout_timeout}s")
+
+        waited_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["wait_ms_total"] += waited_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], waited_ms)
+
+        conn = None
+        broken = False
+        try:
+            conn, created_at = self._checkout()
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            if conn is not None:
+                if broken or conn.closed:
+                    self._retire(conn)
+                else:
+                    with self._lock:
+                        self._idle.append((conn, created_at, time.monotonic()))
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+        checkouts = stats["checkouts"]
+        stats["wait_ms_avg"] = round(stats["wait_ms_total"] / checkouts, 3) if checkouts else 0.0
+        stats["wait_ms_total"] = round(stats["wait_ms_total"], 3)
+        stats["wait_ms_max"] = round(stats["wait_ms_max"], 3)
+        return stats
+
+
+db_pool = SupabaseConnectionPool(
+    min_size=settings.SUPABASE_DB_POOL_MIN,
+    max_size=settings.SUPABASE_DB_POOL_MAX,
+    max_lifetime=settings.SUPABASE_DB_POOL_MAX_LIFETIME,
+    health_check_after=settings.SUPABASE_DB_POOL_HEALTH_CHECK_AFTER,
+    checkout_timeout=settings.SUPABASE_DB_POOL_TIMEOUT,
+)
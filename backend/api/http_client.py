@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+
+import httpx
+from django.conf import settings
+
+# Shared HTTP layer for every outbound Supabase call (Auth, REST, Storage).
+# One keep-alive pool per process means TLS handshakes happen once, not per request.
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+_latency = {}  # "METHOD /path" -> {"count", "total_ms", "max_ms", "errors"}
+_latency_lock = threading.Lock()
+
+
+def _start_timer(request):
+    request.extensions["advisuri_started_at"] = time.perf_counter()
+
+
+def _record_latency(response):
+    # Measured up to the response headers, which is where the network cost lives
+    request = response.request
+    started_at = request.extensions.get("advisuri_started_at")
+    if started_at is None:
+        return
+
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    endpoint = f"{request.method} {request.url.path}"
+
+    with _latency_lock:
+        stats = _latency.setdefault(endpoint, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0})
+        stats["count"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        if response.status_code >= 500:
+            stats["errors"] += 1
+
+
+def build_client():
+    """
+    Builds a new pooled httpx.Client with the shared limits, timeouts and latency hooks.
+    For libraries that take ownership of the client they're given (e.g. supabase-py sets its
+    base_url and headers), so they never touch the shared one.
+    """
+    limits = httpx.Limits(
+        max_connections=settings.SUPABASE_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.SUPABASE_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.SUPABASE_HTTP_KEEPALIVE_SECONDS,
+    )
+    # Transport-level retries only cover connect failures, so they're safe for POST/PATCH too
+    transport = httpx.HTTPTransport(
+        http2=settings.SUPABASE_HTTP2,
+        limits=limits,
+        retries=settings.SUPABASE_HTTP_RETRIES,
+    )
+    return httpx.Client(
+        transport=transport,
+        timeout=httpx.Timeout(
+            settings.SUPABASE_HTTP_TIMEOUT,
+            connect=settings.SUPABASE_HTTP_CONNECT_TIMEOUT,
+        ),
+        follow_redirects=True,
+        event_hooks={"request": [_start_timer], "response": [_record_latency]},
+    )
+
+
+def get_client():
+    """
+    Returns the process-wide httpx.Client.
+    Rebuilt after a fork so gunicorn/celery workers never share sockets with the parent.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = build_client()
+                _client_pid = os.getpid()
+    return _client
+
+
+def supabase_request(method, path, **kwargs):
+    """Sends a request to SUPABASE_URL + path through the pooled client."""
+    return get_client().request(method, f"{settings.SUPABASE_URL}{path}", **kwargs)
+
+
+def latency_stats():
+    """Per-endpoint latency summary, reported by the test-supabase diagnostics endpoint."""
+    with _latency_lock:
+        return {
+            endpoint: {
+                "count": stats["count"],
+                "avg_ms": round(stats["total_ms"] / stats["count"], 2),
+                "max_ms": round(stats["max_ms"], 2),
+                "errors": stats["errors"],
+            }
+            for endpoint, stats in _latency.items()
+        }
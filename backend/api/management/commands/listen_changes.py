@@ -0,0 +1,105 @@
+"""
+Django management command that turns Postgres NOTIFYs into analytics change events.
+
+Usage:
+    python manage.py listen_changes
+
+Tables written straight through Supabase (tasks, chat_messages, group_members) notify the
+'analytics_changes' channel from the triggers installed by migrations 0005 / 0007. Each notification
+becomes a ChangeEvent on change_bus, which batches them per group and runs the cache / rollup /
+snapshot consumers. Run one listener per deployment; LISTEN needs a session connection, so
+point DB_HOST/DB_PORT at the database directly (not the transaction pooler).
+
+Notifications are per transaction, not per row: Postgres delivers identical payloads of one
+transaction once. Cache invalidation and snapshot refresh need a shared ANALYTICS_CACHE_ALIAS to
+reach the web workers; with a process-local one they are skipped here. While it runs, the
+listener also vouches for the pulse counters (ANALYTICS_PULSE_LIVE_SECONDS).
+"""
+
+import json
+import os
+import select
+import time
+from datetime import date
+
+import psycopg2
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.analytics.change_events import ChangeEvent, change_bus
+from api.analytics.consumers import SHARED_CACHE_CONSUMERS
+from api.analytics.pulse_counters import pulse_counters, rebuild_pulse_counters
+from api.analytics.rollup import reconcile_rollups
+from api.shared_cache import is_shared_cache
+
+CHANNEL = 'analytics_changes'
+
+
+class Command(BaseCommand):
+    help = 'Listens for Postgres change notifications and feeds them to the analytics change bus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reconnect-delay', type=float, default=5.0, help='Seconds to wait before reconnecting')
+
+    def handle(self, *args, **options):
+        # 1. A process-local cache is this process's alone: evicting or reading it here reaches no worker
+        if not is_shared_cache(settings.ANALYTICS_CACHE_ALIAS):
+            self.stderr.write(
+                f'⚠️ Warning: analytics cache "{settings.ANALYTICS_CACHE_ALIAS}" is process-local, so '
+                'cache invalidation and snapshot refresh are skipped (web workers rely on their own expiry)'
+            )
+            for consumer in SHARED_CACHE_CONSUMERS:
+                change_bus.unsubscribe(consumer)
+
+        # 2. Listen, reconnecting on failure
+        while True:
+            try:
+                self._listen()
+            except (psycopg2.Error, OSError) as e:
+                self.stderr.write(f'⚠️ Lost the notification connection: {e}')
+                change_bus.flush()
+                time.sleep(options['reconnect_delay'])
+
+    def _listen(self):
+        conn = psycopg2.connect(
+            dbname=os.getenv('DB_NAME'),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PWD'),
+            host=os.getenv('DB_HOST'),
+            port=os.getenv('DB_PORT'),
+        )
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f'LISTEN {CHANNEL};')
+            self.stdout.write(self.style.SUCCESS(f'📡 Listening on {CHANNEL}...'))
+
+            # Incremental rollup refreshes assume no change was missed: catch up on whatever
+            # was written while nobody listened (LISTEN is already on, so nothing slips between)
+            rebuilt = reconcile_rollups()
+            if rebuilt:
+                self.stdout.write(f'📊 Rebuilt {len(rebuilt)} stale rollup(s)')
+            # The pulse counters missed the same writes
+            rebuild_pulse_counters()
+
+            # The bus's own flusher thread delivers the debounced batches; the heartbeat tells
+            # the web workers the pulse counters are still being kept current
+            while True:
+                pulse_counters.keep_alive()
+                if select.select([conn], [], [], 5.0)[0]:
+                    conn.poll()
+                    while conn.notifies:
+                        self._emit(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+    def _emit(self, payload):
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            self.stderr.write(f'⚠️ Ignoring malformed notification: {payload[:200]}')
+            return
+        if data.get('group_id') is None:
+            return
+        days = tuple(date.fromisoformat(day) for day in data.get('days') or ())
+        change_bus.emit(ChangeEvent(data['entity'], data['group_id'], data['op'], float(data['ts']), days))
@@ -0,0 +1,26 @@
+"""
+Django management command to backfill the hourly pulse counters from chat_messages.
+
+Usage:
+    python manage.py rebuild_pulse_counters               # every group
+    python manage.py rebuild_pulse_counters --group 42    # just these groups (repeatable)
+
+Until a group has been backfilled its pulse / inactivity are computed from its messages.
+`listen_changes` backfills every group when it connects and keeps the counters current from the
+change events; the counters are only trusted while it runs (ANALYTICS_PULSE_LIVE_SECONDS).
+"""
+
+from django.core.management.base import BaseCommand
+
+from api.analytics.pulse_counters import rebuild_pulse_counters
+
+
+class Command(BaseCommand):
+    help = 'Backfills the per-group hourly message counters behind the activity pulse'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', action='append', default=[], help='Group id to backfill (repeatable)')
+
+    def handle(self, *args, **options):
+        loaded = rebuild_pulse_counters(options['group'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Backfilled pulse counters for {loaded} group(s)'))
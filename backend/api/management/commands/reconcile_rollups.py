@@ -0,0 +1,33 @@
+"""
+Django management command to bring the analytics daily rollup up to date.
+
+Usage:
+    python manage.py reconcile_rollups                 # groups whose data changed since their last rebuild
+    python manage.py reconcile_rollups --group 42      # rebuild one group regardless
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.analytics.data_loader import fetch_data_version
+from api.analytics.rollup import rebuild_rollup, reconcile_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds group_daily_rollup rows for groups changed outside Django'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', action='append', default=[], help='Group id to rebuild (repeatable)')
+        parser.add_argument('--limit', type=int, default=None, help='Rebuild at most this many stale groups')
+
+    def handle(self, *args, **options):
+        if options['group']:
+            for group_id in options['group']:
+                data_version = fetch_data_version(group_id)
+                if data_version is None:
+                    raise CommandError(f'Group {group_id} not found')
+                rebuild_rollup(group_id, data_version)
+                self.stdout.write(self.style.SUCCESS(f'Rebuilt rollup for group {group_id}'))
+            return
+
+        rebuilt = reconcile_rollups(options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups for {len(rebuilt)} group(s)'))
@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-17 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_alter_studentprojectscore_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group_id', models.CharField(max_length=64)),
+                ('day', models.DateField()),
+                ('tasks_created', models.IntegerField(default=0)),
+                ('tasks_completed', models.IntegerField(default=0)),
+                ('tasks_completed_undated', models.IntegerField(default=0)),
+                ('tasks_closed', models.IntegerField(default=0)),
+                ('tasks_done_by_due', models.IntegerField(default=0)),
+                ('tasks_overdue', models.IntegerField(default=0)),
+                ('messages', models.IntegerField(default=0)),
+                ('active_members', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'group_daily_rollup',
+                'constraints': [models.UniqueConstraint(fields=('group_id', 'day'), name='group_daily_rollup_group_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='GroupRollupState',
+            fields=[
+                ('group_id', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data_version', models.CharField(max_length=32)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'group_rollup_state',
+            },
+        ),
+    ]
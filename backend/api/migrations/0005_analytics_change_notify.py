@@ -0,0 +1,86 @@
+# Generated by Django 6.0 on 2026-10-17 10:00
+
+from django.db import migrations
+
+CHANNEL = 'analytics_changes'
+
+# Tables written straight through Supabase -> entity name in the change event
+NOTIFY_TABLES = {
+    'tasks': 'task',
+    'chat_messages': 'message',
+    'group_members': 'group_member',
+}
+
+CREATE_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION notify_analytics_change() RETURNS trigger AS $$
+DECLARE
+    row_data jsonb;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_data := to_jsonb(OLD);
+    ELSE
+        row_data := to_jsonb(NEW);
+    END IF;
+    -- now() is per transaction, and Postgres delivers identical payloads of one transaction once:
+    -- a multi-row write arrives as ONE notification, so listeners must not count them as rows
+    PERFORM pg_notify('{CHANNEL}', json_build_object(
+        'entity', TG_ARGV[0],
+        'group_id', row_data->>'group_id',
+        'op', lower(TG_OP),
+        'ts', extract(epoch FROM now())
+    )::text);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+# Tables that don't exist (e.g. a local database without the Supabase schema) are skipped
+CREATE_TRIGGER = """
+DO $$
+BEGIN
+    IF to_regclass('public.{table}') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS {table}_analytics_change ON public.{table};
+        CREATE TRIGGER {table}_analytics_change
+            AFTER INSERT OR UPDATE OR DELETE ON public.{table}
+            FOR EACH ROW EXECUTE FUNCTION notify_analytics_change('{entity}');
+    END IF;
+END
+$$;
+"""
+
+DROP_TRIGGER = """
+DO $$
+BEGIN
+    IF to_regclass('public.{table}') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS {table}_analytics_change ON public.{table};
+    END IF;
+END
+$$;
+"""
+
+
+def install_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_FUNCTION)
+    for table, entity in NOTIFY_TABLES.items():
+        schema_editor.execute(CREATE_TRIGGER.format(table=table, entity=entity))
+
+
+def remove_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in NOTIFY_TABLES:
+        schema_editor.execute(DROP_TRIGGER.format(table=table))
+    schema_editor.execute("DROP FUNCTION IF EXISTS notify_analytics_change();")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_group_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_triggers, remove_triggers),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 6.0 on 2026-10-17 11:00
+
+from django.db import migrations
+
+# The model registry polls this column instead of hashing the whole model_binary BYTEA.
+# ml/train_model.py writes it on upload; the trigger keeps it right for any other writer.
+ADD_VERSION = """
+DO $$
+BEGIN
+    IF to_regclass('public."Risk_Matrix_TrainSet"') IS NOT NULL THEN
+        ALTER TABLE public."Risk_Matrix_TrainSet" ADD COLUMN IF NOT EXISTS model_version TEXT;
+        UPDATE public."Risk_Matrix_TrainSet"
+            SET model_version = md5(model_binary)
+            WHERE model_binary IS NOT NULL AND model_version IS NULL;
+
+        CREATE OR REPLACE FUNCTION risk_model_set_version() RETURNS trigger AS $fn$
+        BEGIN
+            -- Hashed once per upload, never per poll
+            IF TG_OP = 'INSERT' OR NEW.model_binary IS DISTINCT FROM OLD.model_binary THEN
+                NEW.model_version := md5(NEW.model_binary);
+            END IF;
+            RETURN NEW;
+        END
+        $fn$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS risk_model_version ON public."Risk_Matrix_TrainSet";
+        CREATE TRIGGER risk_model_version
+            BEFORE INSERT OR UPDATE ON public."Risk_Matrix_TrainSet"
+            FOR EACH ROW EXECUTE FUNCTION risk_model_set_version();
+    END IF;
+END
+$$;
+"""
+
+DROP_VERSION = """
+DO $$
+BEGIN
+    IF to_regclass('public."Risk_Matrix_TrainSet"') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS risk_model_version ON public."Risk_Matrix_TrainSet";
+        ALTER TABLE public."Risk_Matrix_TrainSet" DROP COLUMN IF EXISTS model_version;
+    END IF;
+END
+$$;
+DROP FUNCTION IF EXISTS risk_model_set_version();
+"""
+
+
+def add_model_version(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(ADD_VERSION)
+
+
+def drop_model_version(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_VERSION)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_analytics_change_notify'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_model_version, drop_model_version),
+    ]
@@ -0,0 +1,132 @@
+# Generated by Django 6.0 on 2026-10-17 12:00
+
+from django.db import migrations
+
+CHANNEL = 'analytics_changes'
+
+# Table -> (entity, columns whose UTC day the rollup rows are keyed on; see rollup.ROLLUP_REFRESH_SQL)
+NOTIFY_TABLES = {
+    'tasks': ('task', ['created_at', 'completed_at', 'due_date']),
+    'chat_messages': ('message', ['created_at']),
+    'group_members': ('group_member', []),
+}
+
+# Same payload as 0005 plus 'days': the UTC days of the row's rollup columns, before and after
+# the change, so the listener recomputes just those rollup rows. Same day rule as rollup._utc_day.
+# A NULL group_id is sent as JSON null, which the listener ignores (as in 0005).
+CREATE_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION notify_analytics_change() RETURNS trigger AS $$
+DECLARE
+    group_ids text[] := '{{}}';
+    days text[] := '{{}}';
+    day date;
+    col text;
+    group_id text;
+BEGIN
+    -- A row moved to another group changes both groups
+    IF TG_OP <> 'INSERT' THEN
+        group_ids := group_ids || (to_jsonb(OLD)->>'group_id');
+    END IF;
+    IF TG_OP <> 'DELETE' AND NOT coalesce(to_jsonb(NEW)->>'group_id' = ANY(group_ids), false) THEN
+        group_ids := group_ids || (to_jsonb(NEW)->>'group_id');
+    END IF;
+    FOREACH col IN ARRAY TG_ARGV[1:TG_NARGS - 1] LOOP
+        IF TG_OP <> 'INSERT' THEN
+            EXECUTE format('SELECT (to_timestamp(extract(epoch FROM ($1).%I)) AT TIME ZONE ''UTC'')::date', col)
+                INTO day USING OLD;
+            IF day IS NOT NULL AND NOT day::text = ANY(days) THEN
+                days := days || day::text;
+            END IF;
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            EXECUTE format('SELECT (to_timestamp(extract(epoch FROM ($1).%I)) AT TIME ZONE ''UTC'')::date', col)
+                INTO day USING NEW;
+            IF day IS NOT NULL AND NOT day::text = ANY(days) THEN
+                days := days || day::text;
+            END IF;
+        END IF;
+    END LOOP;
+    -- now() is per transaction and Postgres drops duplicate payloads within a transaction, so
+    -- same-day changes of one transaction still arrive as a single notification
+    FOREACH group_id IN ARRAY group_ids LOOP
+        PERFORM pg_notify('{CHANNEL}', json_build_object(
+            'entity', TG_ARGV[0],
+            'group_id', group_id,
+            'op', lower(TG_OP),
+            'ts', extract(epoch FROM now()),
+            'days', days
+        )::text);
+    END LOOP;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+# 0005's function, restored on the way back
+RESTORE_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION notify_analytics_change() RETURNS trigger AS $$
+DECLARE
+    row_data jsonb;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_data := to_jsonb(OLD);
+    ELSE
+        row_data := to_jsonb(NEW);
+    END IF;
+    -- now() is per transaction, so identical notifications of one transaction collapse into one
+    PERFORM pg_notify('{CHANNEL}', json_build_object(
+        'entity', TG_ARGV[0],
+        'group_id', row_data->>'group_id',
+        'op', lower(TG_OP),
+        'ts', extract(epoch FROM now())
+    )::text);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+# Tables that don't exist (e.g. a local database without the Supabase schema) are skipped
+CREATE_TRIGGER = """
+DO $$
+BEGIN
+    IF to_regclass('public.{table}') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS {table}_analytics_change ON public.{table};
+        CREATE TRIGGER {table}_analytics_change
+            AFTER INSERT OR UPDATE OR DELETE ON public.{table}
+            FOR EACH ROW EXECUTE FUNCTION notify_analytics_change({arguments});
+    END IF;
+END
+$$;
+"""
+
+
+def _install(schema_editor, function, with_days):
+    schema_editor.execute(function)
+    for table, (entity, columns) in NOTIFY_TABLES.items():
+        arguments = [entity] + (columns if with_days else [])
+        schema_editor.execute(CREATE_TRIGGER.format(
+            table=table, arguments=', '.join(f"'{argument}'" for argument in arguments),
+        ))
+
+
+def add_change_days(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    _install(schema_editor, CREATE_FUNCTION, with_days=True)
+
+
+def remove_change_days(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    _install(schema_editor, RESTORE_FUNCTION, with_days=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_risk_model_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_change_days, remove_change_days),
+    ]
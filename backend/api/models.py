@@ -133,3 +133,50 @@ class Document(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class GroupDailyRollup(models.Model):
+    """
+    Per group and UTC day counts of the analytics source tables (Supabase tasks / chat_messages),
+    so history, velocity and forecast read O(days) rows instead of every task.
+    Maintained by api.analytics.rollup (change notifications + periodic reconciler).
+    """
+    # Supabase group ids (not the Django Group uuid), as text
+    group_id = models.CharField(max_length=64)
+    day = models.DateField()
+    tasks_created = models.IntegerField(default=0)
+    # progress_percentage = 100, by completed_at day
+    tasks_completed = models.IntegerField(default=0)
+    # progress_percentage = 100 without completed_at, by created_at day (history fallback)
+    tasks_completed_undated = models.IntegerField(default=0)
+    # status 'completed' with completed_at, by completed_at day (velocity)
+    tasks_closed = models.IntegerField(default=0)
+    # progress_percentage = 100, by due day (forecast)
+    tasks_done_by_due = models.IntegerField(default=0)
+    # Not completed, by due day (overdue once that day is past; readers count days before today)
+    tasks_overdue = models.IntegerField(default=0)
+    messages = models.IntegerField(default=0)
+    # Distinct message senders and assignees of tasks closed that day
+    active_members = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "group_daily_rollup"
+        constraints = [
+            models.UniqueConstraint(fields=["group_id", "day"], name="group_daily_rollup_group_day"),
+        ]
+
+    def __str__(self):
+        return f"{self.group_id} {self.day}"
+
+
+class GroupRollupState(models.Model):
+    """Data version (data_loader.fetch_data_version) a group's rollup rows were last brought up to."""
+    group_id = models.CharField(max_length=64, primary_key=True)
+    data_version = models.CharField(max_length=32)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "group_rollup_state"
+
+    def __str__(self):
+        return f"{self.group_id} @ {self.data_version}"
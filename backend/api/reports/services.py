@@ -1,11 +1,11 @@
 from datetime import datetime, timedelta
 from collections import defaultdict
 
-from api.supabase_client import supabase
+from api.supabase_client import get_supabase
 
 def get_teachers():
     response = (
-        supabase
+        get_supabase()
         .table("users")
         .select("email, role")
         .eq("role", "teacher")
@@ -20,7 +20,7 @@ def get_weekly_data(group_id):
     start_of_week = today - timedelta(days=6)
 
     response = (
-        supabase
+        get_supabase()
         .table("tasks")
         .select("*")
         .eq("group_id", group_id) 
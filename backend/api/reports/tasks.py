@@ -1,12 +1,12 @@
 from celery import shared_task
-from api.supabase_client import supabase
+from api.supabase_client import get_supabase
 
 from .services import get_weekly_analytics
 from .email_service import send_report_email, generate_pdf_report
 
 def get_teachers():
     response = (
-        supabase
+        get_supabase()
         .table("users")
         .select("user_id, email, role")
         .eq("role", "teacher")
@@ -17,7 +17,7 @@ def get_teachers():
 
 def get_teacher_groups(teacher_id):
     response = (
-        supabase
+        get_supabase()
         .table("group_members")
         .select("groups(group_id, group_name)") # assumes FK relationship exists
         .eq("user_id", teacher_id)
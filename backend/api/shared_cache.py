@@ -0,0 +1,18 @@
+from django.conf import settings
+
+# Backends whose entries never leave the process that wrote them (or aren't stored at all)
+PROCESS_LOCAL_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def is_shared_cache(alias):
+    """
+    True if the CACHES alias is one every process sees (Redis, Memcached, database, files).
+    Anything written by one worker and read by another (Celery job records, snapshots,
+    cross-worker locks, invalidations) needs this; LocMem only looks shared in a single process.
+    """
+    if not alias or alias not in settings.CACHES:
+        return False
+    return settings.CACHES[alias]["BACKEND"] not in PROCESS_LOCAL_BACKENDS
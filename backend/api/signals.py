@@ -0,0 +1,31 @@
+import time
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .analytics.change_events import ChangeEvent, change_bus
+from .models import Document, TaskNote
+
+
+def _emit(entity, group_id, kwargs):
+    if group_id is None:
+        return
+    op = "delete" if "created" not in kwargs else "insert" if kwargs["created"] else "update"
+    event = ChangeEvent(entity, group_id, op, time.time())
+    # After commit, so consumers see the write; a rolled back write emits nothing
+    transaction.on_commit(lambda: change_bus.emit(event))
+
+
+# No receivers for Task / Message: they live in Django's own tables, which no analytics reads.
+# Changes to the Supabase tasks / chat_messages arrive through `listen_changes` (NOTIFY) instead.
+
+
+@receiver([post_save, post_delete], sender=Document)
+def document_changed(sender, instance, **kwargs):
+    _emit("document", instance.group_id, kwargs)
+
+
+@receiver([post_save, post_delete], sender=TaskNote)
+def note_changed(sender, instance, **kwargs):
+    _emit("note", instance.group_id, kwargs)
@@ -1,5 +1,8 @@
-from supabase import create_client
+from supabase import ClientOptions, create_client
 import os
+import threading
+
+from api.http_client import build_client
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
@@ -8,4 +11,27 @@ SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 if not SUPABASE_URL:
     raise Exception("Missing SUPABASE_URL environment variable")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY or SUPABASE_ANON_KEY or "")
\ No newline at end of file
+_supabase = None
+_supabase_pid = None
+_supabase_lock = threading.Lock()
+
+
+def get_supabase():
+    """
+    Returns this process's Supabase client, built on first use.
+    Rebuilt after a fork (like http_client.get_client) so each worker routes
+    PostgREST/Auth/Storage through its own pooled client, never the parent's.
+    supabase-py sets base_url/headers on the client it's given, so it gets its own
+    rather than the shared http_client.get_client() one.
+    """
+    global _supabase, _supabase_pid
+    if _supabase is None or _supabase_pid != os.getpid():
+        with _supabase_lock:
+            if _supabase is None or _supabase_pid != os.getpid():
+                _supabase = create_client(
+                    SUPABASE_URL,
+                    SUPABASE_SERVICE_KEY or SUPABASE_ANON_KEY or "",
+                    options=ClientOptions(httpx_client=build_client()),
+                )
+                _supabase_pid = os.getpid()
+    return _supabase
@@ -1,3 +1,1558 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import jwt
+import numpy as np
+import pandas as pd
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+import joblib
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DatabaseError
+from django.db.models.signals import post_delete, post_save
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIClient
+from sklearn.linear_model import LinearRegression, SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+from api.analytics.algorithms.history_generator import generate_chart_history
+from api.analytics.algorithms.member_bandwidth import calculate_detailed_bandwidth, get_team_bandwidth_summary, team_bandwidth
+from api.analytics.algorithms.completion_forecast import get_forecast_date
+from api.analytics.algorithms.task_velocity import calculate_velocity
+from api.analytics.algorithms.trend import cumulative_trend, cumulative_trend_counts, cumulative_trends
+from api.analytics.batch_analysis import analyze_groups
+from api.analytics.analytics_engine import ALGORITHMS, RESPONSE_FIELDS, AnalyticsEngine
+from api.analytics.change_events import ChangeEvent, ChangeEventBus
+from api.analytics.consumers import invalidate_group_caches, maintain_rollup, refresh_group_snapshot
+from api.analytics.compiled_model import CompiledRiskModel
+from api.analytics.data_loader import (
+    GROUPS_BATCH_MESSAGES_SQL, GROUPS_BATCH_TASKS_SQL, MESSAGE_SCHEMA, ROLLUP_SCHEMA, TASK_SCHEMA,
+    fetch_groups_batch, frame_from_columns, records_from_columns,
+)
+from api.analytics.group_arrays import GroupArrays
+from api.analytics.group_frame import GroupFrame, day_ordinals
+from api.analytics.id_codes import MISSING_ID, id_codes
+from api.analytics.metric_graph import Metric, MetricGraph, metric_pool
+from api.analytics.model_registry import MODEL_BINARY_SQL, ModelRegistry
+from api.analytics.pulse_counters import RING_HOURS, PulseCounters, recount_pulse_hours
+from api.analytics.rollup import ROLLUP_STATE_CURRENT_SQL, ROLLUP_STATE_LOCK_SQL, refresh_rollup_days
+from api.analytics.response_cache import AnalyticsResponseCache, analytics_cache
+from api.analytics.snapshots import AnalyticsSnapshotStore
+from api.analytics.tasks import enqueue_refresh, jobs_available, refresh_group_analytics
+from api.analytics.single_flight import CacheLockSingleFlight, SingleFlight
+from api.auth_cache import PrincipalCache
+from api.shared_cache import is_shared_cache
+from api.authentication import SupabaseJWKS, SupabaseJWTAuthentication, verify_token_locally
+from api import http_client, supabase_client
+from api.models import Document, Message, Task
+from api.views import GroupAnalyticsBatch
+from api.db_pool import PoolTimeout, SupabaseConnectionPool
+from api.management.commands.listen_changes import Command as ListenChangesCommand
+from api.user_sync import UserSyncBuffer
+
+
+User = get_user_model()
+
+# Tests run without Redis: the classes that exercise a cache alias get per-process memory instead
+LOCAL_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def supabase_response(status_code, body):
+    """An httpx response as supabase_request() would return it."""
+    return httpx.Response(status_code, json=body, request=httpx.Request("GET", "http://supabase.test"))
+
+
+JWT_SECRET = "test-project-jwt-secret-32-bytes!"
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET, SUPABASE_JWT_AUDIENCE="authenticated", SUPABASE_AUTH_MODE="local")
+class TokenVerificationTests(SimpleTestCase):
+    """Local HS256 / JWKS verification, claim checks and the Supabase Auth fallback."""
+
+    def claims(self, **overrides):
+        claims = {"sub": "user-1", "aud": "authenticated", "exp": int(time.time()) + 600, "email": "a@b.c"}
+        claims.update(overrides)
+        return {key: value for key, value in claims.items() if value is not None}
+
+    def jwks_with(self, private_key, algorithm, kid):
+        jwk = jwt.algorithms.get_default_algorithms()[algorithm].to_jwk(private_key.public_key(), as_dict=True)
+        body = {"keys": [dict(jwk, kid=kid, alg=algorithm, use="sig")]}
+        return mock.patch("api.authentication.supabase_request", return_value=supabase_response(200, body))
+
+    def test_hs256_uses_the_project_secret(self):
+        token = jwt.encode(self.claims(), JWT_SECRET, algorithm="HS256")
+        self.assertEqual(verify_token_locally(token)["sub"], "user-1")
+
+        forged = jwt.encode(self.claims(), "another-project-secret-32-bytes!", algorithm="HS256")
+        with self.assertRaises(jwt.InvalidSignatureError):
+            verify_token_locally(forged)
+
+    def test_asymmetric_tokens_use_the_jwks(self):
+        keys = {
+            "ES256": ec.generate_private_key(ec.SECP256R1()),
+            "RS256": rsa.generate_private_key(public_exponent=65537, key_size=2048),
+        }
+        for algorithm, private_key in keys.items():
+            token = jwt.encode(self.claims(), private_key, algorithm=algorithm, headers={"kid": "k1"})
+            jwks = SupabaseJWKS("/auth/v1/.well-known/jwks.json", refresh_seconds=3600)
+            with self.jwks_with(private_key, algorithm, "k1"), mock.patch("api.authentication._jwks", jwks):
+                self.assertEqual(verify_token_locally(token)["sub"], "user-1")
+
+    def test_audience_expiry_and_subject_are_enforced(self):
+        rejected = {
+            jwt.InvalidAudienceError: self.claims(aud="anon"),
+            jwt.ExpiredSignatureError: self.claims(exp=int(time.time()) - 10),
+            jwt.MissingRequiredClaimError: self.claims(sub=None),
+        }
+        for error, claims in rejected.items():
+            with self.assertRaises(error):
+                verify_token_locally(jwt.encode(claims, JWT_SECRET, algorithm="HS256"))
+
+    def test_remote_fallback_only_when_local_check_is_unavailable(self):
+        token = jwt.encode(self.claims(), JWT_SECRET, algorithm="HS256")
+        user = {"id": "user-1", "email": "a@b.c", "user_metadata": {"full_name": "A"}}
+        auth = SupabaseJWTAuthentication()
+
+        with override_settings(SUPABASE_JWT_SECRET=None), mock.patch(
+            "api.authentication.supabase_request", return_value=supabase_response(200, user),
+        ) as request:
+            claims = auth.verify(token)
+            self.assertEqual(request.call_args.args[:2], ("GET", "/auth/v1/user"))
+            self.assertEqual((claims["sub"], claims["exp"]), ("user-1", self.claims()["exp"]))
+
+            request.return_value = supabase_response(401, {})
+            self.assertIsNone(auth.verify(token))
+
+            with override_settings(SUPABASE_AUTH_REMOTE_FALLBACK=False), self.assertRaises(jwt.InvalidTokenError):
+                auth.verify(token)
+
+        # A token that fails a local check is rejected without asking Supabase
+        with mock.patch("api.authentication.supabase_request") as request, self.assertRaises(jwt.InvalidTokenError):
+            auth.verify(jwt.encode(self.claims(aud="anon"), JWT_SECRET, algorithm="HS256"))
+        request.assert_not_called()
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class PrincipalCacheTests(SimpleTestCase):
+    """Verified tokens are remembered until 'exp' or max_ttl, and a hit needs no user query."""
+
+    def user(self, pk=1):
+        return User(pk=pk, username=f"user-{pk}@b.c", email=f"user-{pk}@b.c", role="student", is_active=True)
+
+    def test_entries_expire_at_exp_or_max_ttl(self):
+        cache, user = PrincipalCache(maxsize=10, max_ttl=0.2), self.user()
+        cache.set("long-lived", user, {"exp": time.time() + 3600})  # capped by max_ttl
+        cache.set("short-lived", user, {"exp": time.time() + 0.2})  # capped by exp
+        cache.set("expired", user, {"exp": time.time() - 1})
+
+        self.assertEqual(cache.get("long-lived")["user_id"], user.pk)
+        self.assertIsNotNone(cache.get("short-lived"))
+        self.assertIsNone(cache.get("expired"))
+
+        time.sleep(0.25)
+        self.assertIsNone(cache.get("long-lived"))
+        self.assertIsNone(cache.get("short-lived"))
+        self.assertIsNone(cache.user(user.pk))
+
+    def test_hits_and_misses_are_counted(self):
+        cache = PrincipalCache(maxsize=10, max_ttl=300)
+        cache.set("token", self.user(), {"exp": time.time() + 60})
+
+        for token in ("token", "token", "unknown"):
+            cache.get(token)
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 1, "hit_ratio": 0.667, "size": 1})
+
+    def test_shared_entries_carry_the_id_not_the_user(self):
+        cache, user = PrincipalCache(maxsize=10, max_ttl=300, cache_alias="default"), self.user(pk=42)
+        cache.set("shared-token", user, {"exp": time.time() + 60})
+        cache.clear()
+
+        self.assertEqual(cache.get("shared-token")["user_id"], 42)
+        self.assertIsNone(cache.user(42))
+
+        cache.remember_user(user)
+        self.assertEqual(cache.user(42).email, user.email)
+
+    def test_every_hit_gets_its_own_user(self):
+        cache, user = PrincipalCache(maxsize=10, max_ttl=300), self.user()
+        cache.set("token", user, {"exp": time.time() + 60})
+
+        first, second = cache.user(user.pk), cache.user(user.pk)
+        self.assertIsNot(first, second)
+        self.assertEqual((first.pk, first.email, first.role, first._state.adding), (user.pk, user.email, "student", False))
+
+        # A view changing its request.user doesn't reach the next request
+        first.role = "admin"
+        self.assertEqual(cache.user(user.pk).role, "student")
+
+    def test_cache_hit_authenticates_without_a_lookup(self):
+        cache, user = PrincipalCache(maxsize=10, max_ttl=300), self.user()
+        cache.set("token", user, {"exp": time.time() + 60})
+        request = mock.Mock(META={"HTTP_AUTHORIZATION": "Bearer token"})
+
+        with mock.patch("api.authentication.principal_cache", cache), \
+                mock.patch("api.user_sync.principal_cache", cache), \
+                mock.patch("api.user_sync.User") as UserModel:
+            authenticated, _ = SupabaseJWTAuthentication().authenticate(request)
+        self.assertEqual((authenticated.pk, authenticated.email), (user.pk, user.email))
+        self.assertIsNot(authenticated, user)
+        UserModel.objects.filter.assert_not_called()
+
+
+class UserSyncBufferTests(SimpleTestCase):
+    """Unchanged claims cost no writes; changed users are written in batches, row by row on failure."""
+
+    def buffer(self, flush_interval=3600):
+        patcher = mock.patch("api.user_sync.principal_cache", PrincipalCache(maxsize=10, max_ttl=300))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return UserSyncBuffer(flush_interval=flush_interval, max_pending=100, fingerprint_size=2, fingerprint_ttl=3600)
+
+    def stored_user(self, pk, supabase_id, email="old@b.c"):
+        user = User(
+            pk=pk, supabase_id=supabase_id, username=email, first_name="Old", email=email, is_active=True, role="student",
+        )
+        user._state.adding = False
+        return user
+
+    def test_unchanged_fingerprint_skips_the_database(self):
+        sync, stored = self.buffer(), self.stored_user(1, "uid-1", email="a@b.c")
+        stored.first_name = "A"
+        with mock.patch("api.user_sync.User") as UserModel:
+            UserModel.objects.get_or_create.return_value = (stored, False)
+            first = sync.sync("uid-1", "a@b.c", "A", "student")
+            repeat = sync.sync("uid-1", "a@b.c", "A", "student")
+
+        # One lookup on first sighting; the repeat is served from the principal cache
+        self.assertEqual(UserModel.objects.get_or_create.call_count, 1)
+        UserModel.objects.filter.assert_not_called()
+        self.assertEqual((first.pk, repeat.pk, repeat.first_name), (1, 1, "A"))
+        self.assertIsNot(first, repeat)
+        self.assertEqual(sync.flush(), 0)
+
+    def test_repeat_after_the_principal_cache_dropped_the_user_reads_it_once(self):
+        sync, stored = self.buffer(), self.stored_user(1, "uid-1")
+        with mock.patch("api.user_sync.User") as UserModel:
+            UserModel.objects.get_or_create.return_value = (stored, False)
+            sync.sync("uid-1", "old@b.c", "Old", "student")
+
+            UserModel.objects.filter.return_value.first.return_value = stored
+            with mock.patch("api.user_sync.principal_cache.user", side_effect=[None, None]):
+                sync.sync("uid-1", "old@b.c", "Old", "student")
+            sync.sync("uid-1", "old@b.c", "Old", "student")
+
+        self.assertEqual(UserModel.objects.filter.call_args_list, [mock.call(pk=1, is_active=True)])
+
+    def test_first_sighting_goes_through_get_or_create(self):
+        sync, row = self.buffer(), self.stored_user(1, "uid-1", email="a@b.c")
+        row.first_name = "A"
+        with mock.patch("api.user_sync.User") as UserModel:
+            # A concurrent request inserted the row first: get_or_create re-reads it rather than raising
+            UserModel.objects.get_or_create.return_value = (row, False)
+            user = sync.sync("uid-1", "a@b.c", "A", "student")
+
+        UserModel.objects.create.assert_not_called()
+        self.assertEqual(UserModel.objects.get_or_create.call_args.kwargs["supabase_id"], "uid-1")
+        self.assertEqual((user.pk, user.email), (1, "a@b.c"))
+        self.assertEqual(sync.flush(), 0)
+
+    def test_fingerprints_are_bounded(self):
+        sync = self.buffer()
+        with mock.patch("api.user_sync.User") as UserModel:
+            for pk in range(1, 4):
+                UserModel.objects.get_or_create.return_value = (self.stored_user(pk, f"uid-{pk}"), False)
+                sync.sync(f"uid-{pk}", "old@b.c", "Old", "student")
+        self.assertEqual(sorted(sync._fingerprints), ["uid-2", "uid-3"])
+
+    def test_failed_bulk_update_retries_row_by_row(self):
+        sync, users = self.buffer(), [self.stored_user(1, "uid-1"), self.stored_user(2, "uid-2")]
+        with mock.patch("api.user_sync.User") as UserModel, mock.patch.object(User, "save", autospec=True) as save:
+            def save_row(user, **kwargs):
+                if user.pk == 2:
+                    raise DatabaseError("duplicate username")
+
+            save.side_effect = save_row
+            for user in users:
+                UserModel.objects.get_or_create.return_value = (user, False)
+                returned = sync.sync(user.supabase_id, f"new-{user.pk}@b.c", "New", "student")
+                # The caller's copy is not the instance queued for the batch
+                self.assertIsNot(returned, user)
+
+            UserModel.objects.bulk_update.side_effect = DatabaseError("duplicate username")
+            self.assertEqual(sync.flush(), 2)
+
+        self.assertEqual(save.call_args_list, [mock.call(user, update_fields=UserSyncBuffer.SYNCED_FIELDS) for user in users])
+        # The row that failed is re-checked on its next sync; the other one stays known
+        self.assertEqual(list(sync._fingerprints), ["uid-1"])
+
+    def test_timer_flushes_an_idle_buffer(self):
+        sync = self.buffer(flush_interval=0.05)
+        with mock.patch("api.user_sync.User") as UserModel:
+            UserModel.objects.get_or_create.return_value = (self.stored_user(1, "uid-1"), False)
+            sync.sync("uid-1", "new@b.c", "New", "student")
+            time.sleep(0.3)
+            UserModel.objects.bulk_update.assert_called_once()
+
+
+class SupabaseClientTests(SimpleTestCase):
+    """HTTP and Supabase clients are built lazily, once per process, and rebuilt after a fork."""
+
+    def setUp(self):
+        for module, names in ((http_client, ("_client", "_client_pid")), (supabase_client, ("_supabase", "_supabase_pid"))):
+            for name in names:
+                patcher = mock.patch.object(module, name, None)
+                patcher.start()
+                self.addCleanup(patcher.stop)
+
+    def test_http_client_is_rebuilt_after_fork(self):
+        client = http_client.get_client()
+        self.assertIs(http_client.get_client(), client)
+
+        with mock.patch("api.http_client.os.getpid", return_value=-1):
+            forked = http_client.get_client()
+        self.assertIsNot(forked, client)
+
+    def test_supabase_client_gets_its_own_http_client_per_process(self):
+        with mock.patch("api.supabase_client.create_client") as create_client:
+            create_client.side_effect = lambda url, key, options: mock.Mock(httpx_client=options.httpx_client)
+            client = supabase_client.get_supabase()
+            self.assertIs(supabase_client.get_supabase(), client)
+            # supabase-py mutates the client it's handed, so never the shared one
+            self.assertIsInstance(client.httpx_client, httpx.Client)
+            self.assertIsNot(client.httpx_client, http_client.get_client())
+
+            with mock.patch("os.getpid", return_value=-1):
+                forked = supabase_client.get_supabase()
+
+        self.assertEqual(create_client.call_count, 2)
+        self.assertIsNot(forked.httpx_client, client.httpx_client)
+
+    def test_diagnostics_report_http_latency_and_principal_cache(self):
+        request = httpx.Request("GET", "https://example.supabase.co/auth/v1/user")
+        http_client._start_timer(request)
+        with mock.patch.dict(http_client._latency, clear=True):
+            http_client._record_latency(httpx.Response(503, request=request))
+
+            connection = mock.MagicMock()
+            cursor = connection.__enter__.return_value.cursor.return_value.__enter__.return_value
+            cursor.description, cursor.fetchall.return_value = [("id",)], [(1,)]
+            with mock.patch("api.views.db_pool.connection", return_value=connection):
+                response = APIClient().get("/api/test-supabase/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["http"]["GET /auth/v1/user"]["count"], 1)
+        self.assertEqual(response.data["http"]["GET /auth/v1/user"]["errors"], 1)
+        self.assertEqual(set(response.data["principal_cache"]), {"hits", "misses", "hit_ratio", "size"})
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Connections are reused, bounded by max_size, retired by age and never shared across a fork."""
+
+    def setUp(self):
+        env = {name: "x" for name in ("DB_NAME", "DB_USER", "DB_PWD", "DB_HOST", "DB_PORT")}
+        for patcher in (
+            mock.patch.dict(os.environ, env),
+            mock.patch("api.db_pool.psycopg2.connect", side_effect=lambda **params: mock.Mock(closed=False)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def pool(self, max_size=2, max_lifetime=1800, checkout_timeout=1):
+        return SupabaseConnectionPool(
+            min_size=0, max_size=max_size, max_lifetime=max_lifetime, health_check_after=60, checkout_timeout=checkout_timeout,
+        )
+
+    def test_connections_are_reused(self):
+        pool = self.pool()
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual((pool.stats()["connections_opened"], pool.stats()["checkouts"], pool.stats()["idle"]), (1, 2, 1))
+
+    def test_checkout_waits_for_a_free_slot_then_times_out(self):
+        pool = self.pool(max_size=1, checkout_timeout=2)
+
+        def hold(seconds):
+            with pool.connection():
+                time.sleep(seconds)
+
+        holder = threading.Thread(target=hold, args=(0.1,))
+        holder.start()
+        time.sleep(0.02)
+        with pool.connection():  # blocks until the holder gives its connection back
+            self.assertFalse(holder.is_alive())
+        holder.join()
+        self.assertEqual(pool.stats()["connections_opened"], 1)
+
+        pool.checkout_timeout = 0.05
+        with pool.connection(), self.assertRaises(PoolTimeout):
+            with pool.connection():
+                pass
+        self.assertEqual(pool.stats()["timeouts"], 1)
+
+    def test_old_connections_are_recycled(self):
+        pool = self.pool(max_lifetime=0.05)
+        with pool.connection() as first:
+            pass
+        time.sleep(0.1)
+        with pool.connection() as second:
+            pass
+
+        self.assertIsNot(first, second)
+        first.close.assert_called_once()
+        self.assertEqual(pool.stats()["connections_retired"], 1)
+
+    def test_forked_worker_starts_an_empty_pool(self):
+        pool = self.pool(max_size=1)
+        with pool.connection() as parent:
+            pass
+
+        with mock.patch("api.db_pool.os.getpid", return_value=-1):
+            with pool.connection() as child:
+                pass
+
+        # The parent's socket is dropped, not closed (it still belongs to the parent)
+        self.assertIsNot(child, parent)
+        parent.close.assert_not_called()
+        self.assertEqual(pool.stats()["connections_opened"], 1)
+
+
+class CompiledRiskModelParityTests(SimpleTestCase):
+    """The NumPy risk scorer must agree with sklearn bit for bit."""
+
+    def _train(self, n_classes, seed=7):
+        rng = np.random.default_rng(seed)
+        # Same feature layout as ml/train_model.py: inactivity_days, total_tasks, overdue_count
+        X = np.column_stack([
+            rng.integers(0, 30, 2000),
+            rng.integers(1, 200, 2000),
+            rng.integers(0, 50, 2000),
+        ]).astype(float)
+        y = rng.integers(0, n_classes, 2000)
+        scaler = StandardScaler().fit(X)
+        model = SGDClassifier(loss='log_loss', random_state=seed).fit(scaler.transform(X), y)
+        return {'model': model, 'scaler': scaler}, X
+
+    def test_multiclass_matches_sklearn(self):
+        payload, X = self._train(n_classes=3)
+        compiled = CompiledRiskModel.from_payload(payload)
+
+        expected_scores = payload['model'].decision_function(payload['scaler'].transform(X))
+        expected_labels = payload['model'].predict(payload['scaler'].transform(X))
+
+        np.testing.assert_array_equal(compiled.decision_function(X), expected_scores)
+        np.testing.assert_array_equal(compiled.predict_batch(X), expected_labels)
+        for row, label in zip(X[:50], expected_labels[:50]):
+            self.assertEqual(compiled.predict_one(row), label)
+
+    def test_binary_matches_sklearn(self):
+        payload, X = self._train(n_classes=2)
+        compiled = CompiledRiskModel.from_payload(payload)
+
+        expected_labels = payload['model'].predict(payload['scaler'].transform(X))
+        np.testing.assert_array_equal(compiled.predict_batch(X), expected_labels)
+
+    def test_unsupported_payload_is_not_compiled(self):
+        self.assertIsNone(CompiledRiskModel.from_payload(None))
+        self.assertIsNone(CompiledRiskModel.from_payload({'model': object(), 'scaler': object()}))
+
+
+class GroupFrameTests(SimpleTestCase):
+    """Normalize-once stage: typed columns, derived flags, read-only sharing."""
+
+    def _build(self):
+        now = pd.Timestamp("2026-03-10 12:00", tz="UTC")
+        tasks = pd.DataFrame({
+            "id": [1, 2, 3],
+            "group_id": ["g", "g", "g"],
+            "assigned_to": ["u1", "u2", None],
+            "progress_percentage": [100, 40, 0],
+            "due_date": ["2026-03-01T00:00:00+00:00", "2026-03-01T00:00:00+00:00", None],
+            "status": pd.Categorical(["Completed", "todo", "TODO"]),
+            "completed_at": ["2026-03-02T08:00:00+08:00", None, None],
+            "created_at": ["2026-02-20T00:00:00Z"] * 3,
+        })
+        messages = pd.DataFrame({"id": [1], "group_id": ["g"], "text": ["hi"],
+                                 "created_at": ["2026-03-10T01:00:00Z"], "user_id": ["u1"]})
+        return GroupFrame.build(tasks, messages, now=now)
+
+    def test_columns_are_normalized(self):
+        tasks = self._build().tasks
+
+        self.assertEqual(list(tasks["status"].cat.categories), ["completed", "todo"])
+        self.assertEqual(str(tasks["completed_at"].dt.tz), "UTC")
+        self.assertEqual(tasks["completed_at"].iloc[0], pd.Timestamp("2026-03-02 00:00", tz="UTC"))
+        self.assertEqual(id_codes.decode(tasks["user_id"]), ["u1", "u2", None])
+        self.assertEqual(tasks["is_completed"].tolist(), [True, False, False])
+        self.assertEqual(tasks["is_overdue"].tolist(), [False, True, False])
+
+    def test_ids_are_int32_codes_from_one_table(self):
+        frame = self._build()
+        tasks, messages = frame.tasks, frame.messages
+
+        self.assertEqual(list(messages.columns), ["group_id", "user_id", "created_at"])
+        for column in (tasks["group_id"], tasks["user_id"], messages["group_id"], messages["user_id"]):
+            self.assertEqual(column.dtype, np.int32)
+        self.assertEqual(tasks["user_id"].iloc[2], MISSING_ID)
+        # Shared table: the same id gets the same code in every frame
+        self.assertEqual(messages["user_id"].iloc[0], tasks["user_id"].iloc[0])
+        self.assertEqual(self._build().tasks["group_id"].tolist(), tasks["group_id"].tolist())
+        self.assertIsNone(id_codes.code("never-seen"))
+
+    def test_consumers_cannot_mutate_the_shared_frame(self):
+        frame = self._build()
+        tasks = frame.tasks
+        tasks["status"] = "changed"
+
+        self.assertEqual(frame.tasks["status"].iloc[0], "completed")
+        with self.assertRaises(AttributeError):
+            frame.now = None
+
+
+class ColumnLoaderTests(SimpleTestCase):
+    """Loader columns / rows -> typed frames / structured arrays: dtypes, epoch timestamps, NULLs and empty groups."""
+
+    # 2026-03-10 12:00:00.123456 UTC and 2026-03-11 00:00 UTC as epoch microseconds
+    EPOCHS = [1773144000123456, None, 1773187200000000]
+
+    def task_columns(self):
+        return {
+            "group_id": ["g", "g", "g"],
+            "assigned_to": ["u1", None, "u1"],
+            "progress_percentage": [100, None, 40],
+            "due_date": self.EPOCHS,
+            "status": ["Completed", "todo", "todo"],
+            "completed_at": self.EPOCHS,
+            "created_at": self.EPOCHS,
+        }
+
+    def test_frame_dtypes(self):
+        tasks = frame_from_columns(self.task_columns(), TASK_SCHEMA, epoch_timestamps=True)
+
+        self.assertEqual(list(tasks.columns), list(TASK_SCHEMA))
+        self.assertEqual(str(tasks["due_date"].dtype), "datetime64[ns, UTC]")
+        self.assertEqual(tasks["group_id"].dtype, np.int32)
+        self.assertEqual(tasks["progress_percentage"].dtype, np.int8)
+        self.assertEqual(tasks["status"].dtype, "category")
+        self.assertEqual(tasks["progress_percentage"].tolist(), [100, 0, 40])
+        self.assertEqual(tasks["assigned_to"].iloc[1], MISSING_ID)
+
+    def test_epoch_microseconds_decode_exactly(self):
+        expected = [pd.Timestamp("2026-03-10 12:00:00.123456", tz="UTC"), pd.NaT, pd.Timestamp("2026-03-11", tz="UTC")]
+        tasks = frame_from_columns(self.task_columns(), TASK_SCHEMA, epoch_timestamps=True)
+        records = records_from_columns(self.task_columns(), TASK_SCHEMA)
+
+        self.assertEqual(tasks["due_date"].tolist()[::2], expected[::2])
+        self.assertTrue(pd.isna(tasks["due_date"].iloc[1]))
+        # Structured arrays hold the same instants as naive UTC datetime64[us]
+        self.assertEqual(records.dtype["due_date"], np.dtype("M8[us]"))
+        np.testing.assert_array_equal(
+            records["due_date"], np.array(["2026-03-10T12:00:00.123456", "NaT", "2026-03-11"], dtype="M8[us]"),
+        )
+        self.assertEqual(records["assigned_to"].tolist(), tasks["assigned_to"].tolist())
+
+    def test_iso_timestamps_without_epoch_decoding(self):
+        frame = frame_from_columns({"group_id": ["g"], "created_at": ["2026-03-10T12:00:00+02:00"], "user_id": [None]}, MESSAGE_SCHEMA)
+        self.assertEqual(frame["created_at"].iloc[0], pd.Timestamp("2026-03-10 10:00", tz="UTC"))
+
+    def test_empty_groups_keep_their_dtypes(self):
+        # json_build_object over no rows gives {column: null}; a skipped part gives None
+        empty_columns = {name: None for name in TASK_SCHEMA}
+        for columns in (None, empty_columns):
+            tasks = frame_from_columns(columns, TASK_SCHEMA, epoch_timestamps=True)
+            records = records_from_columns(columns, TASK_SCHEMA)
+
+            self.assertEqual((len(tasks), len(records)), (0, 0))
+            self.assertEqual(str(tasks["created_at"].dtype), "datetime64[ns, UTC]")
+            self.assertEqual(tasks["group_id"].dtype, np.int32)
+            self.assertEqual(records.dtype.names, tuple(TASK_SCHEMA))
+
+        self.assertEqual(len(GroupFrame.build(frame_from_columns(None, TASK_SCHEMA), frame_from_columns(None, MESSAGE_SCHEMA)).tasks), 0)
+
+    def test_batch_rows_are_read_in_batches_into_typed_frames(self):
+        task_rows = list(zip(*self.task_columns().values()))
+        batches = {GROUPS_BATCH_TASKS_SQL: [task_rows[:2], task_rows[2:], []], GROUPS_BATCH_MESSAGES_SQL: [[]]}
+
+        cursor = mock.MagicMock()
+        cursor.execute.side_effect = lambda query, params: setattr(cursor, "pending", list(batches[query]))
+        cursor.fetchmany.side_effect = lambda size: cursor.pending.pop(0)
+        connection = mock.MagicMock()
+        connection.__enter__.return_value.cursor.return_value.__enter__.return_value = cursor
+
+        with mock.patch("api.analytics.data_loader.db_pool.connection", return_value=connection), \
+                mock.patch("api.analytics.data_loader.FETCH_BATCH_SIZE", 2):
+            data = fetch_groups_batch(["g", 5])
+
+        self.assertEqual(cursor.execute.call_args.args[1], {"group_ids": ("g", "5")})
+        self.assertEqual(cursor.fetchmany.call_args.args, (2,))
+        pd.testing.assert_frame_equal(data["tasks"], frame_from_columns(self.task_columns(), TASK_SCHEMA, epoch_timestamps=True))
+        self.assertEqual(len(data["messages"]), 0)
+        self.assertEqual(str(data["messages"]["created_at"].dtype), "datetime64[ns, UTC]")
+
+
+class FakeModelTable:
+    """Stands in for db_pool + "Risk_Matrix_TrainSet": answers the registry's two queries, counts blob downloads."""
+
+    def __init__(self, payload):
+        self.downloads = 0
+        self.upload(payload)
+
+    def upload(self, payload):
+        buffer = io.BytesIO()
+        joblib.dump(payload, buffer)
+        self.blob = buffer.getvalue()
+        self.version = hashlib.md5(self.blob).hexdigest()
+
+    @contextmanager
+    def connection(self):
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value = cursor
+        cursor.execute.side_effect = lambda sql, params: setattr(cursor, "sql", sql)
+        cursor.fetchone.side_effect = lambda: self.fetchone(cursor.sql)
+        yield mock.Mock(cursor=mock.Mock(return_value=cursor))
+
+    def fetchone(self, sql):
+        if sql is MODEL_BINARY_SQL:
+            self.downloads += 1
+            return self.version, memoryview(self.blob)
+        return (self.version,)
+
+
+class ModelRegistryTests(SimpleTestCase):
+    """The blob is downloaded only for a new version, and reused from disk across processes."""
+
+    def registry(self, table, cache_dir=None):
+        patcher = mock.patch("api.analytics.model_registry.db_pool", table)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return ModelRegistry("risk_test_model", poll_interval=0, cache_dir=cache_dir)
+
+    def test_reloads_only_when_the_version_changes(self):
+        table = FakeModelTable({"model": "v1"})
+        registry = self.registry(table)
+
+        first = registry.get()
+        self.assertEqual((first["model"], registry.get()["model"]), ("v1", "v1"))
+        self.assertIs(registry.get(), first)
+        self.assertEqual((table.downloads, registry.version()), (1, table.version))
+
+        table.upload({"model": "v2"})
+        self.assertEqual(registry.get()["model"], "v2")
+        self.assertEqual((table.downloads, registry.version()), (2, table.version))
+
+    def test_artifact_on_disk_is_reused_for_the_same_hash(self):
+        table = FakeModelTable({"model": "v1"})
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.assertEqual(self.registry(table, cache_dir).get()["model"], "v1")
+            self.assertEqual(os.listdir(cache_dir), [f"risk_test_model-{table.version}.joblib"])
+
+            # A fresh process (or sibling worker) with the same hash loads the file, not the BYTEA
+            self.assertEqual(self.registry(table, cache_dir).get()["model"], "v1")
+            self.assertEqual(table.downloads, 1)
+
+            table.upload({"model": "v2"})
+            self.assertEqual(self.registry(table, cache_dir).get()["model"], "v2")
+            self.assertEqual(table.downloads, 2)
+            self.assertEqual(os.listdir(cache_dir), [f"risk_test_model-{table.version}.joblib"])
+
+
+class TeamBandwidthTests(SimpleTestCase):
+    """team_bandwidth's single groupby must agree with the per-member scan it replaces."""
+
+    def test_matches_per_member_calculation(self):
+        rng = np.random.default_rng(3)
+        now = pd.Timestamp("2026-03-10", tz="UTC")
+        n = 300
+        tasks = pd.DataFrame({
+            "id": range(n),
+            "group_id": "g",
+            "assigned_to": rng.choice(["u1", "u2", "u3", "u4", None], n),
+            "progress_percentage": rng.choice([0, 50, 100], n),
+            "due_date": now + pd.to_timedelta(rng.integers(-10, 10, n), unit="D"),
+            "status": rng.choice(["completed", "todo"], n),
+            "completed_at": pd.NaT,
+            "created_at": now,
+        })
+        frame_tasks = GroupFrame.build(tasks, tasks.iloc[:0].assign(text=None, user_id=None), now=now).tasks
+        users = ["u1", "u2", "u3", "u4", "nobody"]
+
+        summary = get_team_bandwidth_summary(frame_tasks, users)
+        for user in users:
+            self.assertEqual(summary[user], calculate_detailed_bandwidth(frame_tasks, user))
+
+        open_tasks = team_bandwidth(frame_tasks)["open_tasks"]
+        for user in users[:4]:
+            assigned = frame_tasks["assigned_to"] == id_codes.code(user)
+            expected = len(frame_tasks[assigned & (frame_tasks["progress_percentage"] < 100)])
+            self.assertEqual(open_tasks[user], expected)
+
+
+class TrendParityTests(SimpleTestCase):
+    """Closed-form trends must reproduce the sklearn LinearRegression fits they replaced."""
+
+    def _sklearn_trend(self, ordinals):
+        start = ordinals.min()
+        model = LinearRegression().fit((ordinals - start).reshape(-1, 1), np.arange(1, len(ordinals) + 1))
+        return model.coef_[0], model.intercept_
+
+    def test_single_fit_matches_sklearn(self):
+        rng = np.random.default_rng(5)
+        for size in (2, 3, 17, 500):
+            ordinals = np.sort(rng.integers(739000, 739400, size))
+            slope, intercept, start = cumulative_trend(ordinals)
+            expected_slope, expected_intercept = self._sklearn_trend(ordinals)
+
+            self.assertEqual(start, ordinals.min())
+            np.testing.assert_allclose([slope, intercept], [expected_slope, expected_intercept], rtol=1e-12, atol=1e-12)
+
+        # Everything on one day: no slope
+        self.assertEqual(cumulative_trend(np.array([739000, 739000]))[:2], (0.0, 1.5))
+
+    def test_row_and_count_fits_are_identical(self):
+        ordinals = np.sort(np.random.default_rng(7).integers(739000, 739060, 300))
+        days, counts = np.unique(ordinals, return_counts=True)
+
+        # Exact integer sums: per-day counts (in any day order) give the very same floats
+        self.assertEqual(cumulative_trend_counts(days[::-1], counts[::-1]), cumulative_trend(ordinals))
+
+    def test_segment_fits_match_single_fits(self):
+        rng = np.random.default_rng(6)
+        codes = rng.integers(0, 4, 400)
+        ordinals = rng.integers(739000, 739100, 400)
+
+        slopes, intercepts, starts, counts = cumulative_trends(codes, ordinals, n_segments=5)
+        for segment in range(4):
+            expected = cumulative_trend(ordinals[codes == segment])
+            self.assertEqual((slopes[segment], intercepts[segment]), expected[:2])
+            self.assertEqual(starts[segment], expected[2])
+        self.assertEqual(counts[4], 0)
+
+
+class BatchAnalysisParityTests(SimpleTestCase):
+    """analyze_groups() must report exactly what the per-group engine reports for each group."""
+
+    def make_groups(self, seed):
+        rng = np.random.default_rng(seed)
+        now = pd.Timestamp("2026-03-10 15:00", tz="UTC")
+        n, group_ids = 3000, [f"g{i}" for i in range(30)]
+        hours = lambda low, high: pd.to_timedelta(rng.integers(low, high, n), unit="h")
+        tasks = pd.DataFrame({
+            "id": range(n),
+            # Uneven group sizes (~7 to ~200 tasks); the last two groups have no tasks
+            "group_id": rng.choice(group_ids[:28], n, p=np.arange(1, 29) / np.arange(1, 29).sum()),
+            "assigned_to": rng.choice([f"u{i}" for i in range(9)] + [None], n),
+            "progress_percentage": rng.choice([0, 50, 100], n),
+            "due_date": now + hours(-240, 240),
+            "status": rng.choice(["Completed", "todo"], n),
+            "completed_at": (now - hours(0, 2000)).where(rng.random(n) > 0.2),
+            "created_at": now - hours(2000, 4000),
+        })
+        messages = pd.DataFrame({
+            "id": range(1500), "group_id": rng.choice(group_ids, 1500), "text": "x",
+            "created_at": now - pd.to_timedelta(rng.integers(0, 200, 1500), unit="h"),
+            "user_id": rng.choice(["u1", "u2"], 1500),
+        })
+        return tasks, messages, group_ids, now
+
+    def risk_model(self):
+        # Risk grows with task volume, so the groups above land in all three classes
+        rng = np.random.default_rng(3)
+        X = np.column_stack([rng.integers(0, 10, 3000), rng.integers(1, 250, 3000), rng.integers(0, 100, 3000)]).astype(float)
+        y = np.digitize(X[:, 1], [60, 130])
+        scaler = StandardScaler().fit(X)
+        payload = {"model": SGDClassifier(loss="log_loss", random_state=3).fit(scaler.transform(X), y), "scaler": scaler}
+        return dict(payload, compiled=CompiledRiskModel.from_payload(payload))
+
+    def test_batch_matches_engine(self):
+        payload = self.risk_model()
+        fields = ["group_id", "metrics", "alerts"]
+
+        for seed in (1, 2):
+            tasks, messages, group_ids, now = self.make_groups(seed)
+            batch = analyze_groups(GroupFrame.build(tasks, messages, now=now), group_ids, payload)
+
+            with mock.patch("api.analytics.analytics_engine.model_registry.get", return_value=payload):
+                for group_id in group_ids:
+                    # Rows come back from their own query in another order: results can't depend on it
+                    group_tasks = tasks[tasks["group_id"] == group_id].sample(frac=1, random_state=seed)
+                    frame = GroupFrame.build(group_tasks, messages[messages["group_id"] == group_id], now=now)
+                    engine = AnalyticsEngine(frame, deadline_str="2026-06-01")
+                    response, result = engine.run_group_analysis(AnalyticsEngine.select_fields(fields))["response"], batch[group_id]
+
+                    if "error" in response:
+                        self.assertEqual(result, {"group_id": group_id, "error": response["error"]})
+                        continue
+                    self.assertEqual(result["group_id"], response["group_id"])
+                    self.assertEqual(result["alerts"], response["alerts"])
+
+                    # Batch-only counts are the engine's intermediate nodes
+                    expected = dict(response["metrics"], total_tasks=len(group_tasks), **{
+                        name: engine.results[name] for name in ("overdue_count", "inactivity_days")
+                    })
+                    for name, value in result["metrics"].items():
+                        self.assertEqual((name, value), (name, expected[name]))
+
+
+class HistoryGeneratorTests(SimpleTestCase):
+    """Bucketed history: week buckets must aggregate the same events as day buckets."""
+
+    def test_week_bucket_matches_days(self):
+        rng = np.random.default_rng(8)
+        now = pd.Timestamp("2026-03-10 15:00", tz="UTC")
+        n = 200
+        tasks = pd.DataFrame({
+            "id": range(n),
+            "group_id": "g",
+            "assigned_to": "u1",
+            "progress_percentage": rng.choice([50, 100], n),
+            "due_date": now,
+            "status": "todo",
+            "completed_at": now - pd.to_timedelta(rng.integers(0, 30 * 24, n), unit="h"),
+            "created_at": now - pd.to_timedelta(rng.integers(0, 30 * 24, n), unit="h"),
+        })
+        frame_tasks = GroupFrame.build(tasks, tasks.iloc[:0].assign(text=None, user_id=None), now=now).tasks
+
+        days = generate_chart_history(frame_tasks, now, window_days=7, bucket="day")
+        week = generate_chart_history(frame_tasks, now, window_days=7, bucket="week")
+
+        self.assertEqual(days["dates"][-1], "Mar 10")
+        self.assertEqual(week["dates"], ["Mar 10"])
+        self.assertEqual(week["daily_completed"], [sum(days["daily_completed"])])
+        self.assertEqual(week["completed_counts"], days["completed_counts"][-1:])
+        self.assertEqual(week["total_counts"], days["total_counts"][-1:])
+
+        month = generate_chart_history(frame_tasks, now, window_days=30, bucket="day")
+        self.assertEqual(len(month["dates"]), 30)
+        self.assertEqual(month["completed_counts"][-1], int((frame_tasks["progress_percentage"] == 100).sum()))
+
+
+class MetricGraphTests(SimpleTestCase):
+    """Each node runs once, after its dependencies, and gets timed."""
+
+    def test_nodes_run_once_in_dependency_order(self):
+        calls = []
+
+        def node(name, value):
+            def run(**deps):
+                calls.append(name)
+                return value + sum(deps.values())
+            return run
+
+        graph = MetricGraph([
+            Metric("velocity", (), node("velocity", 1)),
+            Metric("forecast", ("velocity",), node("forecast", 10)),
+            Metric("buffer", ("forecast",), node("buffer", 100)),
+            Metric("pulse", (), node("pulse", 5)),
+        ], pool=ThreadPoolExecutor(max_workers=3))
+
+        results, timings = graph.run(["buffer"])
+        self.assertEqual(results, {"velocity": 1, "forecast": 11, "buffer": 111})
+        self.assertEqual(calls, ["velocity", "forecast", "buffer"])
+        self.assertEqual(set(timings), {"velocity", "forecast", "buffer"})
+
+        # Asking again (plus a new node) reuses what is already computed
+        graph.run(None, results, timings)
+        self.assertEqual(sorted(calls), ["buffer", "forecast", "pulse", "velocity"])
+
+    def test_unknown_dependency_is_rejected(self):
+        with self.assertRaises(ValueError):
+            MetricGraph([Metric("forecast", ("velocity",), lambda velocity: velocity)])
+
+    def test_requests_share_one_pool(self):
+        pool = metric_pool()
+        with mock.patch("api.analytics.metric_graph.ThreadPoolExecutor") as executor:
+            for _ in range(3):
+                results, _ = MetricGraph([Metric("thread", (), lambda: threading.current_thread().name)]).run()
+                self.assertTrue(results["thread"].startswith("metric"))
+        executor.assert_not_called()
+        self.assertIs(metric_pool(), pool)
+
+        # A forked worker starts its own threads
+        with mock.patch("api.analytics.metric_graph.os.getpid", return_value=-1):
+            forked = metric_pool()
+        self.assertIsNot(forked, pool)
+        forked.shutdown()
+
+
+class FieldSelectionTests(SimpleTestCase):
+    """?fields= maps to the smallest set of metric nodes and snapshot parts."""
+
+    def test_prefixes_and_leaves(self):
+        fields = AnalyticsEngine.select_fields("metrics.pulse, history")
+        self.assertEqual(fields, ["metrics.pulse", "history"])
+        self.assertEqual(AnalyticsEngine.required_nodes(fields), {"pulse", "history"})
+        self.assertEqual(AnalyticsEngine.required_data(fields), {"tasks", "messages", "rollup"})
+
+        self.assertEqual(AnalyticsEngine.select_fields(None), list(RESPONSE_FIELDS))
+        self.assertIn("metrics.risk_impact", AnalyticsEngine.select_fields("metrics"))
+
+    def test_messages_skipped_when_not_needed(self):
+        fields = AnalyticsEngine.select_fields("metrics.buffer_days,member_report")
+        self.assertEqual(AnalyticsEngine.required_nodes(fields), {"buffer", "forecast", "velocity", "member_report", "team_bandwidth"})
+        self.assertEqual(AnalyticsEngine.required_data(fields), {"tasks", "members", "rollup"})
+
+        # Risk needs inactivity, which reads messages
+        self.assertIn("messages", AnalyticsEngine.required_data(["metrics.ai_risk_level"]))
+
+    def test_unknown_field_is_rejected(self):
+        with self.assertRaises(ValueError):
+            AnalyticsEngine.select_fields("metrics.nope")
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class AnalyticsResponseCacheTests(SimpleTestCase):
+    """Group-level analysis is shared; user_status and the ETag are per user."""
+
+    def test_user_status_is_added_per_user(self):
+        shared = {
+            "paths": ["metrics.pulse", "user_status.user_id", "user_status.bandwidth_available", "history"],
+            "response": {"metrics": {"pulse": 40.0}, "history": {}, "debug": {}},
+            "user_inputs": {"bandwidth": {"u1": 20.0}},
+        }
+
+        first = AnalyticsEngine.with_user_status(shared, "u1")
+        second = AnalyticsEngine.with_user_status(shared, "u2")
+
+        self.assertEqual(list(first), ["metrics", "user_status", "history", "debug"])
+        self.assertEqual(first["user_status"], {"user_id": "u1", "bandwidth_available": "20.0%"})
+        self.assertEqual(second["user_status"], {"user_id": "u2", "bandwidth_available": "100.0%"})
+        self.assertNotIn("user_status", shared["response"])
+
+    def test_key_tracks_data_and_model_versions(self):
+        cache = AnalyticsResponseCache(cache_alias="default", seconds=300)
+        key = cache.key("g", "data-1", "model-1", fields=["history"])
+
+        self.assertEqual(key, cache.key("g", "data-1", "model-1", fields=["history"]))
+        self.assertNotEqual(key, cache.key("g", "data-2", "model-1", fields=["history"]))
+        self.assertNotEqual(key, cache.key("g", "data-1", "model-2", fields=["history"]))
+        self.assertNotEqual(cache.etag(key, 1), cache.etag(key, 2))
+
+        cache.set(key, {"response": {}})
+        self.assertEqual(cache.get(key), {"response": {}})
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class DashboardConditionalGetTests(SimpleTestCase):
+    """The dashboard ETag follows the data and model versions; a matching If-None-Match gets a 304."""
+
+    def setUp(self):
+        caches["default"].clear()
+        self.client = APIClient()
+        self.versions = {"data": "data-1", "model": "model-1"}
+
+    def current_versions(self, group_id, fields, window_days, bucket):
+        data_version, model_version = self.versions["data"], self.versions["model"]
+        key = analytics_cache.key(group_id, data_version, model_version, fields=fields, window=window_days, bucket=bucket)
+        return data_version, model_version, key
+
+    def get(self, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get("/api/analytics/7/", **headers)
+
+    def test_etag_tracks_versions(self):
+        group_analysis = {
+            "paths": ["metrics.pulse"], "response": {"metrics": {"pulse": 40.0}}, "user_inputs": {},
+            "computed_at": 1_800_000_000.0, "data_version": "data-1", "model_version": "model-1",
+        }
+        with mock.patch("api.views.current_versions", side_effect=self.current_versions), \
+                mock.patch("api.views.build_snapshot", return_value=(group_analysis, False)) as build, \
+                mock.patch("time.time", return_value=1_800_000_000.0):
+            first = self.get()
+            self.assertEqual((first.status_code, first.data["metrics"]), (200, {"pulse": 40.0}))
+            self.assertFalse(first.data["freshness"]["stale"])
+            self.assertNotIn("debug", first.data)  # internal timings stay off by default
+            etag = first["ETag"]
+
+            # Nothing changed: 304 straight after the version probe, nothing computed
+            not_modified = self.get(etag)
+            self.assertEqual((not_modified.status_code, not_modified["ETag"]), (304, etag))
+            self.assertEqual(build.call_count, 1)
+            self.assertEqual(self.get().status_code, 200)  # no validator: full body again
+            self.assertEqual(self.get(f'"other", {etag}').status_code, 304)
+
+            # New data, then a new model: a new ETag each time, and the old one no longer matches
+            seen = {etag}
+            for name, version in (("data", "data-2"), ("model", "model-2")):
+                self.versions[name] = version
+                changed = self.get(etag)
+                self.assertEqual(changed.status_code, 200)
+                self.assertNotIn(changed["ETag"], seen)
+                seen.add(changed["ETag"])
+                etag = changed["ETag"]
+                self.assertEqual(self.get(etag).status_code, 304)
+
+            with override_settings(ANALYTICS_DEBUG_RESPONSES=True):
+                self.assertEqual(self.get().data["debug"], {"cache": "miss", "data_version": "data-2"})
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class SingleFlightTests(SimpleTestCase):
+    """Concurrent requests for the same key share one computation."""
+
+    def run_concurrently(self, count, call):
+        results, threads = [], [threading.Thread(target=lambda: results.append(call())) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_in_process_followers_share_the_leaders_result(self):
+        flight, calls = SingleFlight(timeout=5), []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"pulse": 40.0}
+
+        results = self.run_concurrently(8, lambda: flight.do("g", compute))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([shared for _, shared in results].count(False), 1)
+        self.assertTrue(all(result == {"pulse": 40.0} for result, _ in results))
+
+    def test_in_process_error_reaches_followers(self):
+        flight, started = SingleFlight(timeout=5), threading.Event()
+        errors = []
+
+        def fail():
+            started.set()
+            time.sleep(0.1)
+            raise RuntimeError("db down")
+
+        def call():
+            try:
+                flight.do("g", fail)
+            except RuntimeError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        call()
+        leader.join()
+
+        self.assertEqual(len(errors), 2)
+        self.assertIs(errors[0], errors[1])
+
+    def test_cache_lock_followers_read_the_stored_result(self):
+        # LocMem's atomic add() standing in for Redis: threads play the workers
+        with mock.patch("api.analytics.single_flight.is_shared_cache", return_value=True):
+            self.assert_lock_coalesces("default", expected_calls=1)
+
+    def test_process_local_lock_is_skipped(self):
+        self.assert_lock_coalesces("default", expected_calls=4)
+
+    def assert_lock_coalesces(self, cache_alias, expected_calls):
+        flight, store, calls = CacheLockSingleFlight(cache_alias=cache_alias, timeout=5, poll_interval=0.01), {}, []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            store["k"] = "analysis"
+            return "analysis"
+
+        results = self.run_concurrently(4, lambda: flight.do("single-flight-test", compute, lambda: store.get("k")))
+
+        self.assertEqual(len(calls), expected_calls)
+        self.assertEqual(sorted(results), [("analysis", False)] * expected_calls + [("analysis", True)] * (4 - expected_calls))
+
+
+class AnalyticsSnapshotStoreTests(SimpleTestCase):
+    """Stale snapshots are served (and refreshed) until max_stale."""
+
+    def test_snapshot_goes_stale_on_new_data_or_age(self):
+        store = AnalyticsSnapshotStore(cache_alias="default", max_age=300, max_stale=3600, ttl=86400)
+        snapshot = {"computed_at": time.time() - 10, "data_version": "d1", "model_version": "m1"}
+
+        self.assertFalse(store.freshness(snapshot, "d1", "m1")["stale"])
+        self.assertTrue(store.freshness(snapshot, "d2", "m1")["stale"])
+        self.assertTrue(store.freshness(snapshot, "d1", "m2")["stale"])
+        self.assertTrue(store.freshness(dict(snapshot, computed_at=time.time() - 600), "d1", "m1")["stale"])
+
+        self.assertTrue(store.servable(snapshot))
+        self.assertFalse(store.servable(dict(snapshot, computed_at=time.time() - 7200)))
+        self.assertFalse(store.servable(None))
+
+    def test_key_ignores_versions_but_not_the_variant(self):
+        store = AnalyticsSnapshotStore(cache_alias="default", max_age=300, max_stale=3600, ttl=86400)
+        key = store.key(1, fields=["history"], window=7, bucket="day")
+
+        self.assertEqual(key, store.key("1", fields=["history"], window=7, bucket="day"))
+        self.assertNotEqual(key, store.key(1, fields=["history"], window=30, bucket="day"))
+
+
+class SharedCacheTests(SimpleTestCase):
+    """Cross-process features (refresh jobs) refuse to run on a cache only one process can see."""
+
+    def test_process_local_cache_refuses_background_refresh(self):
+        with override_settings(CACHES=LOCAL_CACHES), \
+                mock.patch("api.analytics.tasks.refresh_group_analytics.apply_async") as apply_async:
+            self.assertFalse(is_shared_cache("default"))
+            self.assertFalse(jobs_available())
+            self.assertIsNone(enqueue_refresh("g", None, 7, "day"))
+        apply_async.assert_not_called()
+
+    def test_shared_backends(self):
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://cache:6379/0"}}
+        with override_settings(CACHES=redis):
+            self.assertTrue(is_shared_cache("default"))
+            self.assertFalse(is_shared_cache("missing"))
+            self.assertFalse(is_shared_cache(None))
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class AnalyticsRefreshEndpointTests(SimpleTestCase):
+    """Refresh / status / batch endpoints, with the engine mocked and jobs in per-process memory."""
+
+    def setUp(self):
+        caches["default"].clear()
+        self.client = APIClient()
+
+    @contextmanager
+    def shared_jobs(self):
+        # LocMem stands in for Redis: one process plays both the web and the Celery worker
+        with mock.patch("api.analytics.tasks.is_shared_cache", return_value=True), \
+                mock.patch("api.analytics.tasks.refresh_group_analytics.apply_async") as apply_async:
+            yield apply_async
+
+    def test_refresh_queues_a_job_and_status_follows_it(self):
+        with self.shared_jobs() as apply_async:
+            response = self.client.post("/api/analytics/7/refresh/?window=30&bucket=week")
+            self.assertEqual(response.status_code, 202)
+            job_id = response.data["job_id"]
+            self.assertEqual(response.data["status"], "queued")
+            self.assertEqual(response.data["poll_url"], f"/api/analytics/7/refresh/{job_id}/")
+            self.assertEqual(apply_async.call_args.kwargs["task_id"], job_id)
+
+            # A second request for the same snapshot reuses the pending job
+            self.assertEqual(self.client.post("/api/analytics/7/refresh/?window=30&bucket=week").data["job_id"], job_id)
+
+            status = lambda: self.client.get(f"/api/analytics/7/refresh/{job_id}/").data["status"]
+            self.assertEqual(status(), "queued")
+
+            # The worker runs it
+            args = apply_async.call_args.kwargs["args"]
+            with mock.patch("api.analytics.tasks.refresh_snapshot", return_value={"data_version": "v2"}):
+                refresh_group_analytics.apply(args=args, task_id=job_id)
+            self.assertEqual(status(), "done")
+            self.assertEqual(self.client.get(f"/api/analytics/7/refresh/{job_id}/").data["data_version"], "v2")
+
+            # Failures are reported, and jobs of other groups are not visible
+            with mock.patch("api.analytics.tasks.refresh_snapshot", side_effect=RuntimeError("db down")):
+                refresh_group_analytics.apply(args=args, task_id=job_id)
+            self.assertEqual(status(), "failed")
+            self.assertEqual(self.client.get(f"/api/analytics/8/refresh/{job_id}/").status_code, 404)
+            self.assertEqual(self.client.get("/api/analytics/7/refresh/unknown/").status_code, 404)
+
+    def test_refresh_reports_an_unreachable_queue(self):
+        with self.shared_jobs() as apply_async:
+            apply_async.side_effect = ConnectionError("broker down")
+            self.assertEqual(self.client.post("/api/analytics/7/refresh/").status_code, 503)
+
+    def test_process_local_cache_refreshes_inline(self):
+        with mock.patch("api.views.refresh_snapshot", return_value={"data_version": "v1"}) as refresh:
+            response = self.client.post("/api/analytics/7/refresh/?window=90")
+        self.assertEqual((response.status_code, response.data), (200, {"job_id": None, "status": "done"}))
+        self.assertEqual(refresh.call_args.args[2:], (90, "day"))
+
+        with mock.patch("api.views.refresh_snapshot", return_value=None):
+            self.assertEqual(self.client.post("/api/analytics/7/refresh/").status_code, 404)
+        self.assertEqual(self.client.get("/api/analytics/7/refresh/abc/").status_code, 503)
+        self.assertEqual(self.client.post("/api/analytics/7/refresh/?window=3").status_code, 400)
+
+    def test_batch_limits_and_permissions(self):
+        self.assertIn(self.client.get("/api/analytics/batch/?group_ids=1").status_code, (401, 403))
+
+        self.client.force_authenticate(user=User(username="admin"))
+        with mock.patch("api.views.AnalyticsEngine.run_batch", return_value={"1": {"group_id": "1"}, "2": {"group_id": "2"}}) as run_batch:
+            response = self.client.get("/api/analytics/batch/?group_ids=1, 2,")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["results"], [{"group_id": "1"}, {"group_id": "2"}])
+            run_batch.assert_called_once_with(["1", "2"])
+
+            self.assertEqual(self.client.post("/api/analytics/batch/", {"group_ids": [3]}, format="json").status_code, 200)
+            run_batch.assert_called_with(["3"])
+
+            too_many = ",".join(str(i) for i in range(GroupAnalyticsBatch.MAX_GROUPS + 1))
+            self.assertEqual(self.client.get(f"/api/analytics/batch/?group_ids={too_many}").status_code, 400)
+            self.assertEqual(self.client.post("/api/analytics/batch/", {}, format="json").status_code, 400)
+            self.assertEqual(run_batch.call_count, 2)
+
+
+class RollupFastPathTests(SimpleTestCase):
+    """History / velocity / forecast from daily rollup rows must equal the raw-task results."""
+
+    def make_tasks(self, seed, completed_at=True):
+        rng = np.random.default_rng(seed)
+        now = pd.Timestamp("2026-03-10 15:00", tz="UTC")
+        n = 300
+        hours = lambda: pd.to_timedelta(rng.integers(0, 120 * 24, n), unit="h")
+        tasks = pd.DataFrame({
+            "id": range(n),
+            "group_id": "g",
+            "assigned_to": rng.choice(["u1", "u2"], n),
+            "progress_percentage": rng.choice([50, 100], n),
+            "due_date": now - hours() + pd.Timedelta(days=30),
+            "status": rng.choice(["Completed", "todo"], n),
+            "completed_at": (now - hours()) if completed_at else pd.NaT,
+            "created_at": now - hours(),
+        })
+        return GroupFrame.build(tasks, tasks.iloc[:0].assign(text=None, user_id=None), now=now).tasks, now
+
+    def rollup_of(self, tasks):
+        # Same day/kind rules as rollup.ROLLUP_REFRESH_SQL
+        done = tasks["progress_percentage"] == 100
+        events = {
+            "tasks_created": tasks["created_at"].dropna(),
+            "tasks_completed": tasks.loc[done, "completed_at"].dropna(),
+            "tasks_completed_undated": tasks.loc[done & tasks["completed_at"].isna(), "created_at"].dropna(),
+            "tasks_closed": tasks.loc[tasks["is_completed"], "completed_at"].dropna(),
+            "tasks_done_by_due": tasks.loc[done, "end_date"].dropna(),
+        }
+        counts = pd.DataFrame({
+            column: pd.Series(day_ordinals(values)).value_counts() for column, values in events.items()
+        }).fillna(0).astype("int64").sort_index()
+        return counts.rename_axis("day").reset_index()
+
+    def test_rollup_matches_raw_tasks(self):
+        for seed, completed_at in ((1, True), (2, True), (3, False)):
+            tasks, now = self.make_tasks(seed, completed_at)
+            rollup = self.rollup_of(tasks)
+
+            for window in (7, 30, 90, 365):
+                for bucket in ("day", "week"):
+                    self.assertEqual(
+                        generate_chart_history(tasks, now, window, bucket, rollup),
+                        generate_chart_history(tasks, now, window, bucket),
+                    )
+
+            velocity = calculate_velocity(tasks)["daily_velocity"]
+            self.assertEqual(calculate_velocity(tasks, rollup)["daily_velocity"], velocity)
+            self.assertEqual(get_forecast_date(tasks, velocity, rollup), get_forecast_date(tasks, velocity))
+
+
+class ChangeEventBusTests(SimpleTestCase):
+    """Events are delivered once per group batch, after the group goes quiet."""
+
+    def test_batches_per_group_and_isolates_consumers(self):
+        bus, delivered = ChangeEventBus(debounce=60, max_delay=600), []
+
+        @bus.subscribe
+        def broken(group_id, events):
+            raise RuntimeError("consumer down")
+
+        @bus.subscribe
+        def record(group_id, events):
+            delivered.append((group_id, [event.op for event in events]))
+
+        bus.emit(ChangeEvent("task", 1, "insert", 0.0))
+        bus.emit(ChangeEvent("task", 1, "update", 1.0))
+        bus.emit(ChangeEvent("message", "2", "insert", 2.0))
+
+        self.assertEqual(bus.due(), [])
+        self.assertEqual(bus.flush("1"), 2)
+        self.assertEqual(delivered, [("1", ["insert", "update"])])
+        self.assertEqual(bus.flush(), 1)
+        self.assertEqual(delivered[-1], ("2", ["insert"]))
+
+    def test_debounce_and_max_delay(self):
+        bus = ChangeEventBus(debounce=2, max_delay=10)
+        bus.emit(ChangeEvent("task", "g", "insert", 0.0))
+        started = time.monotonic()
+
+        self.assertEqual(bus.due(started + 1), [])
+        self.assertEqual(bus.due(started + 3), ["g"])
+
+        # A group that never goes quiet is still flushed once max_delay has passed
+        trickle = ChangeEventBus(debounce=60, max_delay=5)
+        trickle.emit(ChangeEvent("task", "g", "insert", 0.0))
+        self.assertEqual(trickle.due(time.monotonic() + 1), [])
+        self.assertEqual(trickle.due(time.monotonic() + 6), ["g"])
+
+    def test_flusher_closes_its_connection(self):
+        bus = ChangeEventBus(debounce=60, max_delay=0)
+        bus.subscribe(mock.Mock(__name__="consumer"))
+        bus.emit(ChangeEvent("task", "g", "insert", 0.0))
+
+        with mock.patch("api.analytics.change_events.connection") as connection:
+            bus._flush_due()
+        connection.close.assert_called_once_with()
+
+    def test_django_task_and_message_writes_emit_nothing(self):
+        # Their tables feed no analytics; the Supabase tables notify through listen_changes
+        for model in (Task, Message):
+            self.assertFalse(post_save.has_listeners(model))
+            self.assertFalse(post_delete.has_listeners(model))
+        self.assertTrue(post_save.has_listeners(Document))
+
+
+class ChangeListenerTests(SimpleTestCase):
+    """Notified days reach the incremental rollup refresh; cache consumers need a shared cache."""
+
+    def test_notification_days_are_parsed(self):
+        payload = '{"entity": "task", "group_id": "g", "op": "update", "ts": 5, "days": ["2026-03-09", "2026-03-10"]}'
+        with mock.patch("api.management.commands.listen_changes.change_bus.emit") as emit:
+            ListenChangesCommand()._emit(payload)
+            ListenChangesCommand()._emit('{"entity": "group_member", "group_id": "g", "op": "insert", "ts": 6}')
+
+        self.assertEqual(emit.call_args_list[0].args[0].days, (date(2026, 3, 9), date(2026, 3, 10)))
+        self.assertEqual(emit.call_args_list[1].args[0].days, ())
+
+    def test_days_refresh_incrementally(self):
+        with mock.patch("api.analytics.consumers.refresh_rollup_days") as refresh, \
+                mock.patch("api.analytics.consumers.rebuild_rollup") as rebuild, \
+                mock.patch("api.analytics.consumers.fetch_data_version", return_value="v2"):
+            maintain_rollup("g", [
+                ChangeEvent("task", "g", "update", 0.0, (date(2026, 3, 9),)),
+                ChangeEvent("message", "g", "insert", 0.0, (date(2026, 3, 10),)),
+                ChangeEvent("group_member", "g", "insert", 0.0),
+            ])
+            refresh.assert_called_once_with("g", {date(2026, 3, 9), date(2026, 3, 10)})
+            rebuild.assert_not_called()
+
+            maintain_rollup("g", [ChangeEvent("task", "g", "update", 0.0)])
+            rebuild.assert_called_once_with("g", "v2")
+
+            # Membership moves the data version the rollup is stamped with: re-record it, no rows
+            refresh.reset_mock()
+            maintain_rollup("g", [ChangeEvent("group_member", "g", "insert", 0.0)])
+            refresh.assert_called_once_with("g", set())
+
+            refresh.reset_mock()
+            maintain_rollup("g", [ChangeEvent("document", "g", "insert", 0.0)])
+            refresh.assert_not_called()
+
+    def test_version_only_refresh_writes_no_rows(self):
+        cursor = mock.MagicMock()
+        cursor.fetchone.return_value = ("v1",)
+        connection = mock.MagicMock()
+        connection.cursor.return_value.__enter__.return_value = cursor
+        with mock.patch("api.analytics.rollup.connection", connection), \
+                mock.patch("api.analytics.rollup.transaction.atomic"):
+            refresh_rollup_days("g", set())
+
+        self.assertEqual(
+            [call.args[0] for call in cursor.execute.call_args_list],
+            [ROLLUP_STATE_LOCK_SQL, ROLLUP_STATE_CURRENT_SQL],
+        )
+
+    def test_process_local_cache_drops_cache_consumers(self):
+        class Stop(Exception):
+            pass
+
+        bus = ChangeEventBus(debounce=0, max_delay=0)
+        for consumer in (invalidate_group_caches, maintain_rollup, refresh_group_snapshot):
+            bus.subscribe(consumer)
+
+        with mock.patch("api.management.commands.listen_changes.change_bus", bus), \
+                mock.patch.object(ListenChangesCommand, "_listen", side_effect=Stop), \
+                override_settings(CACHES=LOCAL_CACHES, ANALYTICS_CACHE_ALIAS="default"), \
+                self.assertRaises(Stop):
+            ListenChangesCommand(stdout=io.StringIO(), stderr=io.StringIO()).handle(reconnect_delay=0)
+
+        self.assertEqual(bus.consumers, [maintain_rollup])
+
+
+class PulseCountersTests(SimpleTestCase):
+    """Hourly ring counters: windows, slot reuse, recounts, expiry, and the engine reading them instead of messages."""
+
+    def test_windows_and_ring_reuse(self):
+        counters, now = PulseCounters(), 1_800_000_000.0
+        self.assertIsNone(counters.activity("g", now))
+
+        hour = int(now // 3600)
+        counters.load("g", {hour - 30: 4, hour - RING_HOURS - 5: 9}, now - 30 * 3600)
+        counters.store("g", {hour: 2, hour - 5: 1, hour - 23: 1, hour - 24: 1, hour - 100: 1}, now)
+
+        # 5h ago shares its slot with the 9 messages a full ring earlier: recycled, not added to
+        activity = counters.activity("g", now)
+        self.assertEqual(activity["messages_24h"], 4)
+        self.assertEqual(activity["messages_7d"], 10)
+        self.assertEqual(activity["last_activity"], now)
+
+        counters.store("g", {hour - RING_HOURS - 100: 3}, now)  # older than its slot's hour: kept out
+        self.assertEqual(counters.activity("g", now)["messages_7d"], 10)
+
+    def test_counts_expire_without_keep_alive(self):
+        counters, now = PulseCounters(live_seconds=60), 1_800_000_000.0
+        counters.load("g", {int(now // 3600): 3}, now)
+        self.assertIsNone(counters.activity("g", now))
+
+        counters.keep_alive()
+        self.assertEqual(counters.activity("g", now)["messages_24h"], 3)
+
+        # The listener stopped: frozen counts are no longer served
+        with mock.patch("api.analytics.pulse_counters.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertFalse(counters.ready("g"))
+            self.assertIsNone(counters.activity("g", now))
+
+    def test_recount_overwrites_notified_hours(self):
+        counters, now = PulseCounters(), 1_800_000_000.0
+        hour = int(now // 3600)
+        counters.load("g", {hour: 1, hour - 1: 5}, now)
+
+        # One deduplicated notification for a 40-message insert: the recount finds all of them
+        cursor = mock.MagicMock()
+        cursor.fetchone.return_value = (now, {str(hour): 41})
+        connection = mock.MagicMock()
+        connection.__enter__.return_value.cursor.return_value.__enter__.return_value = cursor
+        today = datetime.fromtimestamp(now, timezone.utc).date()
+        with mock.patch("api.analytics.pulse_counters.pulse_counters", counters), \
+                mock.patch("api.analytics.pulse_counters.db_pool.connection", return_value=connection):
+            recount_pulse_hours("g", {today}, now)
+            recount_pulse_hours("g", {today}, now)  # idempotent
+
+        params = cursor.execute.call_args.args[1]
+        self.assertEqual(params["end"], (hour + 1) * 3600)  # no future hours
+        activity = counters.activity("g", now)
+        self.assertEqual(activity["messages_24h"], 41)  # hour - 1 recounted to 0
+        self.assertEqual(activity["last_activity"], now)
+
+    def test_engine_uses_counters_instead_of_messages(self):
+        now = pd.Timestamp("2026-03-10 15:00", tz="UTC")
+        tasks = pd.DataFrame({
+            "id": [1], "group_id": ["g"], "assigned_to": ["u1"], "progress_percentage": [0],
+            "due_date": [now], "status": ["todo"], "completed_at": [pd.NaT], "created_at": [now],
+        })
+        messages = pd.DataFrame({"id": [], "group_id": [], "text": [], "created_at": pd.to_datetime([], utc=True), "user_id": []})
+        frame = GroupFrame.build(tasks, messages, now=now)
+
+        last = (now - pd.Timedelta(days=3, hours=2)).timestamp()
+        with mock.patch("api.analytics.analytics_engine.model_registry.get", return_value=None):
+            engine = AnalyticsEngine(frame, activity={"messages_24h": 7, "messages_7d": 20, "last_activity": last})
+
+        self.assertEqual(engine.compute("pulse", "inactivity_days"), {"pulse": 70.0, "inactivity_days": 3})
+
+
+class ArrayPathParityTests(SimpleTestCase):
+    """
+    Shared parity suite: every pandas algorithm in ALGORITHMS and its GroupArrays twin must give
+    the same result for the same loader columns. A new algorithm needs a twin and an entry here.
+    """
+
+    NOW = pd.Timestamp("2026-03-10 15:30", tz="UTC")
+
+    # Algorithm name -> its arguments, from a GroupFrame / GroupArrays and a rollup (or None)
+    ARGUMENTS = {
+        "pulse": lambda data, rollup: (data.messages, data.now),
+        "inactivity_days": lambda data, rollup: (data.messages, data.now),
+        "velocity": lambda data, rollup: (data.tasks, rollup),
+        "forecast": lambda data, rollup: (data.tasks, 1.0, rollup),
+        "balance": lambda data, rollup: (data.tasks,),
+        "bottlenecks": lambda data, rollup: (data.tasks,),
+        "team_bandwidth": lambda data, rollup: (data.tasks,),
+        "risk": lambda data, rollup: (data.tasks, 3, 2, None),
+        "history": lambda data, rollup: (data.tasks, data.now, 30, "week", rollup),
+    }
+
+    def _columns(self, rng, n_tasks, n_messages):
+        # Loader-shaped columns: JSON values, epoch microsecond timestamps, NULLs as None
+        def stamps(n, spread_hours, nulls=0.2):
+            micros = self.NOW.value // 1000 - rng.integers(-spread_hours, spread_hours, n) * 3_600_000_000 - rng.integers(0, 10**9, n)
+            return [None if rng.random() < nulls else int(value) for value in micros]
+
+        tasks = {
+            "group_id": ["g1"] * n_tasks,
+            "assigned_to": [None if user == "" else user for user in rng.choice(["u1", "u2", "u3", "u4", ""], n_tasks)],
+            "progress_percentage": [None if value < 0 else int(value) for value in rng.choice([-1, 0, 50, 100, 100], n_tasks)],
+            "due_date": stamps(n_tasks, 40 * 24),
+            "status": [None if value == "" else value for value in rng.choice(["Completed", "completed", "todo", "In Progress", ""], n_tasks)],
+            "completed_at": stamps(n_tasks, 20 * 24, nulls=0.4),
+            "created_at": stamps(n_tasks, 60 * 24, nulls=0.05),
+        }
+        # Spread over a month so pulse doesn't saturate; plus the 24h cutoff itself and 1us after it
+        cutoff = self.NOW.value // 1000 - 24 * 3_600_000_000
+        created_at = stamps(n_messages, 30 * 24, nulls=0.0) + [cutoff, cutoff + 1][:n_messages]
+        messages = {
+            "group_id": ["g1"] * len(created_at),
+            "created_at": created_at,
+            "user_id": list(rng.choice(["u1", "u2"], len(created_at))),
+        }
+        return tasks, messages
+
+    def _both(self, tasks, messages):
+        frame = GroupFrame.build(
+            frame_from_columns(tasks, TASK_SCHEMA, epoch_timestamps=True),
+            frame_from_columns(messages, MESSAGE_SCHEMA, epoch_timestamps=True),
+            now=self.NOW,
+        )
+        arrays = GroupArrays.build(records_from_columns(tasks, TASK_SCHEMA), records_from_columns(messages, MESSAGE_SCHEMA), now=self.NOW)
+        return frame, arrays
+
+    def _assert_parity(self, frame, arrays, rollups=(None, None)):
+        for name, arguments in self.ARGUMENTS.items():
+            expected = ALGORITHMS[GroupFrame][name](*arguments(frame, rollups[0]))
+            actual = ALGORITHMS[GroupArrays][name](*arguments(arrays, rollups[1]))
+            if name == "team_bandwidth":
+                expected = {column: dict(values.items()) for column, values in expected.items()}
+            with self.subTest(algorithm=name):
+                self.assertEqual(actual, expected)
+
+    def test_every_algorithm_has_a_twin(self):
+        self.assertEqual(set(ALGORITHMS[GroupArrays]), set(ALGORITHMS[GroupFrame]))
+        self.assertEqual(set(self.ARGUMENTS), set(ALGORITHMS[GroupFrame]))
+
+    def test_algorithms_match(self):
+        rng = np.random.default_rng(11)
+        for n_tasks, n_messages in [(0, 0), (1, 0), (2, 1), (3, 5), (8, 0), (40, 30), (199, 200)]:
+            with self.subTest(tasks=n_tasks, messages=n_messages):
+                self._assert_parity(*self._both(*self._columns(rng, n_tasks, n_messages)))
+
+        # Everything done: forecast short-circuits, nothing open
+        tasks, messages = self._columns(rng, 12, 3)
+        tasks["progress_percentage"] = [100] * 12
+        tasks["status"] = ["Completed"] * 12
+        self._assert_parity(*self._both(tasks, messages))
+
+        # No completed_at anywhere: history bins completions by created_at
+        tasks, messages = self._columns(rng, 20, 3)
+        tasks["progress_percentage"] = [100, 0] * 10
+        tasks["completed_at"] = [None] * 20
+        self._assert_parity(*self._both(tasks, messages))
+
+    def test_rollup_inputs_match(self):
+        rng = np.random.default_rng(12)
+        days = sorted(rng.choice(np.arange(739600, 739690), 25, replace=False).tolist())
+        rollup = {name: [int(value) for value in rng.integers(0, 4, len(days))] for name in ROLLUP_SCHEMA}
+        rollup["day"] = days
+
+        frame, arrays = self._both(*self._columns(rng, 30, 5))
+        self._assert_parity(frame, arrays, (frame_from_columns(rollup, ROLLUP_SCHEMA), records_from_columns(rollup, ROLLUP_SCHEMA)))
+
+    def test_engine_responses_match(self):
+        rng = np.random.default_rng(13)
+        frame, arrays = self._both(*self._columns(rng, 60, 20))
+        members = [{"user_id": "u1", "full_name": "A"}, {"user_id": "u3", "full_name": "C"}, {"user_id": "u9", "full_name": "Z"}]
+
+        results = []
+        with mock.patch("api.analytics.analytics_engine.model_registry.get", return_value=None), \
+                override_settings(ANALYTICS_DEBUG_RESPONSES=True):
+            for data in (frame, arrays):
+                engine = AnalyticsEngine(data, deadline_str="2026-04-01", members=members)
+                analysis = engine.run_group_analysis()
+                results.append((analysis["response"].pop("debug")["arrays"], analysis))
+
+        (frame_arrays, expected), (arrays_arrays, actual) = results
+        self.assertEqual((frame_arrays, arrays_arrays), (False, True))
+        self.assertEqual(actual, expected)
+        self.assertEqual(actual["response"]["group_id"], "g1")
+
+    def test_arrays_are_read_only(self):
+        _, arrays = self._both(*self._columns(np.random.default_rng(14), 5, 2))
+        with self.assertRaises(ValueError):
+            arrays.tasks["progress_percentage"][0] = 1
+        with self.assertRaises(AttributeError):
+            arrays.now = None
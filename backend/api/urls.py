@@ -13,7 +13,10 @@ urlpatterns = [
     path("user/profile/", views.get_user_profile, name="user_profile"),
     path("documents/", views.DocumentListCreate.as_view(), name="document-list"),
     path("documents/delete/<int:pk>/", views.DocumentDelete.as_view(), name="delete-document"),
+    path("analytics/batch/", views.GroupAnalyticsBatch.as_view(), name="group-analytics-batch"),
     path("analytics/<int:group_id>/", views.GroupAnalyticsDashboard.as_view(), name="group-analytics"),
+    path("analytics/<int:group_id>/refresh/", views.GroupAnalyticsRefresh.as_view(), name="group-analytics-refresh"),
+    path("analytics/<int:group_id>/refresh/<str:job_id>/", views.GroupAnalyticsRefreshStatus.as_view(), name="group-analytics-refresh-status"),
 
     path("test-supabase/", views.SupabaseTestView.as_view()),
 
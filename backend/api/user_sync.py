@@ -0,0 +1,156 @@
+import atexit
+import hashlib
+import threading
+import time
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
+
+from .auth_cache import principal_cache
+
+User = get_user_model()
+
+
+class UserSyncBuffer:
+    """
+    Write-behind mirror of Supabase Auth users into api_user.
+    Remembers a fingerprint of the last synced claims (email, full_name, role) per
+    supabase_id and only touches the database when that fingerprint changes. Changed
+    users are queued and written together with bulk_update every flush_interval seconds
+    (by a background timer, so an idle worker doesn't sit on them), so a steady-state
+    request performs no writes at all. Fingerprints are an LRU bounded by fingerprint_size
+    and expire after fingerprint_ttl seconds.
+    """
+
+    SYNCED_FIELDS = ['username', 'first_name', 'email', 'is_active', 'role']
+
+    def __init__(self, flush_interval, max_pending, fingerprint_size, fingerprint_ttl):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._fingerprints = TTLCache(maxsize=fingerprint_size, ttl=fingerprint_ttl)  # supabase_id -> (user pk, fingerprint)
+        self._pending = {}       # user pk -> User with unsaved changes
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    @staticmethod
+    def fingerprint(email, full_name, role):
+        return hashlib.sha1(f"{email}\x1f{full_name}\x1f{role}".encode('utf-8')).hexdigest()
+
+    def get_user(self, pk):
+        """
+        Returns a new User instance for `pk`, built from the principal cache's values when it has
+        them (the queued copy's values win, so unflushed changes are never hidden) and loaded
+        from the database otherwise.
+        """
+        with self._lock:
+            pending = self._pending.get(pk)
+        if pending is not None:
+            principal_cache.remember_user(pending)
+
+        user = principal_cache.user(pk)
+        if user is not None and user.is_active:
+            return user
+
+        user = User.objects.filter(pk=pk, is_active=True).first()
+        if user is not None:
+            principal_cache.remember_user(user)
+        return user
+
+    def sync(self, supabase_uid, email, full_name, role):
+        fingerprint = self.fingerprint(email, full_name, role)
+
+        # 1. Nothing changed since the last sync in this process: no query while the principal cache has the user
+        with self._lock:
+            known = self._fingerprints.get(supabase_uid)
+        if known is not None and known[1] == fingerprint:
+            user = self.get_user(known[0])
+            if user is not None:
+                self.maybe_flush()
+                return user
+
+        values = {
+            'username': email, # Django requires a unique username
+            'first_name': full_name, # Map Supabase full_name here
+            'email': email,
+            'is_active': True,
+            'role': role,
+        }
+
+        # 2. First sighting of this user: it has to exist before we can return it.
+        #    get_or_create re-reads the row when a concurrent request created it first
+        user, created = User.objects.get_or_create(supabase_id=supabase_uid, defaults=values)
+        if not created and any(getattr(user, field) != value for field, value in values.items()):
+            # 3. Claims changed: update the instance now, write it with the next batch
+            for field, value in values.items():
+                setattr(user, field, value)
+            with self._lock:
+                self._pending[user.pk] = user
+            self._ensure_timer()
+
+        with self._lock:
+            self._fingerprints[supabase_uid] = (user.pk, fingerprint)
+        principal_cache.remember_user(user)
+        self.maybe_flush()
+        # The queued instance stays with the buffer; the caller gets its own copy
+        return principal_cache.user(user.pk) or user
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.maybe_flush()
+            except Exception as e:
+                print(f"DEBUG: Background user sync flush failed: {str(e)}")
+            finally:
+                # This thread's DB connection would otherwise stay open between flushes
+                connection.close()
+
+    def _ensure_timer(self):
+        if self._timer is not None:
+            return
+        with self._lock:
+            # Started lazily so each forked worker owns its own timer thread
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._flush_forever, name="user-sync-flush", daemon=True)
+                self._timer.start()
+
+    def maybe_flush(self):
+        due = time.monotonic() - self._last_flush >= self.flush_interval
+        if self._pending and (due or len(self._pending) >= self.max_pending):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch = list(self._pending.values())
+            self._pending.clear()
+            self._last_flush = time.monotonic()
+
+        if not batch:
+            return 0
+
+        try:
+            User.objects.bulk_update(batch, self.SYNCED_FIELDS)
+        except DatabaseError as e:
+            # One bad row (e.g. a username clash) shouldn't drop the whole batch
+            print(f"DEBUG: Bulk user sync failed ({str(e)}), retrying row by row")
+            for user in batch:
+                try:
+                    user.save(update_fields=self.SYNCED_FIELDS)
+                except DatabaseError as row_error:
+                    with self._lock:
+                        self._fingerprints.pop(user.supabase_id, None)
+                    print(f"DEBUG: Could not sync user {user.supabase_id}: {str(row_error)}")
+        return len(batch)
+
+
+user_sync = UserSyncBuffer(
+    flush_interval=settings.SUPABASE_USER_SYNC_FLUSH_SECONDS,
+    max_pending=settings.SUPABASE_USER_SYNC_MAX_PENDING,
+    fingerprint_size=settings.SUPABASE_USER_SYNC_FINGERPRINT_SIZE,
+    fingerprint_ttl=settings.SUPABASE_USER_SYNC_FINGERPRINT_SECONDS,
+)
+
+atexit.register(user_sync.flush)
@@ -3,6 +3,7 @@ from tokenize import group
 from django.contrib.auth import get_user_model 
 from django.utils import timezone
 from django.conf import settings
+from django.utils.http import parse_etags
 from rest_framework import generics, permissions, viewsets
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import api_view, permission_classes
@@ -12,57 +13,31 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from urllib3 import request
 
-from api.analytics.algorithms.member_bandwidth import calculate_detailed_bandwidth
-from api.analytics.algorithms.risk_detection import predict_project_risk
+from api.analytics.algorithms.history_generator import HISTORY_WINDOWS, HISTORY_BUCKETS
 
 # Models, Analytic Engine & Serializers
 from .models import TaskNote, Task, Message, Group, Document
 from .serializers import NoteSerializer, TaskSerializer, MessageSerializer, GroupSerializer, DocumentSerializer, UserSerializer
 from .analytics.analytics_engine import AnalyticsEngine
+from .analytics.response_cache import analytics_cache
+from .analytics.snapshots import build_snapshot, current_versions, refresh_snapshot, snapshot_store
+from .analytics.tasks import enqueue_refresh, get_job, jobs_available
+from .analytics.model_registry import model_registry
+from .http_client import latency_stats, supabase_request
+from .auth_cache import principal_cache
+from .db_pool import db_pool
 import pandas as pd
 
-import requests
-import psycopg2
-import psycopg2.extras  
 import os
-import joblib
-import io
 
 User = get_user_model()
 
-# --- AI MODEL REGISTRY & CACHING ---  Global variable to hold the model in memory
-_CACHED_MODEL = None
-
+# --- AI MODEL REGISTRY ---
 def get_ai_model():
     """
-    Fetches the ML model from Supabase binary storage and caches it in memory.
+    Returns the risk model payload from the shared registry (reloaded only when its version changes).
     """
-    global _CACHED_MODEL
-    if _CACHED_MODEL is not None:
-        return _CACHED_MODEL
-
-    try:
-        # Fetch binary from Supabase using your existing helper
-        model_results = fetch_supabase_data(
-            "SELECT model_binary FROM \"Risk_Matrix_TrainSet\" WHERE model_name = %s",
-            ('risk_big_data_model',)
-        )
-        
-        if model_results:
-            binary_blob = model_results[0]['model_binary']
-            
-            # Convert memoryview to bytes if necessary (standard for psycopg2)
-            if isinstance(binary_blob, memoryview):
-                binary_blob = binary_blob.tobytes()
-            
-            # Load the bytes into a Python object
-            _CACHED_MODEL = joblib.load(io.BytesIO(binary_blob))
-            print("🤖 AI Model loaded successfully from Supabase.")
-            return _CACHED_MODEL
-            
-    except Exception as e:
-        print(f"❌ Error loading AI model from Supabase: {e}")
-    return None
+    return model_registry.get()
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -75,53 +50,28 @@ def get_user_profile(request):
         "role": getattr(user, 'role', 'user') 
     })
 
-def fetch_supabase_data(query, params=None):
-    conn = psycopg2.connect(
-        dbname= os.getenv("DB_NAME"),
-        user= os.getenv("DB_USER"),
-        password= os.getenv("DB_PWD"),
-        host= os.getenv("DB_HOST"),
-        port= os.getenv("DB_PORT"),
-    )
-    cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) 
-    cursor.execute(query, params)
-    data = cursor.fetchall()
-    
-    cursor.close()
-    conn.close()
-
-    return data
-
 class SupabaseTestView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
         try:
-            conn = psycopg2.connect(
-                dbname="postgres",
-                user="postgres.behbluflerhbslixhywa",
-                password=os.getenv("DB_PWD"),
-                host="aws-1-ap-northeast-1.pooler.supabase.com",
-                port="5432"
-            )
-
-            cur = conn.cursor()
+            with db_pool.connection() as conn:
+                with conn.cursor() as cur:
+                    # ⚠️ Adjust table name if needed (groups vs group)
+                    cur.execute("SELECT * FROM groups LIMIT 5;")
 
-            # ⚠️ Adjust table name if needed (groups vs group)
-            cur.execute("SELECT * FROM groups LIMIT 5;")
-
-            columns = [desc[0] for desc in cur.description]
-            rows = cur.fetchall()
-
-            cur.close()
-            conn.close()
+                    columns = [desc[0] for desc in cur.description]
+                    rows = cur.fetchall()
 
             results = [dict(zip(columns, row)) for row in rows]
 
             return Response({
                 "status": "connected",
                 "count": len(results),
-                "data": results
+                "data": results,
+                "pool": db_pool.stats(),
+                "principal_cache": principal_cache.stats(),
+                "http": latency_stats(),
             })
 
         except Exception as e:
@@ -146,10 +96,13 @@ class GroupViewSet(viewsets.ModelViewSet):
             "Authorization": f"Bearer {settings.SUPABASE_ANON_KEY}"
         }
 
-        url = f"{settings.SUPABASE_URL}/rest/v1/api_group_members?user_id=eq.{user.supabase_id}&select=group_id,groups(name,course)"
-            
+        params = {
+            "user_id": f"eq.{user.supabase_id}",
+            "select": "group_id,groups(name,course)",
+        }
+
         try:
-            response = requests.get(url, headers=headers)
+            response = supabase_request("GET", "/rest/v1/api_group_members", headers=headers, params=params)
             supabase_data = response.json()
 
             for item in supabase_data:
@@ -245,219 +198,177 @@ class DocumentDelete(generics.DestroyAPIView):
         return Document.objects.filter(uploaded_by=self.request.user)
 
 
+def parse_analytics_variant(query_params):
+    """
+    Goal: Read the request variant (?fields=, ?window=, ?bucket=) shared by the analytics endpoints.
+    Returns (fields, window_days, bucket); raises ValueError with a client-facing message.
+    """
+    # History window / granularity for the charts (?window=7|30|90|365&bucket=day|week)
+    try:
+        window_days = int(query_params.get("window", 7))
+    except ValueError:
+        window_days = None
+    bucket = query_params.get("bucket", "day")
+    if window_days not in HISTORY_WINDOWS or bucket not in HISTORY_BUCKETS:
+        raise ValueError(
+            f"window must be one of {list(HISTORY_WINDOWS)} and bucket one of {list(HISTORY_BUCKETS)}"
+        )
+
+    # Only the requested response fields are computed (?fields=metrics.pulse,history,member_report)
+    fields = AnalyticsEngine.select_fields(query_params.get("fields"))
+    return fields, window_days, bucket
+
+
 class GroupAnalyticsDashboard(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, group_id):
-        # 1. Validate group
         print("DEBUG group_id:", group_id)
         print("TYPE:", type(group_id))  
+
         try:
-            group_data = fetch_supabase_data(
-                "SELECT * FROM groups WHERE group_id = %s",
-                (group_id,)
-            )
+            fields, window_days, bucket = parse_analytics_variant(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
 
-            if not group_data:
-                return Response({"error": "Group not found"}, status=404)
+        current_user_id = (
+            request.user.id if request.user.is_authenticated else None
+        )
 
-            group = group_data[0]
-        except Group.DoesNotExist:
+        # 1. Cheap version probe: has anything this group's analytics read changed?
+        versions = current_versions(group_id, fields, window_days, bucket)
+        if versions is None:
             return Response({"error": "Group not found"}, status=404)
-        
-        print("Group query result:", group_data)
+        data_version, model_version, cache_key = versions
+        etag = analytics_cache.etag(cache_key, current_user_id)
+
+        # 2. Client already has this exact response: 304 without touching pandas or the model
+        client_etags = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in client_etags:
+            return Response(status=304, headers={"ETag": etag})
+
+        # 3. Current group-level analysis (shared by every member)
+        group_analysis = analytics_cache.get(cache_key)
+        cache_status = "hit"
+        refresh_job = None
+
+        # 4. Otherwise serve the last snapshot right away and refresh it in the background
+        if group_analysis is None:
+            snapshot = snapshot_store.get(snapshot_store.key(group_id, fields=fields, window=window_days, bucket=bucket))
+            if snapshot_store.servable(snapshot):
+                stale = snapshot_store.freshness(snapshot, data_version, model_version)["stale"]
+                refresh_job = enqueue_refresh(group_id, fields, window_days, bucket) if stale else None
+                # A stale snapshot nobody can refresh in the background (no shared cache / queue down) is recomputed below
+                if not stale or refresh_job is not None:
+                    group_analysis, cache_status = snapshot, "stale" if stale else "snapshot"
+                    etag = analytics_cache.etag(snapshot["cache_key"], current_user_id)
+                    if etag in client_etags:
+                        return Response(status=304, headers={"ETag": etag})
+
+        # 5. No usable snapshot: compute now (concurrent requests share one computation)
+        if group_analysis is None:
+            group_analysis, shared = build_snapshot(group_id, fields, window_days, bucket, versions)
+            cache_status = "coalesced" if shared else "miss"
+            if group_analysis is None:
+                return Response({"error": "Group not found"}, status=404)
 
-        # 2. Fetch data from DB
-        tasks_data = fetch_supabase_data(
-            "SELECT id, group_id, assigned_to, progress_percentage, due_date, status, completed_at, created_at FROM tasks WHERE group_id = %s",
-            (group_id,)
-        )
+        # 6. Per-user part on top (no pandas), plus how fresh the group part is
+        analysis_results = AnalyticsEngine.with_user_status(group_analysis, current_user_id)
+        if "error" not in analysis_results:
+            freshness = snapshot_store.freshness(group_analysis, data_version, model_version)
+            analysis_results["freshness"] = dict(
+                freshness, refresh_job_id=refresh_job["job_id"] if refresh_job else None
+            )
 
-        print("RAW TASKS DATA:", tasks_data[:2])
+        # 7. Internal diagnostics only when enabled (an entry cached while they were on may still carry them)
+        if settings.ANALYTICS_DEBUG_RESPONSES:
+            analysis_results["debug"] = dict(analysis_results.get("debug", {}), cache=cache_status, data_version=data_version)
+        else:
+            analysis_results.pop("debug", None)
 
-        messages_data = fetch_supabase_data(
-            """
-            SELECT id, group_id, user_id, text, created_at
-            FROM chat_messages
-            WHERE group_id = %s
-            """,
-            (group_id,)
-        )
+        return Response(analysis_results, headers={"ETag": etag})
+
+    def predict_member_bandwidth(self, member_id, load_count):
+        if load_count == 0: return "Optimal"
+        if load_count >= 7: return "Critical"
+        elif load_count >= 4: return "High"
+        elif load_count >= 2: return "Balanced"
+        else: return "Low"
 
-        # 3. Convert to DataFrames
-        tasks_df = pd.DataFrame(tasks_data)
 
-        print("TASKS DF COLUMNS:", tasks_df.columns)
+class GroupAnalyticsRefresh(APIView):
+    """
+    POST /analytics/<group_id>/refresh/ (same ?fields= / window / bucket as the dashboard)
+    Queues a recomputation of the group's analytics snapshot and returns 202 with a job id to poll.
+    Without a shared cache (CACHE_REDIS_URL="") it recomputes inline and returns 200 with status "done".
+    """
+    permission_classes = [AllowAny]
 
-        if not tasks_df.empty:
-            if "assigned_to" in tasks_df.columns:
-                tasks_df["user_id"] = tasks_df["assigned_to"]
-            else:
-                print("⚠️ assigned_to column missing")
-                tasks_df["user_id"] = None
-            tasks_df = tasks_df.rename(columns={
-                "due_date": "end_date"
-            })
-        
-            if "is_overdue" not in tasks_df.columns:
-                if not tasks_df.empty and "end_date" in tasks_df.columns:
-                    now = pd.Timestamp.utcnow()
-                    temp_dates = pd.to_datetime(tasks_df["end_date"], utc=True, errors='coerce')
-                    tasks_df["is_overdue"] = (tasks_df["status"] != "completed") & (temp_dates < now)
-                else:
-                    tasks_df["is_overdue"] = False
-
-        messages_df = pd.DataFrame(
-            messages_data,
-            columns=["id", "group_id", "text", "created_at", "user_id"]
-        )
+    def post(self, request, group_id):
+        try:
+            fields, window_days, bucket = parse_analytics_variant(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
 
-        if messages_df.empty:
-            print("⚠️ No messages found for this group")
-            messages_df = pd.DataFrame(columns=[
-                "id", "group_id", "text", "created_at", "user_id"
-            ])
+        # Without a cache shared with Celery the job could never be seen here: refresh inline instead
+        if not jobs_available():
+            if refresh_snapshot(group_id, fields, window_days, bucket) is None:
+                return Response({"error": "Group not found"}, status=404)
+            return Response({"job_id": None, "status": "done"})
 
-        # 4. Initialize engine
-        engine = AnalyticsEngine(tasks_df, messages_df)
+        job = enqueue_refresh(group_id, fields, window_days, bucket)
+        if job is None:
+            return Response({"error": "Analytics refresh is unavailable right now"}, status=503)
 
-        # 5. Prepare inputs
-        if not tasks_df.empty and "end_date" in tasks_df.columns:
-            latest_date = pd.to_datetime(tasks_df["end_date"], errors='coerce').max()
-            deadline_str = latest_date.strftime("%Y-%m-%d") if pd.notnull(latest_date) else "2026-12-31"
-        else:
-            deadline_str = "2026-12-31"
+        return Response({
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "poll_url": f"/api/analytics/{group_id}/refresh/{job['job_id']}/",
+        }, status=202)
 
-        current_user_id = (
-            request.user.id if request.user.is_authenticated else None
-        )
 
-        # 6. Run analytics engine
-        analysis_results = engine.run_comprehensive_analysis(
-            deadline_str,
-            current_user_id
-        )
+class GroupAnalyticsRefreshStatus(APIView):
+    """
+    GET /analytics/<group_id>/refresh/<job_id>/
+    Job status (queued / running / done / failed); once done, refetch /analytics/<group_id>/.
+    """
+    permission_classes = [AllowAny]
 
-        if "error" in analysis_results:
-            return Response(analysis_results, status=200)
+    def get(self, request, group_id, job_id):
+        if not jobs_available():
+            return Response({"error": "Refresh jobs need a shared cache (CACHE_REDIS_URL)"}, status=503)
+        job = get_job(job_id)
+        if job is None or str(job["group_id"]) != str(group_id):
+            return Response({"error": "Refresh job not found"}, status=404)
+        return Response(job)
 
-        # 7. Add member report
-        analysis_results["member_report"] = self.get_member_bandwidth_report(
-            group,
-            tasks_df,
-            engine
-        )
 
-        # 8. Add history
-        analysis_results["history"] = self.generate_history(tasks_df)
+class GroupAnalyticsBatch(APIView):
+    """
+    Scores many groups in one pass (portfolio / admin dashboards).
+    GET ?group_ids=a,b,c  or  POST {"group_ids": [...]}
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_GROUPS = 200
 
-        # 9. INTEGRATE AI RISK MATRIX LOGIC
-        metrics = analysis_results.get("metrics", {})
-        
-        overdue_count = len(tasks_df[tasks_df["is_overdue"] == True]) if not tasks_df.empty else 0
-        
-        # 👇 FIX: Initialize inactivity_days to a default value before the conditional check
-        inactivity_days = 0 
-        
-        if not messages_df.empty:
-            last_msg = pd.to_datetime(messages_df['created_at']).max()
-            
-            if pd.notnull(last_msg):
-                if last_msg.tzinfo is None:
-                    last_msg = last_msg.tz_localize('UTC')
-                else:
-                    last_msg = last_msg.tz_convert('UTC')
-
-                inactivity_days = (pd.Timestamp.utcnow() - last_msg).days
-        
-        model_payload = get_ai_model()
+    def get(self, request):
+        raw = request.query_params.get("group_ids", "")
+        return self._score([g for g in raw.split(",") if g.strip()])
 
-        if model_payload:
-            risk_data = predict_project_risk(tasks_df, overdue_count, inactivity_days, model_payload)
-        else:
-            risk_data = {"status": "Low", "score": 1, "likelihood": 1, "impact": 1}
-
-        metrics.update({
-            "ai_risk_level": risk_data["status"],
-            "risk_score": risk_data["score"],
-            "risk_likelihood": risk_data["likelihood"],
-            "risk_impact": risk_data["impact"],
-        })
-
-        analysis_results["metrics"] = metrics
-
-        return Response(analysis_results)
-
-    def get_member_bandwidth_report(self, group, tasks_df, engine):
-        report = []
-        if tasks_df.empty:
-            return report
-
-        members = fetch_supabase_data("""
-            SELECT u.user_id, u.full_name
-            FROM users u
-            JOIN group_members gm ON u.user_id = gm.user_id
-            WHERE gm.group_id = %s
-        """, (group["group_id"],))
-
-        for member in members:
-            user_id = member["user_id"]
-            member_tasks = tasks_df[
-                (tasks_df['assigned_to'] == member["user_id"]) &
-                (tasks_df['progress_percentage'] < 100)
-            ]
-
-            load_count = len(member_tasks)
-            risk_score = calculate_detailed_bandwidth(tasks_df, user_id)
-
-            report.append({
-                "name": member.get("full_name", "Unknown"),
-                "active_tasks": load_count,
-                "risk_score": risk_score,
-                "status_color": (
-                    "red" if load_count > 5 else
-                    "yellow" if load_count > 3 else
-                    "green"
-                )
-            })
+    def post(self, request):
+        return self._score(request.data.get("group_ids") or [])
 
-        return report
+    def _score(self, group_ids):
+        group_ids = [str(g).strip() for g in group_ids]
+        if not group_ids:
+            return Response({"error": "group_ids is required"}, status=400)
+        if len(group_ids) > self.MAX_GROUPS:
+            return Response({"error": f"At most {self.MAX_GROUPS} groups per request"}, status=400)
 
-    def generate_history(self, tasks_df):
-        if tasks_df.empty or 'created_at' not in tasks_df.columns:
-            return {
-                "dates": [], "completed_counts": [], "total_counts": [],
-                "velocity_trend": [], "prediction_dates": [],
-                "backlog_prediction": [], "incoming_prediction": []
-            }
+        results = AnalyticsEngine.run_batch(group_ids)
+        return Response({"results": list(results.values())})
 
-        try:
-            df = tasks_df.copy()
-            df['created_at'] = pd.to_datetime(df['created_at'])
-            daily = df.groupby(df['created_at'].dt.date).size()
-
-            return {
-                "dates": [str(d) for d in daily.index],
-                "completed_counts": daily.cumsum().tolist(),
-                "total_counts": [len(df)] * len(daily),
-                "velocity_trend": daily.rolling(3).mean().fillna(0).tolist(),
-                "prediction_dates": [], "backlog_prediction": [], "incoming_prediction": []
-            }
-        except Exception as e:
-            print("History generation error:", e)
-            return {
-                "dates": [], "completed_counts": [], "total_counts": [],
-                "velocity_trend": [], "prediction_dates": [],
-                "backlog_prediction": [], "incoming_prediction": []
-            }
 
-    def predict_member_bandwidth(self, member_id, load_count):
-        if load_count == 0: return "Optimal"
-        if load_count >= 7: return "Critical"
-        elif load_count >= 4: return "High"
-        elif load_count >= 2: return "Balanced"
-        else: return "Low"
-        
 class AdminCreateUserView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
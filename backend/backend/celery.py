@@ -7,4 +7,4 @@ app = Celery('backend')
 
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
-app.autodiscover_tasks(['api'])
\ No newline at end of file
+app.autodiscover_tasks(['api', 'api.analytics'])
\ No newline at end of file
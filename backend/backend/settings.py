@@ -27,6 +27,85 @@ ADMIN_EMAILS = []  # Add admin emails here, e.g. ['admin@example.com']
 # --- SUPABASE CONFIGURATION ---
 SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
 
+# "local" verifies access tokens in-process (HS256 secret / JWKS), "remote" asks /auth/v1/user every time
+SUPABASE_AUTH_MODE = os.getenv("SUPABASE_AUTH_MODE", "local")
+# Fall back to /auth/v1/user when a token can't be checked locally (missing secret, unknown key)
+SUPABASE_AUTH_REMOTE_FALLBACK = os.getenv("SUPABASE_AUTH_REMOTE_FALLBACK", "True") == "True"
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+SUPABASE_JWKS_REFRESH_SECONDS = int(os.getenv("SUPABASE_JWKS_REFRESH_SECONDS", "600"))
+
+# Verified-token cache (keyed by SHA-256 of the bearer token)
+SUPABASE_AUTH_CACHE_SIZE = int(os.getenv("SUPABASE_AUTH_CACHE_SIZE", "10000"))
+SUPABASE_AUTH_CACHE_MAX_SECONDS = int(os.getenv("SUPABASE_AUTH_CACHE_MAX_SECONDS", "300"))
+# Name of a Django CACHES alias to share verifications across workers (None = in-process only)
+SUPABASE_AUTH_CACHE_ALIAS = os.getenv("SUPABASE_AUTH_CACHE_ALIAS") or None
+
+# Write-behind sync of Supabase users into api_user (changed users are bulk_update'd together)
+SUPABASE_USER_SYNC_FLUSH_SECONDS = int(os.getenv("SUPABASE_USER_SYNC_FLUSH_SECONDS", "5"))
+SUPABASE_USER_SYNC_MAX_PENDING = int(os.getenv("SUPABASE_USER_SYNC_MAX_PENDING", "100"))
+# Fingerprints of recently synced users kept per process (LRU, re-checked against the DB after the TTL)
+SUPABASE_USER_SYNC_FINGERPRINT_SIZE = int(os.getenv("SUPABASE_USER_SYNC_FINGERPRINT_SIZE", "10000"))
+SUPABASE_USER_SYNC_FINGERPRINT_SECONDS = int(os.getenv("SUPABASE_USER_SYNC_FINGERPRINT_SECONDS", "3600"))
+
+# Shared HTTP client for Supabase Auth/REST/Storage calls (see api/http_client.py)
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "True") == "True"
+SUPABASE_HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "5"))
+SUPABASE_HTTP_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_HTTP_CONNECT_TIMEOUT", "3"))
+SUPABASE_HTTP_RETRIES = int(os.getenv("SUPABASE_HTTP_RETRIES", "2"))
+SUPABASE_HTTP_MAX_CONNECTIONS = int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "20"))
+SUPABASE_HTTP_MAX_KEEPALIVE = int(os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", "10"))
+SUPABASE_HTTP_KEEPALIVE_SECONDS = float(os.getenv("SUPABASE_HTTP_KEEPALIVE_SECONDS", "60"))
+
+# Raw psycopg2 pool used by analytics queries (see api/db_pool.py)
+SUPABASE_DB_POOL_MIN = int(os.getenv("SUPABASE_DB_POOL_MIN", "1"))
+SUPABASE_DB_POOL_MAX = int(os.getenv("SUPABASE_DB_POOL_MAX", "10"))
+SUPABASE_DB_POOL_MAX_LIFETIME = int(os.getenv("SUPABASE_DB_POOL_MAX_LIFETIME", "1800"))
+SUPABASE_DB_POOL_HEALTH_CHECK_AFTER = int(os.getenv("SUPABASE_DB_POOL_HEALTH_CHECK_AFTER", "30"))
+SUPABASE_DB_POOL_TIMEOUT = float(os.getenv("SUPABASE_DB_POOL_TIMEOUT", "10"))
+
+# --- ANALYTICS ---
+# Risk model stored in "Risk_Matrix_TrainSet" and how often workers check it for a new version
+ANALYTICS_MODEL_NAME = os.getenv("ANALYTICS_MODEL_NAME", "risk_big_data_model")
+ANALYTICS_MODEL_POLL_SECONDS = int(os.getenv("ANALYTICS_MODEL_POLL_SECONDS", "60"))
+# Local artifact cache (content-hash keyed, memory-mapped by every worker); empty disables it
+ANALYTICS_MODEL_CACHE_DIR = os.getenv("ANALYTICS_MODEL_CACHE_DIR", os.path.join(BASE_DIR, 'model_cache')) or None
+# Threads of the per-process pool that computes independent dashboard metrics concurrently,
+# shared by every request (1 = one metric at a time)
+ANALYTICS_METRIC_WORKERS = int(os.getenv("ANALYTICS_METRIC_WORKERS", "4"))
+# Adds a "debug" block (per-metric timings, data paths, cache status, freshness) to analytics
+# responses. Internal diagnostics: off in production, and it is stored with the cached analyses
+ANALYTICS_DEBUG_RESPONSES = os.getenv("ANALYTICS_DEBUG_RESPONSES", "False") == "True"
+# Shared group-level analytics responses (Django CACHES alias; empty disables) and how long they live
+ANALYTICS_CACHE_ALIAS = os.getenv("ANALYTICS_CACHE_ALIAS", "default") or None
+ANALYTICS_CACHE_SECONDS = int(os.getenv("ANALYTICS_CACHE_SECONDS", "300"))
+# Concurrent requests for the same group + data version wait for one computation (in-process, and
+# across workers through a lock in this cache alias; empty or a process-local alias = in-process only)
+ANALYTICS_FLIGHT_LOCK_ALIAS = os.getenv("ANALYTICS_FLIGHT_LOCK_ALIAS", ANALYTICS_CACHE_ALIAS or "") or None
+ANALYTICS_FLIGHT_TIMEOUT = float(os.getenv("ANALYTICS_FLIGHT_TIMEOUT", "30"))
+# Stale-while-revalidate: the last snapshot per group is served immediately; once it is older than
+# MAX_AGE seconds (or the data/model changed) a background refresh is queued. Snapshots older than
+# MAX_STALE are recomputed inline instead; TTL is how long they are kept at all.
+ANALYTICS_SNAPSHOT_MAX_AGE = int(os.getenv("ANALYTICS_SNAPSHOT_MAX_AGE", "300"))
+ANALYTICS_SNAPSHOT_MAX_STALE = int(os.getenv("ANALYTICS_SNAPSHOT_MAX_STALE", "3600"))
+ANALYTICS_SNAPSHOT_TTL = int(os.getenv("ANALYTICS_SNAPSHOT_TTL", "86400"))
+# Group change events (document / note signals + `manage.py listen_changes`) are batched per group and delivered
+# after DEBOUNCE quiet seconds (at most MAX_DELAY after the first one) to cache / rollup / snapshot consumers
+ANALYTICS_EVENTS_DEBOUNCE_SECONDS = float(os.getenv("ANALYTICS_EVENTS_DEBOUNCE_SECONDS", "2"))
+ANALYTICS_EVENTS_MAX_DELAY_SECONDS = float(os.getenv("ANALYTICS_EVENTS_MAX_DELAY_SECONDS", "10"))
+# Remember a group's data version between requests (seconds; 0 = probe every request). Only safe to
+# raise when change events reach every worker: `listen_changes` running and a shared cache alias.
+ANALYTICS_VERSION_MEMO_SECONDS = int(os.getenv("ANALYTICS_VERSION_MEMO_SECONDS", "0"))
+# Per-group hourly message counters behind pulse / inactivity (Redis URL; empty = in-process memory,
+# which the web workers never see). They are fed and backfilled by `manage.py listen_changes`, so
+# they only take effect with a URL and the listener running; otherwise groups scan their messages.
+ANALYTICS_PULSE_REDIS_URL = os.getenv("ANALYTICS_PULSE_REDIS_URL", "")
+# Seconds the pulse counters stay trusted after the last `listen_changes` heartbeat; once the
+# listener stops, groups fall back to scanning messages instead of serving frozen counts (0 = never expire)
+ANALYTICS_PULSE_LIVE_SECONDS = int(os.getenv("ANALYTICS_PULSE_LIVE_SECONDS", "60"))
+# Groups with fewer tasks than this run the NumPy structured-array algorithms instead of pandas
+# (same results, less per-operation overhead on small groups; 0 = always pandas)
+ANALYTICS_ARRAY_MAX_TASKS = int(os.getenv("ANALYTICS_ARRAY_MAX_TASKS", "200"))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'api.authentication.SupabaseJWTAuthentication', 
@@ -145,6 +224,18 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CELERY_BROKER_URL = 'redis://127.0.0.1:6379/0'
+
+# Shared Django cache on the Celery Redis: analytics responses, snapshots, refresh jobs and flight locks
+# written by one worker (web or Celery) must be visible to all of them. CACHE_REDIS_URL="" falls back to
+# per-process memory for local work without Redis; background refreshes are then computed inline.
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", CELERY_BROKER_URL)
+CACHES = {
+    "default": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": CACHE_REDIS_URL, "KEY_PREFIX": "advisuri"}
+        if CACHE_REDIS_URL else
+        {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    ),
+}
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 
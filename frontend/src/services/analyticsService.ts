@@ -1,5 +1,8 @@
 import api from '../api'; // Your Axios instance
-import { AnalyticsResponse } from '../shared/types';
+import { AnalyticsRefreshJob, AnalyticsResponse } from '../shared/types';
+
+const REFRESH_POLL_MS = 1000;
+const REFRESH_MAX_POLLS = 30;
 
 /**
  * Service to handle all AI-driven analytical data fetching.
@@ -38,16 +41,30 @@ export const analyticsService = {
   /**
    * Triggers a fresh re-calculation of the ML models.
    * Useful if the user just updated many tasks and wants to see an immediate impact on the forecast.
+   * The backend queues the work (202 + job id); we poll the job, then fetch the new snapshot.
    */
   refreshAnalytics: async (
     groupId: string | number
   ): Promise<AnalyticsResponse> => {
     try {
       // We use POST here to signal a state change/refresh on the backend
-      const response = await api.post<AnalyticsResponse>(
+      const { data: queued } = await api.post<AnalyticsRefreshJob>(
         `/analytics/${groupId}/refresh/`
       );
-      return response.data;
+
+      let job = queued;
+      for (let poll = 0; poll < REFRESH_MAX_POLLS && job.status !== 'done'; poll++) {
+        if (job.status === 'failed') {
+          throw new Error(job.error || 'Analytics refresh failed');
+        }
+        await new Promise((resolve) => setTimeout(resolve, REFRESH_POLL_MS));
+        ({ data: job } = await api.get<AnalyticsRefreshJob>(
+          `/analytics/${groupId}/refresh/${queued.job_id}/`
+        ));
+      }
+
+      // Done (or still running after the last poll): the dashboard serves the newest snapshot
+      return await analyticsService.getGroupAnalytics(groupId);
     } catch (error) {
       console.error(
         `[Refresh Error] could not update AI models for group ${groupId}`
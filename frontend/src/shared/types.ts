@@ -396,6 +396,25 @@ export interface AnalyticsResponse {
     backlog_prediction: number[];
     incoming_prediction: number[];
   };
+
+  // How old the served snapshot is; a stale one is being refreshed in the background
+  freshness?: {
+    computed_at: string;
+    age_seconds: number;
+    stale: boolean;
+    refresh_job_id: string | null;
+  };
+}
+
+/**
+ * Background analytics refresh job
+ * Returned by POST /api/analytics/{groupId}/refresh/ and GET /api/analytics/{groupId}/refresh/{jobId}/
+ */
+export interface AnalyticsRefreshJob {
+  job_id: string | null; // null when the backend refreshed inline (status: done)
+  status: 'queued' | 'running' | 'done' | 'failed';
+  poll_url?: string;
+  error?: string;
 }
 
 export interface ChartPackage {